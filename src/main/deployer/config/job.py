@@ -54,6 +54,7 @@ import logging
 import yaml
 from deployer.core.utils import generate_job_id
 from deployer.core.exceptions import JobConfigurationError
+from deployer.core.placement import PLACEMENT_OBJECTIVES
 
 LOG = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG,
@@ -82,6 +83,37 @@ class JobConfiguration(object):
     
     # Whether to delete job data on the execution node after a job has finished
     _delete_job_files = False
+    
+    # Whether to send the input files to the remote platform as a single 
+    # archive and, if so, the compression to use (none, gzip or zstd).
+    _bundle_inputs = False
+    _bundle_compression = None
+    
+    # Whether to stream the output archive directly back from the remote 
+    # platform and, if so, whether to extract it on arrival.
+    _stream_output = False
+    _extract_output = False
+    
+    # Glob patterns selecting the output files to include in or exclude from
+    # the output archive and the maximum size of file to include.
+    _output_include = None
+    _output_exclude = None
+    _output_max_file_size = None
+    
+    # Whether to choose the node type, number of nodes and processes per 
+    # node automatically, the node types to choose from, the objective used 
+    # to choose between them and the memory, in MB, required per process.
+    _auto_placement = False
+    _node_types = None
+    _placement_objective = 'cost'
+    _memory_per_process = None
+    
+    # The time limit of the job in minutes and, on platforms with a batch 
+    # scheduler, the queue to submit the job to and the placement of its 
+    # processes on nodes, e.g. scatter:excl.
+    _time_limit_mins = None
+    _queue = None
+    _node_placement = None
 
     def __init__(self):
         '''
@@ -186,23 +218,163 @@ class JobConfiguration(object):
     @delete_job_files.setter
     def delete_job_files(self, value):
         self._delete_job_files = value
+        
+    @property
+    def bundle_inputs(self):
+        return self._bundle_inputs
+    
+    @bundle_inputs.setter
+    def bundle_inputs(self, value):
+        self._bundle_inputs = value
+        
+    @property
+    def bundle_compression(self):
+        return self._bundle_compression
+    
+    @bundle_compression.setter
+    def bundle_compression(self, value):
+        self._bundle_compression = value
+        
+    @property
+    def stream_output(self):
+        return self._stream_output
+    
+    @stream_output.setter
+    def stream_output(self, value):
+        self._stream_output = value
+        
+    @property
+    def extract_output(self):
+        return self._extract_output
+    
+    @extract_output.setter
+    def extract_output(self, value):
+        self._extract_output = value
+        
+    @property
+    def output_include(self):
+        return self._output_include
+    
+    @output_include.setter
+    def output_include(self, value):
+        self._output_include = value
+        
+    @property
+    def output_exclude(self):
+        return self._output_exclude
+    
+    @output_exclude.setter
+    def output_exclude(self, value):
+        self._output_exclude = value
+        
+    @property
+    def output_max_file_size(self):
+        return self._output_max_file_size
+    
+    @output_max_file_size.setter
+    def output_max_file_size(self, value):
+        self._output_max_file_size = value
+    
+    @property
+    def auto_placement(self):
+        return self._auto_placement
+    
+    @auto_placement.setter
+    def auto_placement(self, value):
+        self._auto_placement = value
+        
+    @property
+    def node_types(self):
+        return self._node_types
+    
+    @node_types.setter
+    def node_types(self, value):
+        self._node_types = value
+        
+    @property
+    def placement_objective(self):
+        return self._placement_objective
+    
+    @placement_objective.setter
+    def placement_objective(self, value):
+        if value not in PLACEMENT_OBJECTIVES:
+            raise ValueError('Placement objective <%s> is not one of <%s>.' 
+                             % (value, PLACEMENT_OBJECTIVES))
+        self._placement_objective = value
+        
+    @property
+    def memory_per_process(self):
+        return self._memory_per_process
+    
+    @memory_per_process.setter
+    def memory_per_process(self, value):
+        self._memory_per_process = int(value) if value else None
+        
+    @property
+    def time_limit_mins(self):
+        return self._time_limit_mins
+    
+    @time_limit_mins.setter
+    def time_limit_mins(self, value):
+        self._time_limit_mins = int(value) if value else None
+        
+    @property
+    def queue(self):
+        return self._queue
+    
+    @queue.setter
+    def queue(self, value):
+        self._queue = value
+        
+    @property
+    def node_placement(self):
+        return self._node_placement
+    
+    @node_placement.setter
+    def node_placement(self, value):
+        self._node_placement = value
     
     def get_info(self):
         conf_str = ('\nJob ID:\t\t\t\t%s\nInput files:\t\t\t%s\nArguments:'
                     '\t\t\t%s\nWorking directory:\t\t%s\n'
                     'Output file destination:\t%s\n\nNode type:\t\t\t%s\n'
                     'Number of processes:\t\t%s\nProcesses per node:\t\t%s\n'
-                    'Delete job files:\t\t%s\n' 
+                    'Delete job files:\t\t%s\nBundle inputs:\t\t\t%s\n'
+                    'Bundle compression:\t\t%s\nStream output:\t\t\t%s\n'
+                    'Extract output:\t\t\t%s\nOutput include:\t\t\t%s\n'
+                    'Output exclude:\t\t\t%s\nOutput max file size:\t\t%s\n'
+                    'Auto placement:\t\t\t%s\nNode types:\t\t\t%s\n'
+                    'Placement objective:\t\t%s\nMemory per process:\t\t%s\n'
+                    'Time limit (mins):\t\t%s\nQueue:\t\t\t\t%s\n'
+                    'Node placement:\t\t\t%s\n'
                     % (self._job_id, self._input_files, self.args, 
                        self._working_dir, self._output_file_destination,  
                        self._node_type, self._num_processes,
-                       self._processes_per_node, self._delete_job_files))
+                       self._processes_per_node, self._delete_job_files,
+                       self._bundle_inputs, self._bundle_compression,
+                       self._stream_output, self._extract_output,
+                       self._output_include, self._output_exclude,
+                       self._output_max_file_size, self._auto_placement,
+                       self._node_types, self._placement_objective,
+                       self._memory_per_process, self._time_limit_mins,
+                       self._queue, self._node_placement))
         return conf_str
     
     def print_info(self):
         conf_str = self.get_info()
         LOG.debug('\nBASE CONFIG INFO:\n----------------\n%s' % conf_str)
 
+    def to_dict(self):
+        '''
+        Get the job specification for this configuration, including its job 
+        ID, in the form accepted by from_dict, e.g. for storing the job.
+        '''
+        jobspec = {}
+        for name, value in JobConfiguration.__dict__.items():
+            if isinstance(value, property) and getattr(self, name) is not None:
+                jobspec[name] = getattr(self, name)
+        return {'libhpc_jobspec': jobspec}
+
     # A static method to build a Job Configuration class instance from a 
     # provided YAMML file containing a job specification.
     @staticmethod
@@ -217,7 +389,13 @@ class JobConfiguration(object):
         # Now create a new JobConfiguration and populate it with the values
         # from the YAML configuration.
         yaml_jobspec = yaml.load(yaml_jobspec_data)
-        
+        return JobConfiguration.from_dict(yaml_jobspec)
+    
+    # A static method to build a Job Configuration class instance from a job
+    # specification that has already been loaded, e.g. a job specification 
+    # template that has had the parameters of a sweep substituted into it.
+    @staticmethod
+    def from_dict(yaml_jobspec):
         key_list = []
         if yaml_jobspec.keys()[0] != 'libhpc_jobspec':
             raise JobConfigurationError('The root key of a job specification '
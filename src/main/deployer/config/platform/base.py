@@ -53,6 +53,11 @@ import yaml
 from pkg_resources import resource_listdir, resource_string
 
 from deployer.config import get_platform_config_class
+from deployer.core.connections import DEFAULT_CONNECTION_IDLE_TIMEOUT
+from deployer.core.lifecycle import (DEFAULT_STAGE_RETRIES, DEFAULT_RETRY_DELAY,
+                                     DEFAULT_RETRY_MAX_DELAY, 
+                                     DEFAULT_RETRY_BUDGET)
+from deployer.core.staging import DEFAULT_TRANSFER_THREADS
 
 import inspect
 
@@ -286,6 +291,18 @@ class PlatformConfig(object):
     _user_password = None
 
     _storage_job_directory = None
+    _storage_transfer_threads = DEFAULT_TRANSFER_THREADS
+    _storage_input_cache = False
+    _storage_input_cache_link = 'hard'
+    _storage_delta_transfer = False
+    
+    _connection_idle_timeout = DEFAULT_CONNECTION_IDLE_TIMEOUT
+    
+    _lifecycle_retries = DEFAULT_STAGE_RETRIES
+    _lifecycle_retry_delay = DEFAULT_RETRY_DELAY
+    _lifecycle_retry_max_delay = DEFAULT_RETRY_MAX_DELAY
+    _lifecycle_retry_budget = DEFAULT_RETRY_BUDGET
+    _lifecycle_keep_failed_resources = False
     
     #ec2_os_platforms = ['OPENSTACK','EC2']
 
@@ -363,12 +380,105 @@ class PlatformConfig(object):
     def storage_job_directory(self, value):
         self._storage_job_directory = value
 
+    @property
+    def storage_transfer_threads(self):
+        return self._storage_transfer_threads
+    
+    @storage_transfer_threads.setter
+    def storage_transfer_threads(self, value):
+        self._storage_transfer_threads = int(value)
+
+    @property
+    def storage_input_cache(self):
+        return self._storage_input_cache
+    
+    @storage_input_cache.setter
+    def storage_input_cache(self, value):
+        self._storage_input_cache = value
+
+    @property
+    def storage_input_cache_link(self):
+        return self._storage_input_cache_link
+    
+    @storage_input_cache_link.setter
+    def storage_input_cache_link(self, value):
+        self._storage_input_cache_link = value
+
+    @property
+    def storage_delta_transfer(self):
+        return self._storage_delta_transfer
+    
+    @storage_delta_transfer.setter
+    def storage_delta_transfer(self, value):
+        self._storage_delta_transfer = value
+
+    @property
+    def connection_idle_timeout(self):
+        return self._connection_idle_timeout
+    
+    @connection_idle_timeout.setter
+    def connection_idle_timeout(self, value):
+        self._connection_idle_timeout = int(value)
+
+    @property
+    def lifecycle_retries(self):
+        return self._lifecycle_retries
+    
+    @lifecycle_retries.setter
+    def lifecycle_retries(self, value):
+        self._lifecycle_retries = int(value)
+
+    @property
+    def lifecycle_retry_delay(self):
+        return self._lifecycle_retry_delay
+    
+    @lifecycle_retry_delay.setter
+    def lifecycle_retry_delay(self, value):
+        self._lifecycle_retry_delay = int(value)
+
+    @property
+    def lifecycle_retry_max_delay(self):
+        return self._lifecycle_retry_max_delay
+    
+    @lifecycle_retry_max_delay.setter
+    def lifecycle_retry_max_delay(self, value):
+        self._lifecycle_retry_max_delay = int(value)
+
+    @property
+    def lifecycle_retry_budget(self):
+        return self._lifecycle_retry_budget
+    
+    @lifecycle_retry_budget.setter
+    def lifecycle_retry_budget(self, value):
+        self._lifecycle_retry_budget = int(value)
+
+    @property
+    def lifecycle_keep_failed_resources(self):
+        return self._lifecycle_keep_failed_resources
+    
+    @lifecycle_keep_failed_resources.setter
+    def lifecycle_keep_failed_resources(self, value):
+        self._lifecycle_keep_failed_resources = value
+
     def get_info(self):
         conf_str = ('Type:\t\t%s\nID:\t\t%s\nName:\t\t%s\nHost:\t\t%s\n'
-                    'Port:\t\t%s\nJob directory:\t\t%s' 
+                    'Port:\t\t%s\nJob directory:\t\t%s\n'
+                    'Transfer threads:\t%s\nInput cache:\t\t%s (%s links)\n'
+                    'Delta transfer:\t\t%s\nConnection idle timeout:\t%s\n'
+                    'Lifecycle retries:\t%s (delay %s-%s s, budget %s s)\n'
+                    'Keep failed resources:\t%s' 
                     % (self._platform_type, self._platform_id, self._platform_name, 
                        self._platform_host, self._platform_port,
-                       self._storage_job_directory))
+                       self._storage_job_directory, 
+                       self._storage_transfer_threads,
+                       self._storage_input_cache, 
+                       self._storage_input_cache_link,
+                       self._storage_delta_transfer, 
+                       self._connection_idle_timeout,
+                       self._lifecycle_retries, self._lifecycle_retry_delay,
+                       self._lifecycle_retry_max_delay,
+                       self._lifecycle_retry_budget,
+                       self._lifecycle_keep_failed_resources))
         return conf_str
     
     def print_info(self):
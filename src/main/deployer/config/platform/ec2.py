@@ -49,6 +49,12 @@ Created on 27 Jul 2015
 import logging
 
 from deployer.config.platform.base import PlatformConfig
+from deployer.core.distribution import DISTRIBUTION_STRATEGIES
+from deployer.core.metadata_cache import DEFAULT_METADATA_CACHE_TTL
+from deployer.core.node_pool import DEFAULT_POOL_IDLE_TIMEOUT
+from deployer.core.probe import DEFAULT_PROBE_INITIAL_DELAY, \
+    DEFAULT_PROBE_MAX_DELAY, DEFAULT_PROBE_BACKOFF, DEFAULT_PROBE_JITTER, \
+    DEFAULT_PROBE_DEADLINE, DEFAULT_PROBE_CONNECT_TIMEOUT, DEFAULT_PROBE_THREADS
 
 LOG = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG,
@@ -83,6 +89,26 @@ class EC2PlatformConfig(PlatformConfig):
     _image_unconfigured_admin_key_user = None
     _image_unconfigured_admin_key_file = None
     
+    _image_cache = False
+    _image_cache_timeout = 1800
+    
+    _pool_size = 0
+    _pool_idle_timeout = DEFAULT_POOL_IDLE_TIMEOUT
+    
+    _shutdown_wait = True
+    
+    _metadata_cache_ttl = DEFAULT_METADATA_CACHE_TTL
+    
+    _distribution_strategy = 'sequential'
+    
+    _probe_initial_delay = DEFAULT_PROBE_INITIAL_DELAY
+    _probe_max_delay = DEFAULT_PROBE_MAX_DELAY
+    _probe_backoff = DEFAULT_PROBE_BACKOFF
+    _probe_jitter = DEFAULT_PROBE_JITTER
+    _probe_deadline = DEFAULT_PROBE_DEADLINE
+    _probe_connect_timeout = DEFAULT_PROBE_CONNECT_TIMEOUT
+    _probe_threads = DEFAULT_PROBE_THREADS
+    
     #===========================================================================
     # PROPERTIES SPECIFIC TO EC2/OPENSTACK PLATFORMS
     #===========================================================================
@@ -200,6 +226,54 @@ class EC2PlatformConfig(PlatformConfig):
     def image_unconfigured_admin_key_user(self, value):
         self._image_unconfigured_admin_key_user = value
                 
+    @property
+    def image_cache(self):
+        return self._image_cache
+    
+    @image_cache.setter
+    def image_cache(self, value):
+        self._image_cache = value
+    
+    @property
+    def image_cache_timeout(self):
+        return self._image_cache_timeout
+    
+    @image_cache_timeout.setter
+    def image_cache_timeout(self, value):
+        self._image_cache_timeout = int(value)
+    
+    @property
+    def pool_size(self):
+        return self._pool_size
+    
+    @pool_size.setter
+    def pool_size(self, value):
+        self._pool_size = int(value)
+    
+    @property
+    def pool_idle_timeout(self):
+        return self._pool_idle_timeout
+    
+    @pool_idle_timeout.setter
+    def pool_idle_timeout(self, value):
+        self._pool_idle_timeout = int(value)
+    
+    @property
+    def shutdown_wait(self):
+        return self._shutdown_wait
+    
+    @shutdown_wait.setter
+    def shutdown_wait(self, value):
+        self._shutdown_wait = value
+    
+    @property
+    def metadata_cache_ttl(self):
+        return self._metadata_cache_ttl
+    
+    @metadata_cache_ttl.setter
+    def metadata_cache_ttl(self, value):
+        self._metadata_cache_ttl = int(value)
+                
     @property
     def service_region(self):
         return self._region
@@ -208,6 +282,74 @@ class EC2PlatformConfig(PlatformConfig):
     def service_region(self, value):
         self._region = value
 
+    @property
+    def distribution_strategy(self):
+        return self._distribution_strategy
+    
+    @distribution_strategy.setter
+    def distribution_strategy(self, value):
+        if value not in DISTRIBUTION_STRATEGIES:
+            raise ValueError('The job data distribution strategy <%s> is not '
+                             'recognised, valid values are <%s>.' 
+                             % (value, ', '.join(DISTRIBUTION_STRATEGIES)))
+        self._distribution_strategy = value
+
+    @property
+    def probe_initial_delay(self):
+        return self._probe_initial_delay
+    
+    @probe_initial_delay.setter
+    def probe_initial_delay(self, value):
+        self._probe_initial_delay = float(value)
+
+    @property
+    def probe_max_delay(self):
+        return self._probe_max_delay
+    
+    @probe_max_delay.setter
+    def probe_max_delay(self, value):
+        self._probe_max_delay = float(value)
+
+    @property
+    def probe_backoff(self):
+        return self._probe_backoff
+    
+    @probe_backoff.setter
+    def probe_backoff(self, value):
+        self._probe_backoff = float(value)
+
+    @property
+    def probe_jitter(self):
+        return self._probe_jitter
+    
+    @probe_jitter.setter
+    def probe_jitter(self, value):
+        self._probe_jitter = float(value)
+
+    @property
+    def probe_deadline(self):
+        return self._probe_deadline
+    
+    @probe_deadline.setter
+    def probe_deadline(self, value):
+        self._probe_deadline = float(value)
+
+    @property
+    def probe_connect_timeout(self):
+        return self._probe_connect_timeout
+    
+    @probe_connect_timeout.setter
+    def probe_connect_timeout(self, value):
+        self._probe_connect_timeout = float(value)
+
+    @property
+    def probe_threads(self):
+        return self._probe_threads
+    
+    @probe_threads.setter
+    def probe_threads(self, value):
+        self._probe_threads = int(value)
+
     def get_info(self):
         basic_conf_str = PlatformConfig.get_info(self)
         os_conf_str = ('Key Name:\t\t%s\nPublic Key:\t\t%s\nAccess Key:\t\t%s\n'
@@ -216,7 +358,14 @@ class EC2PlatformConfig(PlatformConfig):
                        '%s\nAdmin key name:\t%s\nAdmin key file:\t%s\nAdmin '
                        'user:\t\t%s\nImage ID Conf\'d:\t%s\n\tImage OS:\t\t%s\n'
                        '\tImage flavour:\t\t%s'
-                       '\nRegion:\t\t\t%s' 
+                       '\nRegion:\t\t\t%s\nImage cache:\t\t%s (timeout %s)'
+                       '\nNode pool size:\t\t%s (idle timeout %s)'
+                       '\nShutdown wait:\t\t%s'
+                       '\nMetadata cache TTL:\t%s'
+                       '\nDistribution:\t\t%s'
+                       '\nProbe delay:\t\t%s-%s (x%s, jitter %s)'
+                       '\nProbe deadline:\t\t%s\nProbe timeout:\t\t%s'
+                       '\nProbe threads:\t\t%s' 
                        % (self._user_key_name, self._user_public_key,
                        self._access_key, self._secret_key, 
                        self._image_unconfigured_id, self._image_unconfigured_os,
@@ -226,7 +375,15 @@ class EC2PlatformConfig(PlatformConfig):
                        self._image_unconfigured_admin_key_user,  
                        self._image_preconfigured_id, 
                        self._image_preconfigured_os,
-                       self._image_preconfigured_flavour, self._region))
+                       self._image_preconfigured_flavour, self._region,
+                       self._image_cache, self._image_cache_timeout,
+                       self._pool_size, self._pool_idle_timeout,
+                       self._shutdown_wait, self._metadata_cache_ttl,
+                       self._distribution_strategy,
+                       self._probe_initial_delay, self._probe_max_delay,
+                       self._probe_backoff, self._probe_jitter,
+                       self._probe_deadline, self._probe_connect_timeout,
+                       self._probe_threads))
         
         return basic_conf_str + '\n\nOpenStack-specific config:\n' + os_conf_str
     
@@ -49,6 +49,7 @@ Created on 28 Jul 2015
 import logging
 
 from deployer.config.platform.base import PlatformConfig
+from deployer.core.pbs_resources import check_queue_rules, get_place_statement
 
 LOG = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG,
@@ -57,6 +58,15 @@ logging.basicConfig(level=logging.DEBUG,
 logging.getLogger(__name__).setLevel(logging.DEBUG)
 
 class PBSProPlatformConfig(PlatformConfig):
+    
+    # The rules used to choose the queue for a job, the queue used for jobs 
+    # that don't satisfy any rule, the default placement of a job's 
+    # processes on nodes and the template for the MPI launcher command that
+    # starts parallel jobs.
+    _pbs_queues = []
+    _pbs_default_queue = None
+    _pbs_placement = None
+    _pbs_mpi_launcher = None
 
     def __init__(self, *args, **kwargs):
         super(PBSProPlatformConfig, self).__init__(*args, **kwargs)
@@ -68,15 +78,51 @@ class PBSProPlatformConfig(PlatformConfig):
     # PROPERTIES SPECIFIC TO PBS PLATFORMS
     #===========================================================================
     
-    # There are currently no properties configured that are specific to PBS
-    # platforms. All necessary properties can be handled by the base config.
+    @property
+    def pbs_queues(self):
+        return self._pbs_queues
+    
+    @pbs_queues.setter
+    def pbs_queues(self, value):
+        check_queue_rules(value)
+        self._pbs_queues = value
+    
+    @property
+    def pbs_default_queue(self):
+        return self._pbs_default_queue
+    
+    @pbs_default_queue.setter
+    def pbs_default_queue(self, value):
+        self._pbs_default_queue = value
+    
+    @property
+    def pbs_placement(self):
+        return self._pbs_placement
+    
+    @pbs_placement.setter
+    def pbs_placement(self, value):
+        if value:
+            get_place_statement(value)
+        self._pbs_placement = value
+    
+    @property
+    def pbs_mpi_launcher(self):
+        return self._pbs_mpi_launcher
+    
+    @pbs_mpi_launcher.setter
+    def pbs_mpi_launcher(self, value):
+        self._pbs_mpi_launcher = value
     
     def get_info(self):
         basic_conf_str = PlatformConfig.get_info(self)
         pbs_conf_str = ('\nKey File:\t%s\nUser ID:\t%s\nPassword:\t%s\n'
-                       % (self._key_file, self._user, '****************'))
-        return basic_conf_str + pbs_conf_str + ('\n\nThere are currently no ' +
-        'PBS-specific parameters to display for this PBS platform.')
+                       % (self._user_key_file, self._user_id, 
+                          '****************'))
+        return basic_conf_str + pbs_conf_str + (
+                    '\nQueue rules:\t%s\nDefault queue:\t%s\n'
+                    'Placement:\t%s\nMPI launcher:\t%s' 
+                    % (self._pbs_queues, self._pbs_default_queue, 
+                       self._pbs_placement, self._pbs_mpi_launcher))
     
     def print_info(self):
         LOG.debug('\n\n' + self.get_info())
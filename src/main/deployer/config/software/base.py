@@ -272,11 +272,39 @@ class SoftwareConfigManager(object):
         return items
         
     
+# The ways in which a software configuration can be deployed. With 'commands',
+# each install command is run on the remote resource individually. With 
+# 'script', the configuration is compiled into a single install script that is
+# uploaded and run once on each resource.
+SOFTWARE_INSTALL_MODES = ['commands', 'script']
+
+# Prefix of the lines written by an install script to report the exit status 
+# of each step, e.g. "LIBHPC_STEP apt_update 0"
+INSTALL_STEP_MARKER = 'LIBHPC_STEP'
+
+def parse_install_script_output(output):
+    '''
+    Get the status of each step run by an install script from the script's
+    output. Returns a list of (step name, exit code) tuples in the order the
+    steps were run. Steps after a failed step are not run.
+    '''
+    steps = []
+    for line in (output or '').splitlines():
+        parts = line.strip().split()
+        if len(parts) == 3 and parts[0] == INSTALL_STEP_MARKER:
+            try:
+                steps.append((parts[1], int(parts[2])))
+            except ValueError:
+                LOG.warning('Unable to parse install step status line <%s>.' 
+                            % line)
+    return steps
+
 class SoftwareConfig(object):
     _software_id = None
     _software_name = None
     _software_os_type = None
     _software_os_flavour = None
+    _software_install_mode = 'commands'
     #_software_package_manager = None
 
     def __init__(self, sid, sname, s_os, s_osflavour):
@@ -301,15 +329,37 @@ class SoftwareConfig(object):
     def software_os_flavour(self):
         return self._software_os_flavour
     
+    @property
+    def software_install_mode(self):
+        return self._software_install_mode
+    
+    @software_install_mode.setter
+    def software_install_mode(self, value):
+        if value not in SOFTWARE_INSTALL_MODES:
+            raise ValueError('The software install mode <%s> is not '
+                             'recognised, valid values are <%s>.' 
+                             % (value, ', '.join(SOFTWARE_INSTALL_MODES)))
+        self._software_install_mode = value
+    
     # To be overriden by subclasses
     def get_install_commands(self):
         return []
     
+    # To be overriden by subclasses that support the 'script' install mode. 
+    # Returns the content of a shell script that carries out the complete 
+    # installation, reporting the exit status of each step on a line of the 
+    # form "<INSTALL_STEP_MARKER> <step name> <exit code>".
+    def get_install_script(self):
+        raise NotImplementedError('The software configuration <%s> does not '
+                                  'support script-based installation.' 
+                                  % self._software_id)
+    
     def get_info(self):
         conf_str = ('ID:\t\t%s\nName:\t\t%s\nOS Type:\t%s\n'
-                    'OS Flavour:\t%s' 
+                    'OS Flavour:\t%s\nInstall mode:\t%s' 
                     % (self._software_id, self._software_name, 
-                       self._software_os_type, self._software_os_flavour))
+                       self._software_os_type, self._software_os_flavour,
+                       self._software_install_mode))
         return conf_str
     
     def print_info(self):
@@ -52,8 +52,10 @@ system.
 Currently provides an implementation only for Apt.
 '''
 import logging
+import pipes
 
-from deployer.config.software.base import SoftwareConfig, SoftwareConfigFile
+from deployer.config.software.base import SoftwareConfig, SoftwareConfigFile,\
+    INSTALL_STEP_MARKER
 
 LOG = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG,
@@ -61,6 +63,9 @@ logging.basicConfig(level=logging.DEBUG,
                     datefmt='%m-%d %H:%M')
 logging.getLogger(__name__).setLevel(logging.DEBUG)
 
+# Delimiter for the here-documents used to write file data in install scripts
+SCRIPT_DATA_DELIMITER = 'LIBHPC_DATA_EOF'
+
 class LinuxAPTConfig(SoftwareConfig):
     '''
     A software configuration class that extends the base software 
@@ -85,9 +90,10 @@ class LinuxAPTConfig(SoftwareConfig):
     
     @software_apt_config.setter
     def software_apt_config(self, value):
+        # The key for a source is optional
         if type(value) == type([]):
-            for item in value:
-                self._software_apt_config.append((item['source'], item['key']))
+            self._software_apt_config = [(item['source'], item.get('key')) 
+                                         for item in value]
         
     @property
     def software_packages(self):
@@ -107,8 +113,9 @@ class LinuxAPTConfig(SoftwareConfig):
             key = item[1]
             # Add the configuration to create the remote key file on the server
             remote_keyfile = '/tmp/pubkey' + str(id)
-            file_config = SoftwareConfigFile(key, remote_keyfile)
-            install_commands.append(file_config)
+            if key:
+                file_config = SoftwareConfigFile(key, remote_keyfile)
+                install_commands.append(file_config)
             
             # Add the configuration to create the remote sources.list entry
             remote_sources_file = ('/etc/apt/sources.list.d/%s%s.list'
@@ -117,8 +124,9 @@ class LinuxAPTConfig(SoftwareConfig):
             install_commands.append(source_file_config)
             
             # Now set up the commands to register the key and update apt
-            install_commands.append('cat %s | sudo apt-key add -; rm -f %s'
-                                    % (remote_keyfile, remote_keyfile))
+            if key:
+                install_commands.append('cat %s | sudo apt-key add -; rm -f %s'
+                                        % (remote_keyfile, remote_keyfile))
             install_commands.append('sudo apt-get update')
             
             id+=1
@@ -134,13 +142,72 @@ class LinuxAPTConfig(SoftwareConfig):
         
         return install_commands
     
+    def get_install_script(self):
+        '''
+        Get a shell script, to be run as root, that carries out the complete
+        installation. All the apt keys and sources are registered first, 
+        followed by a single apt-get update and a single apt-get install. 
+        Each step overwrites any files written by a previous run so the 
+        script can safely be run again. The script reports the exit status of 
+        each step and stops at the first step that fails.
+        '''
+        lines = ['#!/bin/sh',
+                 '# Install script for software <%s>' % self._software_id,
+                 'export DEBIAN_FRONTEND=noninteractive',
+                 '',
+                 'run_step() {',
+                 '    "$2"',
+                 '    status=$?',
+                 '    echo "%s $1 $status"' % INSTALL_STEP_MARKER,
+                 '    [ $status -eq 0 ] || exit $status',
+                 '}',
+                 '']
+        steps = []
+        
+        def _add_step(name, commands):
+            lines.append('step_%s() {' % name)
+            lines.extend(commands)
+            lines.append('}')
+            steps.append(name)
+        
+        for id, (source, key) in enumerate(self._software_apt_config):
+            if key:
+                remote_keyfile = '/tmp/libhpc-pubkey%s' % id
+                _add_step('apt_key_%s' % id, 
+                          ["cat > %s <<'%s'" % (remote_keyfile, 
+                                                SCRIPT_DATA_DELIMITER),
+                           key.rstrip('\n'),
+                           SCRIPT_DATA_DELIMITER,
+                           'apt-key add %s && rm -f %s' 
+                           % (remote_keyfile, remote_keyfile)])
+            remote_sources_file = ('/etc/apt/sources.list.d/%s%s.list'
+                                   % (self._software_name, id))
+            _add_step('apt_source_%s' % id, 
+                      ["printf '%%s\\n' %s > %s" 
+                       % (pipes.quote(source.strip()), 
+                          pipes.quote(remote_sources_file))])
+        
+        _add_step('apt_update', ['apt-get update'])
+        packages = ' '.join([pipes.quote(p) for p in self._software_packages])
+        _add_step('apt_install', ['apt-get install -y %s' % packages])
+        
+        lines.append('')
+        for name in steps:
+            lines.append('run_step %s step_%s' % (name, name))
+        lines.append('')
+        
+        script = '\n'.join(lines)
+        LOG.debug('INSTALL SCRIPT FOR CONFIGURATION:\n%s' % script)
+        return script
+    
     def get_info(self):
         base_info = SoftwareConfig.get_info(self)
         base_info += ('\n\nParameters specific to Linux/APT platforms:\n\n'
                       'Sources: \n')
         
         for source, key in self._software_apt_config:
-            base_info += '\tSource:\t\t%s,\t\tKey:%s...' % (source, key[0:10])
+            base_info += '\tSource:\t\t%s,\t\tKey:%s...' % (source, 
+                                                           (key or '')[0:10])
         
         base_info += 'Packages:\n'
         
@@ -0,0 +1,271 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Management of persistent connections to remote hosts.
+
+Rather than each stage of a job's lifecycle opening, and closing, its own 
+connections to a remote host, a deployer holds a ConnectionManager that 
+keeps the connections it has opened, e.g. SAGA PTYShell objects, for reuse 
+by later stages. Connections are reference counted: a connection that is 
+in use is never handed out again and an unused connection is closed once it
+has been idle for longer than the manager's idle timeout. Connections 
+opened with the same SAGA session share a single authenticated SSH master 
+connection to the host, with each connection using its own channel.
+
+Commands that run the OpenSSH tools directly can share an OpenSSH control 
+master connection for each host using the options returned by 
+get_control_options.
+'''
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from deployer.core.utils import get_libhpc_dir
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+DEFAULT_CONNECTION_IDLE_TIMEOUT = 300
+
+def get_control_options(idle_timeout=DEFAULT_CONNECTION_IDLE_TIMEOUT, 
+                        control_dir=None):
+    '''
+    Get the ssh options for sharing an OpenSSH control master connection 
+    between commands to the same host. The master connection is closed by 
+    ssh once it has been idle for idle_timeout seconds.
+    '''
+    if not control_dir:
+        control_dir = get_libhpc_dir('cm')
+    # %C is a hash of the connection details which keeps the socket path 
+    # short enough for the Unix socket path length limit.
+    return {'ControlMaster': 'auto',
+            'ControlPath': os.path.join(control_dir, '%C'),
+            'ControlPersist': str(int(idle_timeout))}
+
+class ManagedConnection(object):
+    '''
+    A connection handed out by a ConnectionManager. Attributes are looked 
+    up on the underlying connection. Calling finalize() or release() returns
+    the connection to the manager rather than closing it so that code that 
+    finalizes the connections it uses, e.g. parallel.run_parallel, can use 
+    managed connections unchanged. Calling release(broken=True) closes a 
+    connection that can no longer be used rather than returning it. Only the 
+    first release, or finalize, of a connection that has been acquired has 
+    any effect.
+    '''
+    
+    def __init__(self, manager, key, connection):
+        self._manager = manager
+        self._key = key
+        self.connection = connection
+        self.last_used = None
+        self.released = False
+    
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+    
+    def release(self, broken=False):
+        if broken:
+            self._manager.discard(self)
+        else:
+            self._manager.release(self)
+    
+    def finalize(self, *args, **kwargs):
+        self.release()
+
+class ConnectionManager(object):
+    '''
+    Keeps connections to remote hosts open for reuse. open_func is called as
+    open_func(host, user_id, session) to open a new connection and 
+    close_func(connection) to close one. By default, connections are closed
+    by calling their finalize() function. Idle connections are checked for 
+    expiry whenever a connection is acquired or released.
+    '''
+    
+    def __init__(self, open_func, close_func=None, 
+                 idle_timeout=DEFAULT_CONNECTION_IDLE_TIMEOUT, 
+                 time_func=time.time):
+        self._open = open_func
+        self._close_func = close_func
+        self.idle_timeout = idle_timeout
+        self._time = time_func
+        self._lock = threading.Lock()
+        # Idle connections and the number of connections in use by key
+        self._idle = {}
+        self._in_use = {}
+        self.opened = 0
+    
+    def _get_key(self, host, user_id, session):
+        # Connections opened with different sessions use different 
+        # credentials so they can't be shared.
+        return (host, user_id, id(session) if session is not None else None)
+    
+    def acquire(self, host, user_id=None, session=None):
+        '''
+        Get a connection to host, reusing an idle connection if there is one.
+        The connection must be released, or finalized, when no longer needed.
+        '''
+        key = self._get_key(host, user_id, session)
+        self.expire_idle()
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+            self._in_use[key] = self._in_use.get(key, 0) + 1
+            if conn:
+                conn.released = False
+        if conn:
+            LOG.debug('Reusing connection to <%s>.' % host)
+            return conn
+        try:
+            raw_conn = self._open(host, user_id, session)
+        except Exception:
+            with self._lock:
+                self._in_use[key] -= 1
+            raise
+        with self._lock:
+            self.opened += 1
+        LOG.debug('Opened new connection to <%s>.' % host)
+        return ManagedConnection(self, key, raw_conn)
+    
+    def release(self, conn):
+        '''
+        Return a connection to the manager, it becomes idle if it isn't used 
+        by anyone else. Releasing a connection that has already been released
+        has no effect.
+        '''
+        with self._lock:
+            if conn.released:
+                return
+            conn.released = True
+            self._in_use[conn._key] -= 1
+            conn.last_used = self._time()
+            self._idle.setdefault(conn._key, []).append(conn)
+        self.expire_idle()
+    
+    def discard(self, conn):
+        '''
+        Close a connection that is no longer usable, e.g. after an error, 
+        rather than returning it to the manager. Discarding a connection that 
+        has already been released has no effect.
+        '''
+        with self._lock:
+            if conn.released:
+                return
+            conn.released = True
+            self._in_use[conn._key] -= 1
+        self._close(conn)
+    
+    @contextmanager
+    def connection(self, host, user_id=None, session=None):
+        conn = self.acquire(host, user_id, session)
+        try:
+            yield conn
+        except Exception:
+            self.discard(conn)
+            raise
+        else:
+            self.release(conn)
+    
+    def factory(self, host, user_id=None, session=None):
+        '''
+        Get a function that acquires a connection to host, for use as a 
+        connection factory by parallel.run_parallel or an InputStager.
+        '''
+        return lambda: self.acquire(host, user_id, session)
+    
+    def expire_idle(self):
+        '''
+        Close connections that have been idle for longer than the idle 
+        timeout. Returns the number of connections closed.
+        '''
+        now = self._time()
+        expired = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                keep = [c for c in idle if now - c.last_used <= self.idle_timeout]
+                expired += [c for c in idle if c not in keep]
+                self._idle[key] = keep
+        for conn in expired:
+            LOG.debug('Closing connection to <%s> after <%d> seconds idle.' 
+                      % (conn._key[0], now - conn.last_used))
+            self._close(conn)
+        return len(expired)
+    
+    def get_counts(self, host, user_id=None, session=None):
+        '''
+        Get the number of connections to host that are in use and idle.
+        '''
+        key = self._get_key(host, user_id, session)
+        with self._lock:
+            return (self._in_use.get(key, 0), len(self._idle.get(key, [])))
+    
+    def close_all(self):
+        '''
+        Close all idle connections. Connections that are in use are closed 
+        by their users.
+        '''
+        with self._lock:
+            idle = [c for conns in self._idle.values() for c in conns]
+            self._idle = {}
+        for conn in idle:
+            self._close(conn)
+        if idle:
+            LOG.debug('Closed <%d> connection(s).' % len(idle))
+    
+    def _close(self, conn):
+        try:
+            if self._close_func:
+                self._close_func(conn.connection)
+            else:
+                conn.connection.finalize()
+        except Exception as e:
+            LOG.debug('Error closing connection to <%s>: %s' 
+                      % (conn._key[0], str(e)))
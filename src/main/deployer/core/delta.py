@@ -0,0 +1,261 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Delta transfer of job input files.
+
+When an input file has previously been sent to a platform, the copy from the
+previous job is used as the basis for the new transfer. The previous copy is 
+duplicated into the new job directory on the remote platform and rsync is 
+then used to update it. rsync computes block checksums of the remote copy and
+only sends the blocks of the local file that have changed. Files with no 
+previous remote copy are sent in full.
+
+The location of the most recent remote copy of each local file, and the 
+number of bytes saved for each job, are recorded in a per-platform index in 
+the user's .libhpc directory. This requires rsync on both the client and the
+remote platform.
+'''
+import json
+import logging
+import os
+import pipes
+import re
+import subprocess
+import threading
+
+from deployer.core.exceptions import JobError
+from deployer.core.ssh import get_ssh_command_string, split_host_port
+from deployer.core.utils import get_libhpc_dir
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+RSYNC_STATS_PATTERNS = {
+    'literal': re.compile(r'Literal data:\s*([\d,]+)'),
+    'matched': re.compile(r'Matched data:\s*([\d,]+)'),
+}
+
+def parse_rsync_stats(output):
+    '''
+    Parse the literal (sent) and matched (not sent) data sizes in bytes from
+    the output of rsync --stats. Returns a (literal, matched) tuple.
+    '''
+    values = {}
+    for key, pattern in RSYNC_STATS_PATTERNS.items():
+        match = pattern.search(output)
+        values[key] = int(match.group(1).replace(',', '')) if match else 0
+    return (values['literal'], values['matched'])
+
+class RemoteCopyIndex(object):
+    '''
+    A persistent record, for a single platform, of the most recent remote 
+    copy of each local input file and the transfer statistics for each job.
+    '''
+    
+    def __init__(self, platform_id, index_file=None):
+        if not index_file:
+            index_file = os.path.join(get_libhpc_dir('cache', 'delta'),
+                                      '%s.json' % platform_id)
+        self.index_file = index_file
+        self._lock = threading.Lock()
+        self._index = {'files': {}, 'jobs': {}}
+        if os.path.exists(index_file):
+            try:
+                with open(index_file, 'r') as f:
+                    self._index = json.load(f)
+            except ValueError as e:
+                LOG.warning('Ignoring corrupt delta transfer index <%s>: %s' 
+                            % (index_file, str(e)))
+    
+    def get_previous_copy(self, local_path):
+        with self._lock:
+            return self._index['files'].get(os.path.abspath(local_path))
+    
+    def set_previous_copy(self, local_path, remote_path):
+        with self._lock:
+            self._index['files'][os.path.abspath(local_path)] = remote_path
+    
+    def get_job_stats(self, job_id):
+        with self._lock:
+            return self._index['jobs'].get(job_id)
+    
+    def record_job_stats(self, job_id, stats):
+        with self._lock:
+            self._index['jobs'][job_id] = stats
+    
+    def save(self):
+        with self._lock:
+            tmp_file = '%s.%s.tmp' % (self.index_file, os.getpid())
+            with open(tmp_file, 'w') as f:
+                json.dump(self._index, f)
+            os.rename(tmp_file, self.index_file)
+
+class RsyncTransfer(object):
+    '''
+    A connection object for use with an InputStager that sends each file 
+    using rsync's delta transfer algorithm against an existing remote file of
+    the same name. The number of bytes sent and matched are added to the 
+    provided stats dictionary.
+    '''
+    
+    def __init__(self, host, user_id, key_file, stats, stats_lock, 
+                 ssh_options=None):
+        self.host, self.port = split_host_port(host)
+        self.user_id = user_id
+        self.key_file = key_file
+        self.ssh_options = ssh_options
+        self.stats = stats
+        self.stats_lock = stats_lock
+    
+    def stage_to_remote(self, src, tgt):
+        ssh_cmd = get_ssh_command_string(self.host, self.user_id, 
+                                         self.key_file, self.port,
+                                         self.ssh_options)
+        target = '%s:%s' % (self.host, tgt)
+        if self.user_id:
+            target = '%s@%s' % (self.user_id, target)
+        cmd = ['rsync', '--times', '--inplace', '--no-whole-file', 
+               '--protect-args', '--stats', '-e', ssh_cmd, src, target]
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, 
+                                stderr=subprocess.STDOUT)
+        out, _ = proc.communicate()
+        if proc.returncode != 0:
+            raise JobError('rsync of <%s> to <%s> failed with exit code <%s>: '
+                           '%s' % (src, target, proc.returncode, out))
+        literal, matched = parse_rsync_stats(out)
+        LOG.debug('Delta transfer of <%s>: <%s> bytes sent, <%s> bytes '
+                  'matched remotely.' % (src, literal, matched))
+        with self.stats_lock:
+            self.stats['bytes_sent'] += literal
+            self.stats['bytes_saved'] += matched
+
+class DeltaStager(object):
+    '''
+    Stages input files using delta transfers where a previous remote copy of
+    a file is available and full transfers otherwise. 
+    
+    connection must provide the run_sync and write_to_remote functions of the 
+    SAGA-Python PTYShell class. full_stager and delta_stager are InputStager 
+    instances, the latter using RsyncTransfer connections that share the 
+    stats dictionary passed here.
+    '''
+    
+    def __init__(self, connection, full_stager, delta_stager, index, stats):
+        self.connection = connection
+        self.full_stager = full_stager
+        self.delta_stager = delta_stager
+        self.index = index
+        self.stats = stats
+    
+    def _prepare_basis_files(self, candidates, work_dir):
+        # Copy the previous remote version of each candidate file to its 
+        # target location using a single remote command. Returns the set of
+        # targets for which a previous version existed.
+        if not candidates:
+            return set()
+        list_file = os.path.join(work_dir, '.delta-basis')
+        # Each basis and target path are written on separate lines since 
+        # either may contain spaces. 
+        self.connection.write_to_remote(
+            '\n'.join(['%s\n%s' % (basis, target) 
+                       for basis, target in candidates]) + '\n', list_file)
+        cmd = ('while read -r b && read -r t; do [ -f "$b" ] && '
+               'cp -p "$b" "$t" && echo "BASIS $t"; done < %(list)s; '
+               'rm -f %(list)s' % {'list': pipes.quote(list_file)})
+        ret, out, err = self.connection.run_sync(cmd)
+        found = set()
+        for line in out.splitlines():
+            line = line.strip()
+            if line.startswith('BASIS '):
+                found.add(line[len('BASIS '):])
+        return found
+    
+    def stage(self, local_files, remote_dir, job_id):
+        '''
+        Stage local_files to remote_dir and record the transfer statistics 
+        for job_id. Returns the remote paths of the staged files in the same
+        order as local_files.
+        '''
+        if not local_files:
+            return []
+        
+        remote_paths = [os.path.join(remote_dir, os.path.basename(f)) 
+                        for f in local_files]
+        candidates = []
+        for local_file, remote_path in zip(local_files, remote_paths):
+            previous = self.index.get_previous_copy(local_file)
+            if previous and previous != remote_path:
+                candidates.append((previous, remote_path))
+        
+        with_basis = self._prepare_basis_files(candidates, remote_dir)
+        delta_transfers = []
+        full_transfers = []
+        for local_file, remote_path in zip(local_files, remote_paths):
+            if remote_path in with_basis:
+                delta_transfers.append((local_file, remote_path))
+            else:
+                full_transfers.append((local_file, remote_path))
+        
+        LOG.debug('Delta staging: <%s> files have a previous remote copy, '
+                  '<%s> files will be sent in full.' 
+                  % (len(delta_transfers), len(full_transfers)))
+        self.full_stager.stage_to(full_transfers)
+        self.delta_stager.stage_to(delta_transfers)
+        
+        self.stats['bytes_sent'] += sum([os.path.getsize(local_file) for 
+                                         local_file, _ in full_transfers])
+        for local_file, remote_path in zip(local_files, remote_paths):
+            self.index.set_previous_copy(local_file, remote_path)
+        self.index.record_job_stats(job_id, dict(self.stats))
+        self.index.save()
+        
+        LOG.info('Input staging for job <%s>: <%s> bytes sent, <%s> bytes '
+                 'saved by delta transfer.' 
+                 % (job_id, self.stats['bytes_sent'], self.stats['bytes_saved']))
+        return remote_paths
@@ -47,12 +47,29 @@ Created on 31 Jul 2015
 @author: jcohen02
 '''
 import os
+import copy
 import logging
+import pipes
+import threading
 import urlparse
 import saga
 from saga.job import Description, Service
-from deployer.core.exceptions import ResourceInitialisationError
+from deployer.core.exceptions import ResourceInitialisationError, JobError,\
+    FileTransferError
+from deployer.core.staging import InputStager, create_input_bundle,\
+    get_bundle_extract_command
+from deployer.core.input_cache import LocalHashCache, RemoteInputStore,\
+    INPUT_CACHE_DIRECTORY
+from deployer.core.delta import DeltaStager, RemoteCopyIndex, RsyncTransfer
+from deployer.core.ssh import get_ssh_command
+from deployer.core.output import get_output_archive_command,\
+    stream_output_archive
+from deployer.core.future import DeploymentFuture, run_async
+from deployer.core.connections import ConnectionManager, get_control_options
+from deployer.core.monitor import JobMonitor, get_native_job_id
+from deployer.config.software.base import SoftwareConfigManager
 from saga.filesystem import File
+from saga.utils.pty_shell import PTYShell
 
 
 
@@ -74,14 +91,30 @@ class JobDeploymentBase(object):
     
     The stages of the deployment process are:
     
-    start_resources -> initialise_resources -> deploy_software -> 
-    transfer_files -> run_job -> collect_output -> shutdown_resources
+    start_resources -> initialise_resources -> prepare_resources -> 
+    deploy_software -> transfer_files -> run_job -> collect_output -> 
+    shutdown_resources
+    
+    deploy_software and transfer_files don't depend on each other and may be 
+    run concurrently, e.g. by deployer.core.lifecycle.LifecycleExecutor.
     
     '''
 
     platform_config = None
     job_config = None
     running_nodes = None
+    input_bundle_path = None
+    prepared_software_configs = None
+    job_future = None
+    # Set once the job's directory has been created on the remote platform
+    job_dir_created = False
+    # Set by platforms that can run a set of jobs as a single job array 
+    # using run_job_array
+    supports_job_arrays = False
+    
+    _resource_future = None
+    _connections = None
+    _job_services = None
 
     def __init__(self, platform_config):
         '''
@@ -96,12 +129,132 @@ class JobDeploymentBase(object):
         
         self.session = saga.Session(default = False)
     
+    @property
+    def connections(self):
+        '''
+        The connection manager holding the connections opened to remote 
+        hosts by this deployer. Connections are kept open, and reused by 
+        later lifecycle stages, until they have been idle for the platform's
+        connection_idle_timeout or close_connections is called.
+        '''
+        if not self._connections:
+            self._connections = ConnectionManager(
+                        self._open_connection,
+                        idle_timeout=self.platform_config.connection_idle_timeout)
+        return self._connections
+    
+    def _open_connection(self, host, user_id, session):
+        url = ('ssh://%s@%s/' % (user_id, host) if user_id 
+               else 'ssh://%s/' % host)
+        return PTYShell(url, session=session or self.session)
+    
+    def _get_job_service(self, host):
+        # Job services are kept for each host so that running a job and 
+        # archiving its output use the same connection.
+        if self._job_services is None:
+            self._job_services = {}
+        if host not in self._job_services:
+            self._job_services[host] = Service('ssh://%s/' % host, 
+                                               session=self.session)
+        return self._job_services[host]
+    
+    def _get_ssh_options(self):
+        # Options for commands that run ssh directly so that they share an 
+        # OpenSSH control master connection to each host.
+        return get_control_options(
+                            self.platform_config.connection_idle_timeout)
+    
+    def close_connections(self):
+        '''
+        Close the connections opened by this deployer that aren't in use.
+        '''
+        if self._connections:
+            self._connections.close_all()
+        if self._job_services:
+            for svc in self._job_services.values():
+                try:
+                    svc.close()
+                except Exception as e:
+                    LOG.debug('Error closing job service: %s' % str(e))
+            self._job_services = {}
+    
     def get_platform_configuration(self):
         return self.platform_config
     
     def set_job_config(self, jc):
         self.job_config = jc
     
+    def get_job_deployer(self, job_config):
+        '''
+        Get a deployer for running a further job, e.g. one job of a parameter
+        sweep, on the resources that this deployer has initialised and 
+        prepared. The job deployer shares this deployer's session, 
+        connections and resources but has its own job state so that several 
+        jobs can run on the resources at once. The resources are shut down 
+        by this deployer, not by its job deployers.
+        '''
+        # Create the shared connection state before it is copied so that it
+        # isn't created separately by each job deployer.
+        self.connections
+        if self._job_services is None:
+            self._job_services = {}
+        job_deployer = copy.copy(self)
+        if job_config is not self.job_config:
+            for attr in ['job', 'input_bundle_path', 
+                         'prepared_software_configs', 
+                         'transferred_input_files', 'input_transfer_stats',
+                         'job_future', 'job_dir_created']:
+                job_deployer.__dict__.pop(attr, None)
+        job_deployer.set_job_config(job_config)
+        return job_deployer
+    
+    def get_deployment_state(self):
+        '''
+        Get the state of this deployment that is needed to resume the job's 
+        lifecycle in another process, e.g. after the process that started 
+        the job has exited, as a JSON-serialisable dictionary.
+        '''
+        state = {'job_dir_created': self.job_dir_created}
+        if getattr(self, 'transferred_input_files', None) is not None:
+            state['transferred_input_files'] = self.transferred_input_files
+        if getattr(self, 'job', None) is not None:
+            state['remote_job_id'] = self.job.id
+        return state
+    
+    def restore_deployment_state(self, state):
+        '''
+        Restore the deployment state obtained from get_deployment_state so 
+        that the job's remaining lifecycle stages can be run. The job 
+        configuration must have been set. 
+        '''
+        self.job_dir_created = state.get('job_dir_created', False)
+        if 'transferred_input_files' in state:
+            self.transferred_input_files = state['transferred_input_files']
+        if state.get('remote_job_id'):
+            self.job = self._get_remote_job(state['remote_job_id'])
+            LOG.debug('Reattached to remote job <%s>.' 
+                      % state['remote_job_id'])
+    
+    def _get_remote_job(self, remote_job_id):
+        # Get the SAGA job object for a job started by run_job
+        return self._get_job_service(
+                            self._get_master_host()).get_job(remote_job_id)
+    
+    def _get_output_host(self):
+        # Work out whether we have an array of running nodes (e.g. cloud nodes)
+        # or whether we're dealing with a single host. If the former is true 
+        # then we get the IP/hostname of the target resource from the 
+        # running_nodes array, otherwise we can just use the host variable.
+        # Platforms that connect on a non-default port include it here.
+        return self._get_master_host()
+    
+    def _get_master_host(self):
+        # The host that jobs are run from, the first of the running nodes, 
+        # e.g. cloud nodes, or the platform's host.
+        if getattr(self, 'running_nodes', None):
+            return self.running_nodes[0][0].public_ips[0]
+        return self.host
+    
     def start_resources(self):
         pass
     
@@ -113,20 +266,253 @@ class JobDeploymentBase(object):
                     'been provided. Register your job configuration using '
                     'set_job_config() before beginning the job lifecycle.')
     
+    def initialise_resources_async(self, state_callback=None, **kwargs):
+        '''
+        Run initialise_resources, with the provided keyword arguments, in the
+        background and return a DeploymentFuture for its result. If provided,
+        state_callback is called as state_callback(state, info) as the 
+        resources are requested, running, reachable and have had their 
+        machinefile installed. Not all platforms report every state.
+        '''
+        future = DeploymentFuture()
+        if state_callback:
+            future.add_state_callback(state_callback)
+        self._resource_future = future
+        return run_async(self.initialise_resources, future=future, **kwargs)
+    
+    def _notify_resource_state(self, state, info=None):
+        if self._resource_future:
+            self._resource_future.set_state(state, info)
+    
+    def prepare_job(self, software_config=None):
+        '''
+        Carry out the local preparation for a job that doesn't require the 
+        remote resources so that it can be done while they are starting. If 
+        bundle_inputs is set in the job configuration, the input bundle is 
+        created. The specified software configuration(s) are loaded and 
+        stored in self.prepared_software_configs for use by deploy_software.
+        '''
+        if (self.job_config.bundle_inputs and self.job_config.input_files 
+            and not self.input_bundle_path):
+            self.input_bundle_path = create_input_bundle(
+                                        self.job_config.input_files,
+                                        self.job_config.job_id + '-inputs',
+                                        self.job_config.bundle_compression)
+            LOG.debug('Prepared input bundle <%s>.' % self.input_bundle_path)
+        
+        if software_config:
+            if type(software_config) != type([]):
+                software_config = [software_config]
+            scm = SoftwareConfigManager.get_instance()
+            scm.init_configuration()
+            self.prepared_software_configs = {}
+            for sc in software_config:
+                try:
+                    self.prepared_software_configs[sc] = \
+                                    scm.get_software_configuration(sc)
+                except ValueError as e:
+                    raise JobError('Job error - no software could be found for '
+                                   'the configuration id <%s>: %s' 
+                                   % (sc, str(e)))
+            LOG.debug('Prepared software configuration(s) <%s>.' 
+                      % ', '.join(software_config))
+    
+    def prepare_resources(self):
+        '''
+        Carry out any configuration of the resources that transfer_files 
+        depends on, e.g. creating the job account on newly started resources.
+        This is separate from deploy_software so that software deployment and
+        file transfer can run concurrently. Implementations may also call this
+        from deploy_software so it must be safe to call more than once.
+        '''
+        pass
+    
     def deploy_software(self):
         pass
     
     def transfer_files(self):
         pass
     
+    def _stage_input_files(self, host, remote_dir, session=None):
+        '''
+        Transfer the job's input files to remote_dir on the specified host 
+        (which may include a port, e.g. host:port) and return the list of 
+        remote paths in the same order as job_config.input_files. 
+        
+        Files are sent concurrently using the number of worker connections 
+        specified by the platform's storage_transfer_threads property. If the
+        job configuration specifies bundle_inputs, the files are instead sent 
+        as a single archive that is unpacked in remote_dir. If the platform 
+        has an input cache enabled, only files not already present in the 
+        platform's input cache are sent. Otherwise, if delta transfer is 
+        enabled, files that have been sent to the platform previously are 
+        updated using rsync and the transfer statistics are stored in 
+        self.input_transfer_stats.
+        '''
+        if not session:
+            session = self.session
+        
+        if self.job_config.bundle_inputs:
+            return self._stage_input_bundle(host, remote_dir, session)
+        
+        # Connections are obtained from the connection manager so they are 
+        # reused by later stages, e.g. input bundle transfer or distribution.
+        _get_connection = self.connections.factory(host, session=session)
+        
+        stager = InputStager(_get_connection,
+                             self.platform_config.storage_transfer_threads)
+        
+        if self.platform_config.storage_input_cache:
+            store_dir = os.path.join(
+                            self.platform_config.storage_job_directory,
+                            INPUT_CACHE_DIRECTORY)
+            conn = _get_connection()
+            try:
+                store = RemoteInputStore(
+                            conn, store_dir,
+                            self.platform_config.storage_input_cache_link)
+                return store.stage(self.job_config.input_files, remote_dir, 
+                                   stager, LocalHashCache(),
+                                   self.job_config.job_id)
+            finally:
+                conn.finalize()
+        
+        if self.platform_config.storage_delta_transfer:
+            self.input_transfer_stats = {'bytes_sent': 0, 'bytes_saved': 0}
+            stats_lock = threading.Lock()
+            user_id = self.platform_config.user_id
+            key_file = self.platform_config.user_key_file
+            
+            def _get_rsync_connection():
+                return RsyncTransfer(host, user_id, key_file, 
+                                     self.input_transfer_stats, stats_lock,
+                                     self._get_ssh_options())
+            
+            delta_stager = InputStager(
+                            _get_rsync_connection,
+                            self.platform_config.storage_transfer_threads)
+            conn = _get_connection()
+            try:
+                delta = DeltaStager(
+                            conn, stager, delta_stager,
+                            RemoteCopyIndex(self.platform_config.platform_id),
+                            self.input_transfer_stats)
+                return delta.stage(self.job_config.input_files, remote_dir,
+                                   self.job_config.job_id)
+            finally:
+                conn.finalize()
+        
+        return stager.stage(self.job_config.input_files, remote_dir)
+    
+    def _stage_input_bundle(self, host, remote_dir, session):
+        input_files = self.job_config.input_files
+        compression = self.job_config.bundle_compression
+        # The bundle may already have been created by prepare_job
+        bundle_path = self.input_bundle_path
+        self.input_bundle_path = None
+        if not bundle_path:
+            bundle_path = create_input_bundle(input_files, 
+                                              self.job_config.job_id + '-inputs',
+                                              compression)
+        bundle_name = os.path.basename(bundle_path)
+        LOG.debug('Transferring input bundle <%s> containing <%s> files to '
+                  '<%s:%s>...' % (bundle_name, len(input_files), host, 
+                                  remote_dir))
+        conn = self.connections.acquire(host, session=session)
+        # A connection that raised is discarded rather than returned to the 
+        # idle pool.
+        broken = True
+        try:
+            try:
+                conn.stage_to_remote(bundle_path, 
+                                     os.path.join(remote_dir, bundle_name))
+            except Exception as e:
+                raise FileTransferError('Error copying the input bundle <%s> '
+                                        'to the remote platform.' % bundle_name,
+                                        {bundle_path: str(e)})
+            
+            cmd = ('cd %s && %s && rm -f %s' 
+                   % (pipes.quote(remote_dir), 
+                      get_bundle_extract_command(bundle_name, compression),
+                      pipes.quote(bundle_name)))
+            ret, out, err = conn.run_sync(cmd)
+            broken = False
+            if ret != 0:
+                raise JobError('Unable to unpack the input bundle <%s> on the '
+                               'remote platform, exit code <%s>: %s' 
+                               % (bundle_name, ret, out))
+        finally:
+            conn.release(broken=broken)
+            os.remove(bundle_path)
+        
+        return [os.path.join(remote_dir, os.path.basename(f)) 
+                for f in input_files]
+    
     def run_job(self, job_details=None):
         if not self.job_config:
             raise ValueError('The job configuration has not been set, unable '
                              'to run the job without a job configuration.')
+        self.job_future = None
     
     def wait_for_job_completion(self):
         pass
     
+    def monitor_job(self, state_callback=None):
+        '''
+        Watch the job started by run_job and return a DeploymentFuture that 
+        completes with the job's final (state, exit code). If provided, 
+        state_callback is called as state_callback(state, info) as the job's 
+        state changes. Platforms that provide a job poller have the job 
+        watched by the process-wide JobMonitor, which polls the state of all
+        the jobs on a host together, otherwise the job is waited for in a 
+        background thread. If the job poller can't determine the job's exit
+        code, e.g. for jobs polled using ps, it is obtained from SAGA.
+        '''
+        if self.job_future is None:
+            poller = self._get_job_poller()
+            if poller:
+                group, poll_func = poller
+                self.job_future = JobMonitor.get_instance().watch(
+                                    group, get_native_job_id(self.job.id), 
+                                    poll_func, 
+                                    exit_code_func=self._get_saga_exit_code)
+            else:
+                self.job_future = run_async(self._wait_for_saga_job)
+        if state_callback:
+            self.job_future.add_state_callback(state_callback)
+        return self.job_future
+    
+    def await_completion(self, timeout=None):
+        '''
+        Wait for the job started by run_job to finish and return its final 
+        (state, exit code).
+        '''
+        return self.monitor_job().result(timeout)
+    
+    def _get_job_poller(self):
+        # Platforms that support polling the state of their jobs in batches
+        # return a (group, poll function) tuple for the JobMonitor.
+        return None
+    
+    def _wait_for_saga_job(self):
+        self.job.wait()
+        return (self.job.state, self.job.exit_code)
+    
+    def _get_saga_exit_code(self):
+        # SAGA's job wrapper on the remote host records the exit code of 
+        # the job's process.
+        return self.job.exit_code
+    
+    def _get_command_runner(self, host, user_id=None):
+        # Get a function that runs a command on host over a managed 
+        # connection and returns (return value, stdout, stderr), for use by 
+        # job poll functions.
+        def _run_command(command):
+            with self.connections.connection(host, user_id, 
+                                             self.session) as shell:
+                return shell.run_sync(command)
+        return _run_command
+    
     def collect_output(self, destination):
         # Here we collect the output from the remote cloud nodes when a job has 
         # completed, the output data is transferred to the specified location 
@@ -146,22 +532,27 @@ class JobDeploymentBase(object):
         # # ### TODO: Need to find a cross-platform way of handling this.
         #=======================================================================
         
-        # Work out whether we have an array of running nodes (e.g. cloud nodes)
-        # or whether we're dealing with a single host. If the former is true 
-        # then we get the IP/hostname of the target resource from the 
-        # running_nodes array, otherwise we can just use the host variable.
-        
-        remote_host = self.host if not getattr(self, 'running_nodes', None) else self.running_nodes[0][0].public_ips[0]
+        remote_host = self._get_output_host()
         LOG.debug('Remote host for file transfer source: %s' % remote_host)
         
+        # In streaming mode, the output archive is not written to disk on the 
+        # remote platform, it is piped back to the local machine as it is 
+        # generated.
+        if getattr(self.job_config, 'stream_output', False):
+            self._stream_output(remote_host, 
+                                getattr(self.job_config, 'working_dir', None),
+                                destination)
+            return
+        
         LOG.debug('Preparing output archiving job...')
         archive_file = self.job_config.job_id + '.tar.gz'
         jd = Description()
         jd.environment = getattr(self.job_config, 'environment', {})
-        jd.executable  = 'touch'
-        jd.arguments   = ['.', ';', 'tar', 'zcvf', archive_file, '*']
+        jd.executable  = '/bin/sh'
+        jd.arguments   = ['-c', pipes.quote(
+                            self._get_output_archive_command(archive_file))]
         jd.working_directory = getattr(self.job_config, 'working_dir', None)
-        self.svc = Service('ssh://%s/' % remote_host, session=self.session)
+        self.svc = self._get_job_service(remote_host)
         self.job = self.svc.create_job(jd)
         LOG.debug('Running output archiving job...')
         self.job.run()
@@ -199,5 +590,67 @@ class JobDeploymentBase(object):
             of = File(output_file, session=self.session)
             of.copy(destination)
     
+    def _get_output_archive_command(self, archive_target):
+        # Get the command to archive the job's output files, taking into 
+        # account any output selection specified in the job configuration.
+        return get_output_archive_command(
+                    archive_target,
+                    getattr(self.job_config, 'output_include', None),
+                    getattr(self.job_config, 'output_exclude', None),
+                    getattr(self.job_config, 'output_max_file_size', None))
+    
+    def _stream_output(self, remote_host, working_dir, destination):
+        '''
+        Stream a compressed tar archive of the job's working directory over 
+        an SSH connection to the specified destination directory. Compression 
+        on the remote platform is overlapped with the transfer and no 
+        temporary archive is created on the remote platform. If the job 
+        configuration specifies extract_output, the stream is extracted into 
+        a sub-directory of the destination named with the job ID, otherwise 
+        it is written to <job_id>.tar.gz in the destination.
+        Nothing is left in the destination if the transfer fails.
+        '''
+        if not working_dir:
+            raise ValueError('There is no working directory set. Unable to '
+                             'retrieve output files.')
+        
+        parsed_destination = urlparse.urlparse(destination)
+        if parsed_destination.scheme not in ['', 'file']:
+            raise JobError('Streaming output collection only supports local '
+                           'destinations, unable to stream output to <%s>.'
+                           % destination)
+        destination = parsed_destination.path
+        
+        remote_cmd = 'cd %s && %s' % (pipes.quote(working_dir),
+                                      self._get_output_archive_command('-'))
+        cmd = get_ssh_command(remote_host, self.platform_config.user_id,
+                              self.platform_config.user_key_file,
+                              options=self._get_ssh_options())
+        cmd.append(remote_cmd)
+        LOG.debug('Streaming output from <%s:%s> to <%s>...' 
+                  % (remote_host, working_dir, destination))
+        
+        stream_output_archive(cmd, destination, self.job_config.job_id,
+                              getattr(self.job_config, 'extract_output', False),
+                              source='%s:%s' % (remote_host, working_dir))
+    
     def shutdown_resources(self):
-        pass
\ No newline at end of file
+        pass
+    
+    def confirm_termination(self, node_ids, timeout=None):
+        '''
+        Wait for termination of resources that have previously been shut 
+        down, e.g. by a background reaper process. Returns the list of IDs 
+        of resources that haven't terminated when the timeout is reached. 
+        Platforms that don't start resources have nothing to confirm.
+        '''
+        return []
+    
+    def refresh_metadata(self):
+        '''
+        Refresh any cached metadata about the platform, e.g. the images and 
+        node sizes available on a cloud platform. Returns the list of node 
+        sizes as dictionaries, or an empty list for platforms that don't 
+        cache metadata.
+        '''
+        return []
\ No newline at end of file
@@ -0,0 +1,129 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Strategies for distributing a job's data directory from the master node of a
+cluster to the slave nodes.
+
+sequential: The master node copies the data to each slave node in turn.
+
+binomial:   Data is distributed in rounds. In each round, every node that 
+            already has the data sends it to one node that doesn't, so the 
+            number of nodes holding the data doubles each round and all N 
+            slave nodes are reached in ceil(log2(N+1)) rounds.
+
+chain:      The data is streamed as a tar archive through a pipeline of 
+            nodes. Each node extracts the stream while forwarding it to the 
+            next node in the chain so the transfers to all nodes overlap.
+'''
+import logging
+import pipes
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+DISTRIBUTION_STRATEGIES = ['sequential', 'binomial', 'chain']
+
+NODE_SSH_OPTIONS = '-o StrictHostKeyChecking=no'
+
+def binomial_tree_schedule(source, targets):
+    '''
+    Get the rounds of transfers needed to distribute data from source to all
+    the nodes in targets using a binomial tree. Returns a list of rounds, 
+    each of which is a list of (sender, receiver) tuples that can be carried
+    out concurrently.
+    '''
+    have_data = [source]
+    remaining = list(targets)
+    rounds = []
+    while remaining:
+        transfers = []
+        for sender in list(have_data):
+            if not remaining:
+                break
+            receiver = remaining.pop(0)
+            transfers.append((sender, receiver))
+            have_data.append(receiver)
+        rounds.append(transfers)
+    return rounds
+
+def get_node_copy_command(sender, receiver, job_data_dir, remote_job_dir,
+                          master=None):
+    '''
+    Get the command, to be run on the master node, that copies job_data_dir 
+    from sender to receiver. If sender is not the master node, the copy 
+    command is run on the sender node via SSH.
+    '''
+    copy_cmd = ('scp %s -rp %s %s:%s/' 
+                % (NODE_SSH_OPTIONS, pipes.quote(job_data_dir), receiver, 
+                   pipes.quote(remote_job_dir)))
+    if sender == master:
+        return copy_cmd
+    return 'ssh %s %s %s' % (NODE_SSH_OPTIONS, sender, pipes.quote(copy_cmd))
+
+def get_chain_command(targets, remote_job_dir, job_id):
+    '''
+    Get the command, to be run on the master node, that streams the job 
+    directory remote_job_dir/job_id through the chain of target nodes. Each 
+    node extracts the data via a named pipe while forwarding it to the next 
+    node and waits for its extraction to complete before exiting.
+    '''
+    extract_cmd = 'tar -C %s -xf' % pipes.quote(remote_job_dir)
+    downstream = None
+    for target in reversed(targets):
+        if downstream is None:
+            node_cmd = '%s -' % extract_cmd
+        else:
+            node_cmd = ('f=$(mktemp -u) && mkfifo "$f" || exit 1; '
+                        '%s "$f" & tee "$f" | %s; r=$?; wait $!; t=$?; '
+                        'rm -f "$f"; [ $r -eq 0 ] && [ $t -eq 0 ]' 
+                        % (extract_cmd, downstream))
+        downstream = 'ssh %s %s %s' % (NODE_SSH_OPTIONS, target, 
+                                       pipes.quote(node_cmd))
+    return ('tar -C %s -cf - %s | %s' 
+            % (pipes.quote(remote_job_dir), pipes.quote(job_id), downstream))
@@ -72,3 +72,11 @@ class StorageDirectoryNotFoundError(DeployerError):
 
 class DirectoryExistsError(DeployerError):
     pass
+
+class FileTransferError(JobError):
+    
+    def __init__(self, message, errors=None):
+        super(FileTransferError, self).__init__(message)
+        # A dictionary mapping each file that could not be transferred to a 
+        # description of the error that occurred.
+        self.errors = errors or {}
@@ -0,0 +1,196 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+A handle for deployment operations, such as starting resources, that run in 
+the background. Callers can wait for the result of the operation, register 
+callbacks to be notified when it completes and register callbacks to be 
+notified as the operation moves through a series of states.
+'''
+import logging
+import threading
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+# States that resources pass through when they are started
+RESOURCES_REQUESTED = 'requested'
+RESOURCES_RUNNING = 'running'
+RESOURCES_REACHABLE = 'reachable'
+RESOURCES_MACHINEFILE_INSTALLED = 'machinefile_installed'
+
+class DeploymentFuture(object):
+    '''
+    The pending result of a deployment operation. 
+    
+    State callbacks are called as callback(state, info) each time the 
+    operation reports a new state. Done callbacks are called as 
+    callback(future) once the operation has completed or failed. Callbacks 
+    added after a state has been reported, or after the operation has 
+    completed, are called immediately. Exceptions raised by callbacks are 
+    logged and ignored.
+    '''
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._done = False
+        self._result = None
+        self._exception = None
+        self._states = []
+        self._state_callbacks = []
+        self._done_callbacks = []
+    
+    @property
+    def state(self):
+        with self._condition:
+            if not self._states:
+                return None
+            return self._states[-1][0]
+    
+    def done(self):
+        with self._condition:
+            return self._done
+    
+    def wait(self, timeout=None):
+        '''
+        Wait for up to timeout seconds for the operation to complete and 
+        return whether it has completed. Under Python 2, waiting without a 
+        timeout can't be interrupted, callers that need to respond to 
+        KeyboardInterrupt should wait in a loop with a short timeout.
+        '''
+        with self._condition:
+            if not self._done:
+                self._condition.wait(timeout)
+            return self._done
+    
+    def result(self, timeout=None):
+        '''
+        Wait for the operation to complete and return its result. If the 
+        operation failed, the exception that it raised is raised here.
+        '''
+        exception = self.exception(timeout)
+        if exception is not None:
+            raise exception
+        return self._result
+    
+    def exception(self, timeout=None):
+        '''
+        Wait for the operation to complete and return the exception that it 
+        raised, or None if it completed successfully.
+        '''
+        with self._condition:
+            if not self._done:
+                self._condition.wait(timeout)
+            if not self._done:
+                raise RuntimeError('The operation did not complete within '
+                                   '<%s> seconds.' % timeout)
+            return self._exception
+    
+    def add_state_callback(self, callback):
+        with self._condition:
+            self._state_callbacks.append(callback)
+            states = list(self._states)
+        for state, info in states:
+            self._call(callback, state, info)
+    
+    def add_done_callback(self, callback):
+        with self._condition:
+            if not self._done:
+                self._done_callbacks.append(callback)
+                return
+        self._call(callback, self)
+    
+    def set_state(self, state, info=None):
+        with self._condition:
+            self._states.append((state, info))
+            callbacks = list(self._state_callbacks)
+        LOG.debug('Operation state changed to <%s>.' % state)
+        for callback in callbacks:
+            self._call(callback, state, info)
+    
+    def set_result(self, result):
+        self._complete(result, None)
+    
+    def set_exception(self, exception):
+        self._complete(None, exception)
+    
+    def _complete(self, result, exception):
+        with self._condition:
+            self._result = result
+            self._exception = exception
+            self._done = True
+            self._condition.notify_all()
+            callbacks = list(self._done_callbacks)
+        for callback in callbacks:
+            self._call(callback, self)
+    
+    def _call(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            LOG.error('Error in deployment callback <%s>: %s' 
+                      % (callback, str(e)))
+
+def run_async(func, *args, **kwargs):
+    '''
+    Run func(*args, **kwargs) in a background thread and return a 
+    DeploymentFuture for its result. If the keyword argument future is 
+    provided, it is used as the future for the operation.
+    '''
+    future = kwargs.pop('future', None) or DeploymentFuture()
+    
+    def _run():
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+    
+    t = threading.Thread(target=_run)
+    t.daemon = True
+    t.start()
+    return future
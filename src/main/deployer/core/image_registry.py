@@ -0,0 +1,143 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+A local registry of prebaked cloud images.
+
+When software is deployed to a node started from an unconfigured image, the 
+node can be snapshotted to create a new image with the software installed. 
+The registry records these images, for each platform, keyed by the base 
+image, the IDs of the software configurations deployed and a hash of their 
+content, so that later jobs with the same key can start from the prebaked 
+image and skip software deployment.
+'''
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from deployer.config.software.base import SoftwareConfigFile
+from deployer.core.utils import get_libhpc_dir
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+def get_software_config_hash(software_configs):
+    '''
+    Get a hash of the content of the provided software configurations, i.e. 
+    their install mode and the commands and file data used to deploy them. 
+    The hash changes if any part of the installation process changes.
+    '''
+    sha = hashlib.sha256()
+    for conf in sorted(software_configs, key=lambda c: c.software_id):
+        sha.update('id:%s\nmode:%s\n' % (conf.software_id, 
+                                         conf.software_install_mode))
+        for cmd in conf.get_install_commands():
+            if isinstance(cmd, SoftwareConfigFile):
+                sha.update('file:%s\n%s\n' % (cmd.filename, cmd.data))
+            else:
+                sha.update('cmd:%s\n' % cmd)
+    return sha.hexdigest()
+
+def get_image_key(base_image_id, software_configs):
+    '''
+    Get the registry key for an image created by deploying the provided 
+    software configurations to a node started from base_image_id.
+    '''
+    software_ids = sorted([conf.software_id for conf in software_configs])
+    return '%s|%s|%s' % (base_image_id, ','.join(software_ids), 
+                         get_software_config_hash(software_configs))
+
+class ImageRegistry(object):
+    '''
+    A persistent record of the prebaked images for a single platform.
+    '''
+    
+    def __init__(self, platform_id, registry_file=None):
+        if not registry_file:
+            registry_file = os.path.join(get_libhpc_dir('cache', 'images'),
+                                         '%s.json' % platform_id)
+        self.registry_file = registry_file
+        self._lock = threading.Lock()
+        self._images = {}
+        if os.path.exists(registry_file):
+            try:
+                with open(registry_file, 'r') as f:
+                    self._images = json.load(f)
+            except ValueError as e:
+                LOG.warning('Ignoring corrupt image registry <%s>: %s' 
+                            % (registry_file, str(e)))
+    
+    def get(self, key):
+        '''
+        Get the details of the image recorded for key as a dictionary with 
+        the keys image_id, base_image_id, software and created, or None if
+        there is no image for this key.
+        '''
+        with self._lock:
+            return self._images.get(key)
+    
+    def record(self, key, image_id, base_image_id, software_ids):
+        with self._lock:
+            self._images[key] = {'image_id': image_id, 
+                                 'base_image_id': base_image_id,
+                                 'software': sorted(software_ids),
+                                 'created': time.time()}
+    
+    def remove(self, key):
+        with self._lock:
+            return self._images.pop(key, None)
+    
+    def save(self):
+        with self._lock:
+            tmp_file = '%s.%s.tmp' % (self.registry_file, os.getpid())
+            with open(tmp_file, 'w') as f:
+                json.dump(self._images, f)
+            os.rename(tmp_file, self.registry_file)
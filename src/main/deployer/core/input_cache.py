@@ -0,0 +1,266 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+A content-addressed store for job input files on a remote platform.
+
+Input files are hashed locally and stored on the remote platform in a 
+directory under the platform's job storage directory, named by the SHA-256 
+hash of their content. When a job is staged, the hashes of its input files are
+checked against the remote store in a single batch and only the files that 
+are not already present are uploaded. The job directory is then populated with
+links to the stored files.
+
+Local hashes are cached, keyed on the file path, modification time and size, 
+so unchanged files are not re-hashed for every job.
+'''
+import hashlib
+import json
+import logging
+import os
+import pipes
+import threading
+
+from deployer.core.exceptions import JobError
+from deployer.core.utils import get_libhpc_dir
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+# The name of the store directory within the platform's storage directory 
+INPUT_CACHE_DIRECTORY = '.input-cache'
+
+LINK_TYPES = ['hard', 'symbolic']
+
+HASH_BLOCK_SIZE = 1024*1024
+
+def hash_file(path):
+    '''
+    Compute the SHA-256 hash of the content of the file at path.
+    '''
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(HASH_BLOCK_SIZE)
+            if not data:
+                break
+            h.update(data)
+    return h.hexdigest()
+
+class LocalHashCache(object):
+    '''
+    A persistent cache of the hashes of local files. An entry is reused 
+    only if the file's modification time and size are unchanged.
+    '''
+    
+    def __init__(self, cache_file=None):
+        if not cache_file:
+            cache_file = os.path.join(get_libhpc_dir('cache'), 
+                                      'input_hashes.json')
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._modified = False
+        self._entries = {}
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    self._entries = json.load(f)
+            except ValueError as e:
+                LOG.warning('Ignoring corrupt hash cache file <%s>: %s' 
+                            % (cache_file, str(e)))
+    
+    def get_hash(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        if (entry and entry['mtime'] == st.st_mtime and 
+            entry['size'] == st.st_size):
+            return entry['hash']
+        
+        LOG.debug('Computing hash for file <%s>...' % path)
+        file_hash = hash_file(path)
+        with self._lock:
+            self._entries[path] = {'mtime': st.st_mtime, 'size': st.st_size,
+                                   'hash': file_hash}
+            self._modified = True
+        return file_hash
+    
+    def save(self):
+        with self._lock:
+            if not self._modified:
+                return
+            # Write to a temporary file and rename so that a concurrent 
+            # reader never sees a partially written cache.
+            tmp_file = '%s.%s.tmp' % (self.cache_file, os.getpid())
+            with open(tmp_file, 'w') as f:
+                json.dump(self._entries, f)
+            os.rename(tmp_file, self.cache_file)
+            self._modified = False
+
+class RemoteInputStore(object):
+    '''
+    A content-addressed store of input files on a remote platform. 
+    
+    connection must provide the run_sync and write_to_remote functions of the 
+    SAGA-Python PTYShell class. Blobs are stored at <store_dir>/<aa>/<hash>
+    where <aa> is the first two characters of the hash.
+    '''
+    
+    def __init__(self, connection, store_dir, link_type='hard'):
+        if link_type not in LINK_TYPES:
+            raise JobError('Unsupported input cache link type <%s>, expected '
+                           'one of <%s>.' % (link_type, LINK_TYPES))
+        self.connection = connection
+        self.store_dir = store_dir
+        self.link_type = link_type
+    
+    @staticmethod
+    def blob_path(file_hash):
+        # The path of a blob relative to the store directory
+        return os.path.join(file_hash[:2], file_hash)
+    
+    def find_missing(self, file_hashes, work_dir):
+        '''
+        Check which of the specified hashes are not present in the store. 
+        The check is carried out using a single remote command, the list of
+        hashes being written to a temporary file in work_dir. Returns the set
+        of missing hashes.
+        '''
+        file_hashes = set(file_hashes)
+        if not file_hashes:
+            return set()
+        check_file = os.path.join(work_dir, '.input-cache-check')
+        self.connection.write_to_remote(
+            '\n'.join([self.blob_path(h) for h in file_hashes]) + '\n',
+            check_file)
+        cmd = ('mkdir -p %(store)s && cd %(store)s && '
+               'while read f; do [ -e "$f" ] || '
+               '{ mkdir -p "${f%%/*}" && echo "MISSING $f"; }; '
+               'done < %(list)s; rm -f %(list)s'
+               % {'store': pipes.quote(self.store_dir),
+                  'list': pipes.quote(check_file)})
+        ret, out, err = self.connection.run_sync(cmd)
+        if ret != 0:
+            raise JobError('Unable to check the remote input cache <%s>, exit '
+                           'code <%s>: %s' % (self.store_dir, ret, out))
+        missing = set()
+        for line in out.splitlines():
+            line = line.strip()
+            if line.startswith('MISSING '):
+                missing.add(os.path.basename(line[len('MISSING '):]))
+        return missing & file_hashes
+    
+    def link_files(self, links, work_dir, upload_suffix):
+        '''
+        Populate the job directory with links to stored blobs. links is a list
+        of (hash, remote_target) tuples. Any blob uploaded with upload_suffix
+        is first moved into place (unless another job has stored the same 
+        blob in the meantime) and made read-only so that jobs cannot modify
+        the stored content.
+        '''
+        link_file = os.path.join(work_dir, '.input-cache-links')
+        self.connection.write_to_remote(
+            '\n'.join(['%s %s' % (self.blob_path(h), target) 
+                       for h, target in links]) + '\n', link_file)
+        if self.link_type == 'hard':
+            link_cmd = 'ln -f "$b" "$t" 2>/dev/null || ln -sf "$PWD/$b" "$t"'
+        else:
+            link_cmd = 'ln -sf "$PWD/$b" "$t"'
+        cmd = ('cd %(store)s && while read b t; do '
+               'if [ -e "$b%(suffix)s" ]; then '
+               'if [ -e "$b" ]; then rm -f "$b%(suffix)s"; '
+               'else chmod a-w "$b%(suffix)s" && mv "$b%(suffix)s" "$b" '
+               '|| exit 1; fi; fi; '
+               '{ %(link)s; } || exit 1; '
+               'done < %(list)s; rm -f %(list)s'
+               % {'store': pipes.quote(self.store_dir), 
+                  'suffix': upload_suffix, 'link': link_cmd,
+                  'list': pipes.quote(link_file)})
+        ret, out, err = self.connection.run_sync(cmd)
+        if ret != 0:
+            raise JobError('Unable to link cached input files into the job '
+                           'directory <%s>, exit code <%s>: %s' 
+                           % (work_dir, ret, out))
+    
+    def stage(self, local_files, remote_dir, stager, hash_cache, job_id):
+        '''
+        Stage local_files to remote_dir via the store, uploading only the 
+        files whose content is not already stored using the provided 
+        InputStager. Returns the remote paths of the staged files in the same
+        order as local_files.
+        '''
+        if not local_files:
+            return []
+        
+        file_hashes = [hash_cache.get_hash(f) for f in local_files]
+        hash_cache.save()
+        
+        missing = self.find_missing(file_hashes, remote_dir)
+        upload_suffix = '.part-%s' % job_id
+        uploads = []
+        uploaded = set()
+        for local_file, file_hash in zip(local_files, file_hashes):
+            if file_hash in missing and file_hash not in uploaded:
+                uploads.append((local_file, 
+                                os.path.join(self.store_dir, 
+                                             self.blob_path(file_hash) + 
+                                             upload_suffix)))
+                uploaded.add(file_hash)
+        
+        LOG.debug('Input cache <%s>: <%s> of <%s> input files already stored, '
+                  'uploading <%s> files.' 
+                  % (self.store_dir, len(local_files) - len(uploads), 
+                     len(local_files), len(uploads)))
+        stager.stage_to(uploads)
+        
+        remote_paths = [os.path.join(remote_dir, os.path.basename(f)) 
+                        for f in local_files]
+        self.link_files(zip(file_hashes, remote_paths), remote_dir, 
+                        upload_suffix)
+        return remote_paths
@@ -0,0 +1,125 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+
+'''
+Created on 17 Oct 2026
+
+Running a set of jobs, e.g. the jobs of a parameter sweep, as a single PBS 
+job array submitted with qsub -J.
+
+Each job in the array is run by a sub-job whose index, given by the 
+PBS_ARRAY_INDEX environment variable, selects the job's own working 
+directory, environment, arguments and input files from a shell script that
+is generated for the array. The sub-jobs are identified by the array's job 
+ID with the index in place of the empty brackets, e.g. 1234[3].server for 
+the array 1234[].server, and are monitored together by polling the array.
+'''
+import logging
+
+from deployer.core.exceptions import JobError
+from deployer.core.pbs_resources import get_job_commands, get_launcher,\
+    get_qsub_command
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+ARRAY_INDEX_VARIABLE = 'PBS_ARRAY_INDEX'
+ARRAY_SCRIPT_NAME = 'libhpc-array.sh'
+# PBS requires a job array to have at least two sub-jobs
+MIN_ARRAY_JOBS = 2
+
+def get_array_script(jobs, launcher_template=None):
+    '''
+    Get the script run by each sub-job of a job array. jobs is a list of 
+    (job configuration, input files) tuples, the job at index i of the list
+    is run by sub-job i. Parallel jobs are started using the MPI launcher 
+    given by launcher_template, if provided.
+    '''
+    lines = ['#!/bin/sh', 
+             '# Job array script generated by libhpc-deployer',
+             'case "$%s" in' % ARRAY_INDEX_VARIABLE]
+    for index, (job_config, input_files) in enumerate(jobs):
+        lines.append('%d)' % index)
+        launcher = get_launcher(launcher_template, job_config)
+        lines.extend(['    ' + c for c in 
+                      get_job_commands(job_config, input_files, launcher)])
+        lines.append('    ;;')
+    lines.extend(['*)',
+                  '    echo "Unknown job array index <$%s>" >&2' 
+                  % ARRAY_INDEX_VARIABLE,
+                  '    exit 1',
+                  '    ;;',
+                  'esac', ''])
+    return '\n'.join(lines)
+
+def get_array_submit_command(script_file, num_jobs, resource_options=None,
+                             output_dir=None):
+    '''
+    Get the qsub command that submits script_file as a job array of 
+    num_jobs sub-jobs, indexed from 0. resource_options are the qsub options
+    requesting the resources of each sub-job.
+    '''
+    if num_jobs < MIN_ARRAY_JOBS:
+        raise JobError('A job array must have at least <%d> jobs, unable to '
+                       'submit an array of <%d> jobs.' 
+                       % (MIN_ARRAY_JOBS, num_jobs))
+    return get_qsub_command(script_file, resource_options, output_dir,
+                            array_range='0-%d' % (num_jobs - 1))
+
+def parse_qsub_output(output):
+    '''
+    Get the job ID of a job array, e.g. 1234[].server, from the output of 
+    the qsub command that submitted it.
+    '''
+    array_id = (output or '').strip()
+    if '[]' not in array_id:
+        raise JobError('Unable to get the job array ID from the qsub output '
+                       '<%s>.' % array_id)
+    return array_id
+
+def get_subjob_id(array_id, index):
+    return array_id.replace('[]', '[%d]' % index, 1)
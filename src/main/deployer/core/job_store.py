@@ -0,0 +1,267 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+A persistent local store of the state of submitted jobs.
+
+Each job's record holds the platform and job specification it was submitted
+with, its overall state, working directory, remote job ID and the 
+deployment state needed to resume its lifecycle, e.g. the IDs of its cloud 
+nodes. The progress of each of the job's lifecycle stages is recorded 
+separately so that a job whose process has exited, or died, can be resumed 
+from the last completed stage by another process. The store is an SQLite 
+database, ~/.libhpc/state/jobs.db by default, so it can be safely updated by
+several processes.
+'''
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from deployer.core.lifecycle import STAGE_STARTED, STAGE_COMPLETED
+from deployer.core.utils import get_libhpc_dir, start_detached_process
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+# Overall job states
+JOB_SUBMITTED = 'submitted'
+JOB_RUNNING = 'running'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+
+# The pseudo-stage recorded once a job's resources have been shut down
+SHUTDOWN_STAGE = 'shutdown_resources'
+
+_SCHEMA = ['''CREATE TABLE IF NOT EXISTS jobs (
+                  job_id TEXT PRIMARY KEY,
+                  platform TEXT,
+                  software_config TEXT,
+                  job_spec TEXT,
+                  state TEXT,
+                  working_dir TEXT,
+                  remote_job_id TEXT,
+                  deployment_state TEXT,
+                  exit_code INTEGER,
+                  error TEXT,
+                  pid INTEGER,
+                  created REAL,
+                  updated REAL)''',
+           '''CREATE TABLE IF NOT EXISTS stages (
+                  job_id TEXT,
+                  stage TEXT,
+                  state TEXT,
+                  start_time REAL,
+                  end_time REAL,
+                  error TEXT,
+                  PRIMARY KEY (job_id, stage))''']
+
+# Job record fields stored as JSON
+_JSON_FIELDS = ['software_config', 'job_spec', 'deployment_state']
+
+class JobStore(object):
+    '''
+    The job state store. Records are returned as dictionaries with the JSON
+    fields decoded.
+    '''
+    
+    def __init__(self, db_file=None, time_func=time.time):
+        if not db_file:
+            db_file = os.path.join(get_libhpc_dir('state'), 'jobs.db')
+        self.db_file = db_file
+        self._time = time_func
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+    
+    @contextmanager
+    def _connect(self):
+        # A connection is opened for each operation so that the store can be
+        # used from any thread. The transaction is committed, or rolled back
+        # on error, before the connection is closed.
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def _decode(self, row):
+        if row is None:
+            return None
+        record = dict(zip(row.keys(), row))
+        for field in _JSON_FIELDS:
+            if record.get(field) is not None:
+                record[field] = json.loads(record[field])
+        return record
+    
+    def add_job(self, job_id, platform, job_spec, software_config=None,
+                working_dir=None):
+        now = self._time()
+        with self._lock, self._connect() as conn:
+            conn.execute('INSERT INTO jobs (job_id, platform, software_config,'
+                         ' job_spec, state, working_dir, deployment_state, '
+                         'created, updated) VALUES '
+                         '(?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         (job_id, platform, json.dumps(software_config), 
+                          json.dumps(job_spec), JOB_SUBMITTED, working_dir, 
+                          json.dumps({}), now, now))
+        LOG.debug('Added job <%s> to the job store.' % job_id)
+    
+    def update_job(self, job_id, **fields):
+        '''
+        Update the specified fields of a job's record.
+        '''
+        for field in _JSON_FIELDS:
+            if field in fields:
+                fields[field] = json.dumps(fields[field])
+        fields['updated'] = self._time()
+        names = sorted(fields.keys())
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute('UPDATE jobs SET %s WHERE job_id = ?' 
+                                  % ', '.join(['%s = ?' % n for n in names]),
+                                  [fields[n] for n in names] + [job_id])
+            if cursor.rowcount == 0:
+                raise KeyError('Job <%s> is not in the job store.' % job_id)
+    
+    def get_job(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', 
+                               (job_id,)).fetchone()
+        return self._decode(row)
+    
+    def list_jobs(self, states=None):
+        with self._connect() as conn:
+            rows = conn.execute('SELECT * FROM jobs ORDER BY created').fetchall()
+        records = [self._decode(row) for row in rows]
+        if states:
+            records = [r for r in records if r['state'] in states]
+        return records
+    
+    def remove_job(self, job_id):
+        with self._lock, self._connect() as conn:
+            conn.execute('DELETE FROM stages WHERE job_id = ?', (job_id,))
+            conn.execute('DELETE FROM jobs WHERE job_id = ?', (job_id,))
+    
+    def set_stage_state(self, job_id, stage, state, error=None):
+        '''
+        Record that a lifecycle stage of a job has started, completed, 
+        failed or is to be retried.
+        '''
+        now = self._time()
+        with self._lock, self._connect() as conn:
+            if state == STAGE_STARTED:
+                conn.execute('INSERT OR REPLACE INTO stages (job_id, stage, '
+                             'state, start_time) VALUES (?, ?, ?, ?)',
+                             (job_id, stage, state, now))
+            else:
+                conn.execute('UPDATE stages SET state = ?, end_time = ?, '
+                             'error = ? WHERE job_id = ? AND stage = ?',
+                             (state, now, error, job_id, stage))
+            conn.execute('UPDATE jobs SET updated = ? WHERE job_id = ?',
+                         (now, job_id))
+    
+    def get_stages(self, job_id):
+        with self._connect() as conn:
+            rows = conn.execute('SELECT * FROM stages WHERE job_id = ? '
+                                'ORDER BY start_time', (job_id,)).fetchall()
+        return [self._decode(row) for row in rows]
+    
+    def get_completed_stages(self, job_id):
+        return [s['stage'] for s in self.get_stages(job_id) 
+                if s['state'] == STAGE_COMPLETED]
+    
+    def set_resources_shutdown(self, job_id):
+        '''
+        Record that a job's resources have been shut down.
+        '''
+        self.set_stage_state(job_id, SHUTDOWN_STAGE, STAGE_STARTED)
+        self.set_stage_state(job_id, SHUTDOWN_STAGE, STAGE_COMPLETED)
+    
+    def get_resume_stages(self, job_id):
+        '''
+        Get the completed lifecycle stages of a job whose lifecycle is to be
+        resumed from its first incomplete stage. A failed job can only be 
+        resumed if it was started, its remote job ID is recorded, and its 
+        resources are still running. A ValueError is raised if the job can't
+        be resumed.
+        '''
+        record = self.get_job(job_id)
+        if not record:
+            raise ValueError('Job <%s> is not in the job store.' % job_id)
+        if record['state'] == JOB_COMPLETED:
+            raise ValueError('Job <%s> has already completed.' % job_id)
+        completed = self.get_completed_stages(job_id)
+        if record['state'] == JOB_FAILED:
+            if ('run_job' not in completed or not record['remote_job_id'] or
+                SHUTDOWN_STAGE in completed):
+                raise ValueError('Job <%s> has failed and its resources have '
+                                 'been shut down.' % job_id)
+        return [s for s in completed if s != SHUTDOWN_STAGE]
+
+def start_job_worker(job_id, until=None, log_file=None):
+    '''
+    Resume a job's lifecycle in a background process, detached from the 
+    current process, using the reattach subcommand of the command line tool.
+    If until is specified, the process stops once that stage has completed.
+    '''
+    if not log_file:
+        log_file = os.path.join(get_libhpc_dir('state', 'jobs'), 
+                                '%s.log' % job_id)
+    args = ['reattach', job_id]
+    if until:
+        args += ['--until', until]
+    pid = start_detached_process(args, log_file)
+    LOG.info('Started worker process <%s> for job <%s>, logging to <%s>.' 
+             % (pid, job_id, log_file))
+    return pid
@@ -0,0 +1,336 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Dependency-aware execution of job lifecycle stages.
+
+Each stage declares the stages that it depends on. A stage is started as soon
+as all of its dependencies have completed so that independent stages, e.g. 
+transferring input files and installing software, run concurrently. If a 
+stage fails, no further stages are started, stages that are already running 
+are allowed to finish and the error from the first failed stage is raised.
+
+The start and end times of each stage are recorded so that the critical 
+path, the chain of dependent stages that determined the overall run time, 
+can be reported. A stage callback can be registered to be notified as 
+stages start, complete and fail, e.g. to record the progress of a job, and 
+stages that completed in an earlier run can be skipped when a job's 
+lifecycle is resumed.
+
+Stages that can safely be run again, e.g. those that transfer files or run 
+commands on resources that have already been started, can be marked to be 
+retried if they fail. Retries are controlled by a RetryPolicy which waits for 
+an increasing time between attempts and limits the total time spent retrying 
+so that a job's resources are not kept running indefinitely.
+'''
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+STAGE_STARTED = 'started'
+STAGE_COMPLETED = 'completed'
+STAGE_FAILED = 'failed'
+STAGE_RETRYING = 'retrying'
+
+DEFAULT_STAGE_RETRIES = 0
+DEFAULT_RETRY_DELAY = 10
+DEFAULT_RETRY_MAX_DELAY = 300
+DEFAULT_RETRY_BUDGET = 3600
+
+class RetryPolicy(object):
+    '''
+    Decide whether, and after how long, a failed lifecycle stage is retried. 
+    A stage is retried up to retries times. The first retry waits for delay 
+    seconds and the wait doubles for each further retry, up to max_delay. 
+    The budget is the time in seconds, from the first failure of any stage, 
+    within which retries may be made. It is shared by all stages in a 
+    lifecycle so that, once it has been used up, the lifecycle fails and the
+    job's resources can be shut down.
+    '''
+    
+    def __init__(self, retries=DEFAULT_STAGE_RETRIES, 
+                 delay=DEFAULT_RETRY_DELAY, max_delay=DEFAULT_RETRY_MAX_DELAY,
+                 budget=DEFAULT_RETRY_BUDGET, time_func=time.time):
+        self.retries = retries
+        self.delay = delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self._time = time_func
+        self._first_failure = None
+        self._lock = threading.Lock()
+    
+    def get_retry_delay(self, attempt):
+        '''
+        Return the time in seconds to wait before retrying a stage that has 
+        failed on the specified attempt, numbered from 1, or None if the 
+        stage should not be retried.
+        '''
+        with self._lock:
+            now = self._time()
+            if self._first_failure is None:
+                self._first_failure = now
+            if attempt > self.retries:
+                return None
+            delay = min(self.delay * 2 ** (attempt - 1), self.max_delay)
+            if (self.budget is not None and 
+                now + delay - self._first_failure > self.budget):
+                LOG.debug('The lifecycle retry budget of <%s> seconds has '
+                          'been used up.' % self.budget)
+                return None
+            return delay
+
+class LifecycleStage(object):
+    
+    def __init__(self, name, func, depends_on=None, retry=False):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on or [])
+        self.retry = retry
+        self.attempts = 0
+        self.start_time = None
+        self.end_time = None
+        self.exc_info = None
+        self.skipped = False
+    
+    @property
+    def completed(self):
+        return self.end_time is not None and self.exc_info is None
+    
+    @property
+    def elapsed(self):
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+class LifecycleExecutor(object):
+    '''
+    Run a set of lifecycle stages, each of which is a function taking no 
+    arguments, respecting the dependencies between them. If provided, 
+    stage_callback is called as stage_callback(name, state, error) as each 
+    stage starts, completes, fails or is to be retried. Stages added with 
+    retry set are retried as permitted by retry_policy, if provided.
+    '''
+    
+    def __init__(self, stage_callback=None, retry_policy=None, 
+                 sleep_func=time.sleep):
+        self.stages = OrderedDict()
+        self.stage_callback = stage_callback
+        self.retry_policy = retry_policy
+        self._sleep = sleep_func
+    
+    def add_stage(self, name, func, depends_on=None, retry=False):
+        if name in self.stages:
+            raise ValueError('A lifecycle stage with the name <%s> has already '
+                             'been added.' % name)
+        self.stages[name] = LifecycleStage(name, func, depends_on, retry)
+    
+    def _check_dependencies(self):
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError('Lifecycle stage <%s> depends on the '
+                                     'unknown stage <%s>.' % (stage.name, dep))
+        # Check for circular dependencies by repeatedly removing stages whose
+        # dependencies have all been removed.
+        remaining = dict([(s.name, set(s.depends_on)) 
+                          for s in self.stages.values()])
+        while remaining:
+            ready = [name for name, deps in remaining.items() 
+                     if not deps & set(remaining.keys())]
+            if not ready:
+                raise ValueError('The lifecycle stages <%s> have circular '
+                                 'dependencies.' % ', '.join(remaining.keys()))
+            for name in ready:
+                del remaining[name]
+    
+    def _notify(self, name, state, error=None):
+        if not self.stage_callback:
+            return
+        try:
+            self.stage_callback(name, state, error)
+        except Exception as e:
+            LOG.error('Error in lifecycle stage callback for stage <%s>: %s' 
+                      % (name, str(e)))
+    
+    def run(self, completed=None):
+        '''
+        Run all stages and wait for them to finish. Stages named in 
+        completed, which have completed in an earlier run, are skipped. If a
+        stage raises an exception, it is re-raised here once all running 
+        stages have finished.
+        '''
+        self._check_dependencies()
+        condition = threading.Condition()
+        pending = list(self.stages.keys())
+        running = set()
+        failed = []
+        
+        for name in (completed or []):
+            if name in pending:
+                stage = self.stages[name]
+                stage.skipped = True
+                stage.start_time = stage.end_time = time.time()
+                pending.remove(name)
+                LOG.debug('Skipping lifecycle stage <%s>, it has already '
+                          'completed.' % name)
+        
+        def _run_stage(stage):
+            LOG.debug('Starting lifecycle stage <%s>...' % stage.name)
+            self._notify(stage.name, STAGE_STARTED)
+            stage.start_time = time.time()
+            while True:
+                stage.attempts += 1
+                try:
+                    stage.func()
+                    stage.exc_info = None
+                    break
+                except Exception:
+                    stage.exc_info = sys.exc_info()
+                # Don't retry once another stage has failed since the 
+                # lifecycle will fail anyway.
+                if not stage.retry or not self.retry_policy or failed:
+                    break
+                delay = self.retry_policy.get_retry_delay(stage.attempts)
+                if delay is None:
+                    break
+                LOG.warning('Lifecycle stage <%s> failed on attempt <%d>, '
+                            'retrying in <%s> seconds: %s' 
+                            % (stage.name, stage.attempts, delay, 
+                               str(stage.exc_info[1])))
+                self._notify(stage.name, STAGE_RETRYING, 
+                             str(stage.exc_info[1]))
+                self._sleep(delay)
+            stage.end_time = time.time()
+            if stage.exc_info:
+                self._notify(stage.name, STAGE_FAILED, str(stage.exc_info[1]))
+            else:
+                self._notify(stage.name, STAGE_COMPLETED)
+            with condition:
+                running.discard(stage.name)
+                if stage.exc_info:
+                    LOG.error('Lifecycle stage <%s> failed after <%.2f> '
+                              'seconds: %s' % (stage.name, stage.elapsed, 
+                                               str(stage.exc_info[1])))
+                    failed.append(stage)
+                else:
+                    LOG.debug('Lifecycle stage <%s> completed in <%.2f> '
+                              'seconds.' % (stage.name, stage.elapsed))
+                condition.notify_all()
+        
+        with condition:
+            while True:
+                if not failed:
+                    for name in list(pending):
+                        stage = self.stages[name]
+                        if all([self.stages[dep].completed 
+                                for dep in stage.depends_on]):
+                            pending.remove(name)
+                            running.add(name)
+                            t = threading.Thread(target=_run_stage, 
+                                                 args=(stage,))
+                            t.daemon = True
+                            t.start()
+                if not running:
+                    break
+                # Wait with a timeout so that the main thread remains 
+                # responsive to interrupts.
+                condition.wait(1.0)
+        
+        if failed:
+            exc_type, exc_value, exc_tb = failed[0].exc_info
+            raise exc_type, exc_value, exc_tb
+    
+    def critical_path(self):
+        '''
+        Return the list of stages, in execution order, forming the chain of 
+        dependencies that ended with the last stage to finish. Each stage in 
+        the chain is the dependency of the next stage that finished last.
+        '''
+        finished = [s for s in self.stages.values() 
+                    if s.end_time is not None and not s.skipped]
+        if not finished:
+            return []
+        stage = max(finished, key=lambda s: s.end_time)
+        path = [stage]
+        while True:
+            deps = [self.stages[dep] for dep in stage.depends_on 
+                    if self.stages[dep].end_time is not None 
+                    and not self.stages[dep].skipped]
+            if not deps:
+                break
+            stage = max(deps, key=lambda s: s.end_time)
+            path.insert(0, stage)
+        return path
+    
+    def get_timing_report(self):
+        lines = ['Lifecycle stage timings:']
+        for stage in self.stages.values():
+            if stage.skipped:
+                lines.append('\t%-24s completed earlier' % stage.name)
+            elif stage.elapsed is None:
+                lines.append('\t%-24s not run' % stage.name)
+            else:
+                notes = []
+                if stage.attempts > 1:
+                    notes.append('%d attempts' % stage.attempts)
+                if stage.exc_info:
+                    notes.append('failed')
+                lines.append('\t%-24s %8.2f s%s' 
+                             % (stage.name, stage.elapsed,
+                                notes and ' (%s)' % ', '.join(notes) or ''))
+        path = self.critical_path()
+        if path:
+            lines.append('Critical path: %s (%.2f s)' 
+                         % (' -> '.join([s.name for s in path]),
+                            path[-1].end_time - path[0].start_time))
+        return '\n'.join(lines)
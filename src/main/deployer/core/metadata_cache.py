@@ -0,0 +1,169 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+A persistent cache of cloud platform metadata.
+
+Looking up images and node sizes requires slow calls to the cloud platform's
+API. The details of the images and sizes, including the number of cores of 
+each size where the platform reports this, are cached on disk for each 
+platform so that repeated job submissions can skip these calls. Entries 
+expire after the cache's time to live (TTL) and the cache can be 
+invalidated explicitly, e.g. by the metadata subcommand of the command line
+tool.
+'''
+import json
+import logging
+import os
+import threading
+import time
+
+from deployer.core.utils import get_libhpc_dir
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+DEFAULT_METADATA_CACHE_TTL = 86400
+
+def image_to_dict(image):
+    return {'id': image.id, 'name': image.name}
+
+def size_to_dict(size):
+    extra = getattr(size, 'extra', None) or {}
+    cores = extra.get('cpu', extra.get('vcpus'))
+    return {'id': size.id, 'name': size.name, 'ram': size.ram, 
+            'disk': size.disk, 'bandwidth': size.bandwidth, 
+            'price': size.price, 'cores': cores}
+
+class MetadataCache(object):
+    '''
+    The cached image and size metadata for a single platform. Images are 
+    cached individually since they may be looked up one at a time. Sizes 
+    are cached as a complete list. A TTL of 0 disables the cache.
+    '''
+    
+    def __init__(self, platform_id, ttl=DEFAULT_METADATA_CACHE_TTL, 
+                 cache_file=None, time_func=time.time):
+        if not cache_file:
+            cache_file = os.path.join(get_libhpc_dir('cache', 'metadata'),
+                                      '%s.json' % platform_id)
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._time = time_func
+        self._lock = threading.Lock()
+        self._data = {'images': {}, 'sizes': None}
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r') as f:
+                    self._data = json.load(f)
+            except ValueError as e:
+                LOG.warning('Ignoring corrupt metadata cache <%s>: %s' 
+                            % (cache_file, str(e)))
+    
+    def _is_valid(self, entry):
+        return (entry is not None and self.ttl > 0 and 
+                self._time() - entry['cached'] < self.ttl)
+    
+    def get_image(self, image_id):
+        '''
+        Get the cached details of an image as a dictionary with the keys id
+        and name, or None if the image isn't cached or has expired.
+        '''
+        with self._lock:
+            entry = self._data['images'].get(image_id)
+            if self._is_valid(entry):
+                return entry['image']
+            return None
+    
+    def set_images(self, images):
+        '''
+        Cache the details of the provided images, a list of dictionaries as 
+        returned by image_to_dict.
+        '''
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            now = self._time()
+            for image in images:
+                self._data['images'][image['id']] = {'image': image, 
+                                                     'cached': now}
+            self._save()
+    
+    def get_sizes(self):
+        '''
+        Get the cached list of node sizes, as dictionaries returned by 
+        size_to_dict, or None if the sizes aren't cached or have expired.
+        '''
+        with self._lock:
+            entry = self._data['sizes']
+            if self._is_valid(entry):
+                return entry['sizes']
+            return None
+    
+    def set_sizes(self, sizes):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data['sizes'] = {'sizes': sizes, 'cached': self._time()}
+            self._save()
+    
+    def invalidate(self):
+        '''
+        Remove all cached metadata for the platform.
+        '''
+        with self._lock:
+            self._data = {'images': {}, 'sizes': None}
+            if os.path.exists(self.cache_file):
+                os.remove(self.cache_file)
+        LOG.debug('Invalidated metadata cache <%s>.' % self.cache_file)
+    
+    def _save(self):
+        tmp_file = '%s.%s.tmp' % (self.cache_file, os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump(self._data, f, indent=1)
+        os.rename(tmp_file, self.cache_file)
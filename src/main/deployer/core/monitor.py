@@ -0,0 +1,358 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Monitoring of submitted jobs without blocking a connection, or a thread, per
+job.
+
+A JobMonitor tracks any number of jobs from a single background thread. Jobs
+are registered in groups, e.g. all the PBS jobs submitted via one host, and 
+the state of all the jobs in a group is polled with a single command, a 
+qstat for PBS jobs or a ps for jobs run directly over SSH. Each watched job 
+has a DeploymentFuture that reports the job's state changes to its state 
+callbacks and completes with a (state, exit code) tuple when the job 
+finishes.
+'''
+import logging
+import pipes
+import re
+import threading
+
+from deployer.core.exceptions import JobError
+from deployer.core.future import DeploymentFuture
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+# Job states, these match the SAGA job state names
+JOB_PENDING = 'Pending'
+JOB_RUNNING = 'Running'
+JOB_DONE = 'Done'
+JOB_FAILED = 'Failed'
+JOB_CANCELED = 'Canceled'
+FINAL_JOB_STATES = [JOB_DONE, JOB_FAILED, JOB_CANCELED]
+
+DEFAULT_MONITOR_POLL_INTERVAL = 10
+DEFAULT_MAX_POLL_FAILURES = 5
+
+# PBS job states, finished jobs (F and X) are done or failed depending on 
+# their exit status.
+PBS_JOB_STATES = {'Q': JOB_PENDING, 'H': JOB_PENDING, 'W': JOB_PENDING, 
+                  'T': JOB_PENDING, 'M': JOB_PENDING, 'R': JOB_RUNNING, 
+                  'E': JOB_RUNNING, 'B': JOB_RUNNING, 'S': JOB_RUNNING, 
+                  'U': JOB_RUNNING, 'F': JOB_DONE, 'X': JOB_DONE}
+
+_SAGA_JOB_ID = re.compile(r'^\[(.*)\]-\[(.*)\]$')
+_PBS_SUBJOB_ID = re.compile(r'^([^\[]+)\[\d+\](.*)$')
+
+def get_native_job_id(saga_job_id):
+    '''
+    Get the ID of a job on the platform that runs it, e.g. a PBS job ID or a
+    process ID, from a SAGA job ID of the form [service URL]-[native ID].
+    '''
+    match = _SAGA_JOB_ID.match(saga_job_id or '')
+    return match.group(2) if match else saga_job_id
+
+def get_qstat_command(job_ids):
+    # -x includes jobs that have finished in the output. Sub-jobs of job 
+    # arrays, e.g. 1234[3].server, are queried through their array with -t 
+    # so that one entry reports all the sub-jobs of an array.
+    query_ids = []
+    subjobs = False
+    for job_id in job_ids:
+        match = _PBS_SUBJOB_ID.match(job_id)
+        if match:
+            job_id = '%s[]%s' % match.groups()
+            subjobs = True
+        if job_id not in query_ids:
+            query_ids.append(job_id)
+    return 'qstat -x -f %s%s' % ('-t ' if subjobs else '',
+                                 ' '.join([pipes.quote(j) for j in query_ids]))
+
+def parse_qstat_output(output):
+    '''
+    Parse the output of qstat -f into a dictionary mapping each job ID to a
+    (state, exit code) tuple.
+    '''
+    states = {}
+    job_id = None
+    job_state = None
+    exit_code = None
+    for line in (output or '').splitlines() + ['Job Id: ']:
+        line = line.strip()
+        if line.startswith('Job Id:'):
+            if job_id and job_state:
+                state = PBS_JOB_STATES.get(job_state, JOB_RUNNING)
+                if state == JOB_DONE and exit_code not in [None, 0]:
+                    state = JOB_FAILED
+                states[job_id] = (state, exit_code)
+            job_id = line[len('Job Id:'):].strip()
+            job_state = None
+            exit_code = None
+        elif line.startswith('job_state ='):
+            job_state = line.split('=', 1)[1].strip()
+        elif line.startswith('Exit_status ='):
+            try:
+                exit_code = int(line.split('=', 1)[1].strip())
+            except ValueError:
+                pass
+    return states
+
+def poll_pbs_jobs(run_command, job_ids):
+    '''
+    Get the states of the PBS jobs with the specified IDs using a single 
+    qstat command run by run_command(command), which returns a (return 
+    value, stdout, stderr) tuple. Jobs that qstat doesn't report, e.g. 
+    because their history has expired, are left out of the result. 
+    '''
+    # qstat exits with a non-zero value if any of the jobs is unknown but 
+    # still reports the jobs that it knows about.
+    ret, out, err = run_command(get_qstat_command(job_ids))
+    reported = parse_qstat_output(out)
+    if not reported and ret != 0:
+        raise JobError('Unable to get the state of PBS jobs <%s>, qstat '
+                       'return value <%s>: %s' % (', '.join(job_ids), ret, err))
+    states = {}
+    for job_id in job_ids:
+        # qstat may report the job with the full server name appended
+        for reported_id in reported:
+            if (reported_id == job_id or 
+                reported_id.split('.')[0] == job_id.split('.')[0]):
+                states[job_id] = reported[reported_id]
+                break
+    return states
+
+def get_ps_command(pids):
+    return 'ps -o pid= -p %s' % ','.join([str(int(p)) for p in pids])
+
+def poll_processes(run_command, pids):
+    '''
+    Get the states of the processes with the specified IDs using a single 
+    ps command run by run_command(command). A process that is no longer 
+    running is done, its exit code isn't known.
+    '''
+    # ps exits with a non-zero value if none of the processes are running
+    ret, out, err = run_command(get_ps_command(pids))
+    if ret != 0 and err and err.strip():
+        raise JobError('Unable to get the state of processes <%s>, ps return '
+                       'value <%s>: %s' % (', '.join(pids), ret, err))
+    running = set([l.strip() for l in (out or '').splitlines() if l.strip()])
+    return dict([(pid, (JOB_RUNNING, None) if str(int(pid)) in running 
+                  else (JOB_DONE, None)) for pid in pids])
+
+class JobMonitor(object):
+    '''
+    Polls the state of watched jobs, in groups, from a single background 
+    thread. A group's poll function is called as poll_func(job_ids) with 
+    the IDs of all the group's watched jobs and returns a dictionary mapping
+    job IDs to (state, exit code) tuples. If polling a group fails 
+    max_poll_failures times in succession, the futures of its jobs fail.
+    
+    Some poll functions, e.g. poll_processes, can't determine the exit code 
+    of a finished job. If a job is watched with an exit_code_func, this is 
+    called as exit_code_func() to get the job's exit code when it finishes
+    without one.
+    
+    A process-wide monitor, with its polling thread started, is obtained 
+    using get_instance.
+    '''
+    
+    _instance = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, poll_interval=DEFAULT_MONITOR_POLL_INTERVAL,
+                 max_poll_failures=DEFAULT_MAX_POLL_FAILURES):
+        self.poll_interval = poll_interval
+        self.max_poll_failures = max_poll_failures
+        self._lock = threading.Lock()
+        # The poll function, watched job futures and number of successive 
+        # poll failures for each group
+        self._groups = {}
+        # The exit code functions of watched jobs by (group, job ID)
+        self._exit_code_funcs = {}
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = JobMonitor()
+                cls._instance.start()
+            return cls._instance
+    
+    def watch(self, group, job_id, poll_func, state_callback=None,
+              exit_code_func=None):
+        '''
+        Start watching a job and return a DeploymentFuture that completes 
+        with the job's final (state, exit code). The group's poll function 
+        is set by the first job watched in the group.
+        '''
+        future = DeploymentFuture()
+        if state_callback:
+            future.add_state_callback(state_callback)
+        with self._lock:
+            if group not in self._groups:
+                self._groups[group] = [poll_func, {}, 0]
+            self._groups[group][1][job_id] = future
+            if exit_code_func:
+                self._exit_code_funcs[(group, job_id)] = exit_code_func
+        LOG.debug('Watching job <%s> in group <%s>.' % (job_id, group))
+        return future
+    
+    def get_watched_count(self):
+        with self._lock:
+            return sum([len(jobs) for _, jobs, _ in self._groups.values()])
+    
+    def poll(self):
+        '''
+        Poll the state of all the watched jobs, one poll per group, updating
+        their futures. Returns the number of jobs still being watched. A group
+        can be removed while it is being polled, e.g. when its last job is 
+        unwatched, so groups are looked up again each time the lock is held.
+        '''
+        with self._lock:
+            groups = [(group, poll_func, dict(jobs)) for group, 
+                      (poll_func, jobs, _) in self._groups.items() if jobs]
+        for group, poll_func, jobs in groups:
+            try:
+                states = poll_func(sorted(jobs.keys()))
+            except Exception as e:
+                self._poll_failed(group, jobs, e)
+                continue
+            with self._lock:
+                entry = self._groups.get(group)
+                if entry:
+                    entry[2] = 0
+            for job_id, (state, exit_code) in states.items():
+                future = jobs.get(job_id)
+                if future is None:
+                    continue
+                if state != future.state:
+                    future.set_state(state, {'job_id': job_id, 
+                                             'exit_code': exit_code})
+                if state in FINAL_JOB_STATES:
+                    if exit_code is None:
+                        exit_code = self._get_exit_code(group, job_id)
+                    self._unwatch(group, job_id)
+                    future.set_result((state, exit_code))
+        return self.get_watched_count()
+    
+    def _poll_failed(self, group, jobs, error):
+        with self._lock:
+            entry = self._groups.get(group)
+            if not entry:
+                return
+            entry[2] += 1
+            failures = entry[2]
+        LOG.debug('Unable to poll jobs in group <%s> (failure <%d>): %s' 
+                  % (group, failures, str(error)))
+        if failures < self.max_poll_failures:
+            return
+        for job_id, future in jobs.items():
+            self._unwatch(group, job_id)
+            future.set_exception(JobError('Unable to monitor job <%s>: %s' 
+                                          % (job_id, str(error))))
+    
+    def _get_exit_code(self, group, job_id):
+        with self._lock:
+            exit_code_func = self._exit_code_funcs.get((group, job_id))
+        if not exit_code_func:
+            return None
+        try:
+            return exit_code_func()
+        except Exception as e:
+            LOG.debug('Unable to get the exit code of job <%s>: %s' 
+                      % (job_id, str(e)))
+            return None
+    
+    def _unwatch(self, group, job_id):
+        with self._lock:
+            self._exit_code_funcs.pop((group, job_id), None)
+            entry = self._groups.get(group)
+            if not entry:
+                return
+            entry[1].pop(job_id, None)
+            if not entry[1]:
+                del self._groups[group]
+    
+    def wake(self):
+        # Poll immediately rather than waiting for the poll interval
+        self._wakeup.set()
+    
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                LOG.error('Error polling job states: %s' % str(e))
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+def await_completion(futures, timeout=None):
+    '''
+    Wait for all of the job futures to complete and return their results, 
+    in the same order as futures.
+    '''
+    return [future.result(timeout) for future in futures]
@@ -0,0 +1,198 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+A warm pool of cloud nodes that are kept running between jobs.
+
+Instead of being shut down at the end of a job, configured and accessible 
+nodes are returned to the pool for their platform. A later job requiring 
+nodes of the same type, started from the same image with the same software 
+configuration, leases them from the pool instead of starting new nodes. 
+Nodes that have been idle for longer than the pool's idle timeout, and nodes
+beyond the pool's maximum size, are evicted and must be shut down by the 
+caller.
+
+The pool state is stored in a JSON file so that it survives process 
+restarts. Access to the state file is serialised between processes using a 
+lock file.
+'''
+import fcntl
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from deployer.core.utils import get_libhpc_dir
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+NODE_IDLE = 'idle'
+NODE_LEASED = 'leased'
+
+DEFAULT_POOL_IDLE_TIMEOUT = 1800
+
+class NodePool(object):
+    '''
+    The warm node pool for a single platform. Nodes are identified by their 
+    cloud node ID and grouped by node type and configuration key, a string 
+    identifying the image and software configuration of the node.
+    '''
+    
+    def __init__(self, platform_id, max_size, 
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT, state_file=None,
+                 time_func=time.time):
+        if not state_file:
+            state_file = os.path.join(get_libhpc_dir('state', 'pools'),
+                                      '%s.json' % platform_id)
+        self.state_file = state_file
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._time = time_func
+    
+    @contextmanager
+    def _state(self):
+        # Load the pool state with the lock held and save it afterwards
+        with open(self.state_file + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state = {'nodes': {}}
+                if os.path.exists(self.state_file):
+                    try:
+                        with open(self.state_file, 'r') as f:
+                            state = json.load(f)
+                    except ValueError as e:
+                        LOG.warning('Ignoring corrupt node pool state file '
+                                    '<%s>: %s' % (self.state_file, str(e)))
+                yield state
+                tmp_file = '%s.%s.tmp' % (self.state_file, os.getpid())
+                with open(tmp_file, 'w') as f:
+                    json.dump(state, f, indent=1)
+                os.rename(tmp_file, self.state_file)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _evict_expired(self, state):
+        now = self._time()
+        evicted = []
+        for node_id, node in state['nodes'].items():
+            if (node['state'] == NODE_IDLE and 
+                now - node['released'] > self.idle_timeout):
+                LOG.debug('Evicting node <%s> from the pool after <%d> '
+                          'seconds idle.' % (node_id, now - node['released']))
+                del state['nodes'][node_id]
+                evicted.append(node_id)
+        return evicted
+    
+    def lease(self, node_type, config_key, count, job_id):
+        '''
+        Lease count idle nodes of the specified type and configuration for
+        job_id. Nodes are only leased if enough matching nodes are available, 
+        otherwise no nodes are leased. Returns a tuple containing the list of
+        leased node IDs and the list of IDs of nodes evicted because they 
+        have been idle for too long. The evicted nodes should be shut down by
+        the caller.
+        '''
+        with self._state() as state:
+            evicted = self._evict_expired(state)
+            idle = sorted([node_id for node_id, node in state['nodes'].items()
+                           if node['state'] == NODE_IDLE and 
+                           node['node_type'] == node_type and
+                           node['config_key'] == config_key],
+                          key=lambda n: state['nodes'][n]['released'],
+                          reverse=True)
+            if len(idle) < count:
+                LOG.debug('Only <%d> of <%d> required nodes of type <%s> are '
+                          'available in the pool.' 
+                          % (len(idle), count, node_type))
+                return ([], evicted)
+            leased = idle[:count]
+            for node_id in leased:
+                state['nodes'][node_id]['state'] = NODE_LEASED
+                state['nodes'][node_id]['job_id'] = job_id
+            LOG.debug('Leased nodes <%s> from the pool for job <%s>.' 
+                      % (', '.join(leased), job_id))
+            return (leased, evicted)
+    
+    def release(self, node_ids, node_type, config_key):
+        '''
+        Return nodes to the pool. Nodes that weren't previously in the pool 
+        are added. Returns a tuple containing the list of node IDs that 
+        could not be kept because the pool is full and the list of node IDs 
+        evicted because they have been idle for too long. Both sets of nodes 
+        should be shut down by the caller.
+        '''
+        with self._state() as state:
+            evicted = self._evict_expired(state)
+            now = self._time()
+            rejected = []
+            for node_id in node_ids:
+                if (node_id not in state['nodes'] and 
+                    len(state['nodes']) >= self.max_size):
+                    rejected.append(node_id)
+                    continue
+                state['nodes'][node_id] = {'node_type': node_type,
+                                           'config_key': config_key,
+                                           'state': NODE_IDLE,
+                                           'job_id': None,
+                                           'released': now}
+            return (rejected, evicted)
+    
+    def remove(self, node_ids):
+        '''
+        Remove nodes from the pool, e.g. because they are no longer 
+        accessible or have been shut down.
+        '''
+        with self._state() as state:
+            for node_id in node_ids:
+                state['nodes'].pop(node_id, None)
+    
+    def get_nodes(self):
+        with self._state() as state:
+            return dict(state['nodes'])
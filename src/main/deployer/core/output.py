@@ -0,0 +1,244 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Helpers for building the command used to archive a job's output files on 
+the remote platform and for receiving an output archive streamed back from 
+the remote platform.
+
+By default all files in the job's working directory are archived. A job may 
+instead specify glob patterns for the files to include and/or exclude and a 
+maximum file size, in which case the files to archive are selected using 
+find and passed to tar.
+
+A streamed archive is written to a temporary file or directory alongside its
+destination and only moved into place once the stream has been received and
+the remote command has succeeded, so that a failed transfer doesn't leave a 
+partial archive or a partly extracted tree behind.
+'''
+import logging
+import os
+import pipes
+import re
+import shutil
+import subprocess
+import tarfile
+import tempfile
+
+from deployer.core.exceptions import JobConfigurationError, JobError
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+# Buffer size used when writing streamed output data to a local file
+STREAM_BUFFER_SIZE = 1024*1024
+
+SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+
+def parse_size(value):
+    '''
+    Convert a size, either an integer number of bytes or a string with an 
+    optional K, M, G or T suffix (e.g. '500M'), to a number of bytes.
+    '''
+    if value is None:
+        return None
+    if isinstance(value, (int, long)):
+        return value
+    match = re.match(r'^\s*(\d+)\s*([KMGT]?)B?\s*$', str(value).upper())
+    if not match:
+        raise JobConfigurationError('Unable to parse the size value <%s>.' 
+                                    % value)
+    return int(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+def _get_find_test(pattern):
+    # Patterns containing a path separator are matched against the path 
+    # relative to the working directory, others against the file name.
+    if pattern.startswith('./'):
+        pattern = pattern[2:]
+    if '/' in pattern:
+        return '-path %s' % pipes.quote('./' + pattern)
+    return '-name %s' % pipes.quote(pattern)
+
+def get_output_archive_command(archive_target, include=None, exclude=None,
+                               max_file_size=None):
+    '''
+    Get the shell command, to be run in a job's working directory, that 
+    writes a gzipped tar archive of the job's output files to archive_target. 
+    archive_target may be '-' to write the archive to stdout. 
+    
+    include and exclude are lists of glob patterns and max_file_size is the 
+    maximum size of a file to include, as accepted by parse_size.
+    '''
+    if isinstance(include, basestring):
+        include = [include]
+    if isinstance(exclude, basestring):
+        exclude = [exclude]
+    max_file_size = parse_size(max_file_size)
+    
+    if not (include or exclude or max_file_size is not None):
+        return 'tar -czf %s *' % pipes.quote(archive_target)
+    
+    tests = ['-type f']
+    if include:
+        tests.append('\\( %s \\)' % ' -o '.join([_get_find_test(p) 
+                                                 for p in include]))
+    for pattern in (exclude or []):
+        tests.append('! %s' % _get_find_test(pattern))
+    if archive_target != '-':
+        tests.append('! %s' % _get_find_test(archive_target))
+    if max_file_size is not None:
+        tests.append('! -size +%sc' % max_file_size)
+    
+    return ('find . %s -print0 | tar -czf %s --null -T -' 
+            % (' '.join(tests), pipes.quote(archive_target)))
+
+def _check_archive_member(member):
+    # Archive members are received from the remote platform so members that
+    # would be written, or link to, a location outside the extraction 
+    # directory are refused.
+    names = [member.name]
+    if member.issym() or member.islnk():
+        names.append(member.linkname)
+    elif not (member.isfile() or member.isdir()):
+        raise JobError('The output archive member <%s> is not a file, '
+                       'directory or link.' % member.name)
+    for name in names:
+        if os.path.isabs(name) or '..' in name.replace('\\', '/').split('/'):
+            raise JobError('The output archive member <%s> has an unsafe '
+                           'path <%s>.' % (member.name, name))
+
+def extract_archive_stream(fileobj, target):
+    '''
+    Extract the gzipped tar archive read from fileobj, e.g. a pipe, into the
+    target directory, refusing members with absolute paths or .. 
+    components.
+    '''
+    tar = tarfile.open(fileobj=fileobj, mode='r|gz')
+    try:
+        for member in tar:
+            _check_archive_member(member)
+            tar.extract(member, target)
+    finally:
+        tar.close()
+
+def stream_output_archive(cmd, destination, job_id, extract=False, 
+                          source=None):
+    '''
+    Run cmd, a command that writes a gzipped tar archive of a job's output 
+    files to stdout, e.g. over ssh, and save the archive as <job_id>.tar.gz 
+    in the destination directory, or to destination if it isn't a 
+    directory. If extract is set, the archive is instead extracted into a 
+    sub-directory of destination named with the job ID. source describes 
+    where the output is streamed from in error messages. Returns the path 
+    of the saved archive or extracted directory. 
+    
+    A JobError, including the exit code and error output of cmd, is raised
+    if cmd fails or the stream can't be saved, in which case nothing is left
+    at the target path.
+    '''
+    if extract:
+        target = os.path.join(destination, job_id)
+    elif os.path.isdir(destination):
+        target = os.path.join(destination, job_id + '.tar.gz')
+    else:
+        target = destination
+    if extract and os.path.exists(target):
+        raise JobError('Unable to extract streamed output to <%s>, it already '
+                       'exists.' % target)
+    target_dir = os.path.dirname(os.path.abspath(target))
+    if extract:
+        tmp_target = tempfile.mkdtemp(dir=target_dir, prefix='.%s-' % job_id)
+    else:
+        fd, tmp_target = tempfile.mkstemp(dir=target_dir, 
+                                          prefix='.%s-' % job_id)
+        os.close(fd)
+    
+    err_file = tempfile.TemporaryFile()
+    stream_error = None
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=err_file)
+        try:
+            if extract:
+                extract_archive_stream(proc.stdout, tmp_target)
+                # Read any padding after the end of the archive so that the 
+                # remote command isn't stopped by a closed pipe.
+                while proc.stdout.read(STREAM_BUFFER_SIZE):
+                    pass
+            else:
+                with open(tmp_target, 'wb') as f:
+                    shutil.copyfileobj(proc.stdout, f, STREAM_BUFFER_SIZE)
+        except Exception as e:
+            stream_error = e
+        finally:
+            proc.stdout.close()
+            if stream_error is not None and proc.poll() is None:
+                proc.kill()
+            proc.wait()
+        
+        err_file.seek(0)
+        err_output = err_file.read().strip()
+        if proc.returncode != 0 or stream_error is not None:
+            message = ('Error streaming output files from <%s>, exit code '
+                       '<%s>: %s' % (source or ' '.join(cmd), proc.returncode,
+                                     err_output or 'no error output'))
+            if stream_error is not None:
+                message += ' (%s: %s)' % (stream_error.__class__.__name__,
+                                          str(stream_error))
+            raise JobError(message)
+        
+        os.rename(tmp_target, target)
+    except:
+        if os.path.isdir(tmp_target):
+            shutil.rmtree(tmp_target, ignore_errors=True)
+        elif os.path.exists(tmp_target):
+            os.remove(tmp_target)
+        raise
+    finally:
+        err_file.close()
+    LOG.debug('Output streamed to <%s>.' % target)
+    return target
@@ -0,0 +1,156 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Bounded parallel execution of tasks using a pool of worker threads.
+
+Each worker can optionally open its own connection (e.g. a SAGA PTYShell) 
+when it starts. The connection is passed to the task function for each item 
+processed by that worker so that tasks run over independent channels while 
+the number of connections remains bounded by the number of workers.
+'''
+import logging
+import threading
+import time
+import Queue
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+class TaskResult(object):
+    '''
+    The outcome of running a task for a single item. If the task raised an 
+    exception, error holds the exception and result is None. elapsed is the 
+    time in seconds taken to run the task.
+    '''
+    
+    def __init__(self, item, result=None, error=None, elapsed=0.0):
+        self.item = item
+        self.result = result
+        self.error = error
+        self.elapsed = elapsed
+    
+    @property
+    def succeeded(self):
+        return self.error is None
+
+def _close_connection(conn, broken=False):
+    try:
+        if broken and hasattr(conn, 'release'):
+            conn.release(broken=True)
+        elif hasattr(conn, 'finalize'):
+            conn.finalize()
+    except Exception as e:
+        LOG.debug('Error closing worker connection: %s' % str(e))
+
+def run_parallel(func, items, max_workers, connection_factory=None):
+    '''
+    Run func for each of the items using up to max_workers threads and return
+    a list of TaskResult objects in the same order as items. 
+    
+    If connection_factory is provided, each worker calls it once to obtain a 
+    connection and func is called as func(connection, item), otherwise func 
+    is called as func(item). If a connection has a finalize() function, this 
+    is called when the worker finishes. If func raises an exception, the 
+    connection may no longer be usable so it is closed, by calling 
+    release(broken=True) if the connection provides it or finalize() 
+    otherwise, and the worker obtains a new connection for its next item. 
+    Exceptions raised by func, or by the connection factory, are recorded in 
+    the corresponding TaskResult rather than being raised.
+    '''
+    items = list(items)
+    results = [None] * len(items)
+    if not items:
+        return results
+    
+    work_queue = Queue.Queue()
+    for index, item in enumerate(items):
+        work_queue.put((index, item))
+    
+    def _worker():
+        conn = None
+        try:
+            while True:
+                try:
+                    index, item = work_queue.get_nowait()
+                except Queue.Empty:
+                    break
+                start = time.time()
+                try:
+                    if connection_factory:
+                        if conn is None:
+                            conn = connection_factory()
+                        result = func(conn, item)
+                    else:
+                        result = func(item)
+                    results[index] = TaskResult(item, result=result,
+                                                elapsed=time.time() - start)
+                except Exception as e:
+                    results[index] = TaskResult(item, error=e,
+                                                elapsed=time.time() - start)
+                    if conn is not None:
+                        _close_connection(conn, broken=True)
+                        conn = None
+        finally:
+            if conn is not None:
+                _close_connection(conn)
+    
+    if not max_workers or max_workers < 1:
+        max_workers = 1
+    num_workers = min(int(max_workers), len(items))
+    workers = []
+    for _ in range(num_workers):
+        t = threading.Thread(target=_worker)
+        t.daemon = True
+        t.start()
+        workers.append(t)
+    
+    for t in workers:
+        t.join()
+    
+    return results
@@ -0,0 +1,262 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+
+'''
+Created on 17 Oct 2026
+
+Mapping the resource requirements of a job to a PBS Professional resource 
+request and generating the script that runs the job.
+
+A job's processes are requested as select statement chunks, one chunk per 
+node, each with ncpus and mpiprocs set to the number of processes run on the
+node so that MPI ranks aren't packed onto oversubscribed nodes. Where the 
+number of processes isn't a multiple of the processes per node, a smaller 
+chunk is added for the remaining processes. The memory of a chunk is the 
+memory per process multiplied by its number of processes. A queue can be 
+chosen for a job using a list of queue rules, the first rule that the job 
+satisfies giving the queue. Parallel jobs can be started by an MPI launcher
+given by a template, e.g. mpiexec -n $num_processes.
+'''
+import logging
+import pipes
+from string import Template
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+PLACEMENT_ARRANGEMENTS = ['free', 'pack', 'scatter', 'vscatter']
+PLACEMENT_SHARING = ['excl', 'exclhost', 'shared']
+QUEUE_RULE_KEYS = ['name', 'min_processes', 'max_processes', 
+                   'max_time_limit_mins', 'max_memory_per_process']
+JOB_SCRIPT_NAME = 'libhpc-job.sh'
+
+def get_chunks(num_processes, processes_per_node=1):
+    '''
+    Get the select statement chunks for a job as a list of (number of 
+    chunks, processes per chunk) tuples.
+    '''
+    num_processes = int(num_processes)
+    ppn = max(1, min(int(processes_per_node or 1), num_processes))
+    full_chunks, remainder = divmod(num_processes, ppn)
+    chunks = []
+    if full_chunks:
+        chunks.append((full_chunks, ppn))
+    if remainder:
+        chunks.append((1, remainder))
+    return chunks
+
+def get_select_statement(num_processes, processes_per_node=1, 
+                         memory_per_process=None):
+    '''
+    Get the select statement requesting num_processes processes, run 
+    processes_per_node to a node, each with memory_per_process MB of memory.
+    '''
+    statements = []
+    for count, procs in get_chunks(num_processes, processes_per_node):
+        chunk = '%d:ncpus=%d:mpiprocs=%d' % (count, procs, procs)
+        if memory_per_process:
+            chunk += ':mem=%dmb' % (procs * int(memory_per_process))
+        statements.append(chunk)
+    return 'select=' + '+'.join(statements)
+
+def get_place_statement(placement):
+    '''
+    Get the place statement for a placement, e.g. scatter or pack:excl. 
+    '''
+    for value in placement.split(':'):
+        if value not in PLACEMENT_ARRANGEMENTS + PLACEMENT_SHARING:
+            raise ValueError('Unknown job placement <%s>, a placement '
+                             'consists of an arrangement, one of <%s>, '
+                             'and/or a sharing value, one of <%s>.' 
+                             % (placement, ', '.join(PLACEMENT_ARRANGEMENTS),
+                                ', '.join(PLACEMENT_SHARING)))
+    return 'place=' + placement
+
+def get_walltime(time_limit_mins):
+    return 'walltime=%02d:%02d:00' % divmod(int(time_limit_mins), 60)
+
+def check_queue_rules(queue_rules):
+    '''
+    Check that queue_rules is a list of queue rules, each a dictionary with
+    the name of a queue and, optionally, the minimum and maximum numbers of 
+    processes, maximum time limit in minutes and maximum memory per process 
+    in MB of the jobs that the queue is used for.
+    '''
+    if not isinstance(queue_rules, list):
+        raise ValueError('The queue rules must be a list, got <%s>.' 
+                         % queue_rules)
+    for rule in queue_rules:
+        if not isinstance(rule, dict) or 'name' not in rule:
+            raise ValueError('The queue rule <%s> doesn\'t specify a queue '
+                             'name.' % rule)
+        unknown = [k for k in rule.keys() if k not in QUEUE_RULE_KEYS]
+        if unknown:
+            raise ValueError('The queue rule for queue <%s> has unknown keys '
+                             '<%s>.' % (rule['name'], ', '.join(unknown)))
+
+def select_queue(queue_rules, num_processes, time_limit_mins=None,
+                 memory_per_process=None, default_queue=None):
+    '''
+    Get the queue for a job from the first of the queue rules that the job 
+    satisfies, or default_queue if it doesn't satisfy any of them. A rule 
+    with a maximum time limit or memory per process is only satisfied by 
+    jobs that specify their time limit or memory per process. 
+    '''
+    num_processes = int(num_processes)
+    for rule in queue_rules or []:
+        if num_processes < int(rule.get('min_processes', 0)):
+            continue
+        if ('max_processes' in rule and 
+            num_processes > int(rule['max_processes'])):
+            continue
+        if 'max_time_limit_mins' in rule and (
+                not time_limit_mins or 
+                int(time_limit_mins) > int(rule['max_time_limit_mins'])):
+            continue
+        if 'max_memory_per_process' in rule and (
+                not memory_per_process or 
+                int(memory_per_process) > int(rule['max_memory_per_process'])):
+            continue
+        return rule['name']
+    return default_queue
+
+def get_resource_options(job_config, queue_rules=None, default_queue=None,
+                         default_placement=None):
+    '''
+    Get the qsub options requesting the resources for the job described by 
+    job_config. The job's queue, if it specifies one, overrides the queue 
+    rules and its node placement overrides default_placement.
+    '''
+    num_processes = int(getattr(job_config, 'num_processes', 1) or 1)
+    time_limit_mins = getattr(job_config, 'time_limit_mins', None)
+    memory_per_process = getattr(job_config, 'memory_per_process', None)
+    options = []
+    queue = (getattr(job_config, 'queue', None) or 
+             select_queue(queue_rules, num_processes, time_limit_mins, 
+                          memory_per_process, default_queue))
+    if queue:
+        options += ['-q', queue]
+    options += ['-l', get_select_statement(
+                        num_processes, 
+                        getattr(job_config, 'processes_per_node', 1),
+                        memory_per_process)]
+    placement = getattr(job_config, 'node_placement', None) or default_placement
+    if placement:
+        options += ['-l', get_place_statement(placement)]
+    if time_limit_mins:
+        options += ['-l', get_walltime(time_limit_mins)]
+    return options
+
+def get_qsub_command(script_file, resource_options=None, output_dir=None, 
+                     array_range=None):
+    '''
+    Get the qsub command that submits script_file, requesting the resources
+    given by resource_options. If array_range, e.g. 0-9, is provided, the 
+    script is submitted as a job array.
+    '''
+    args = ['qsub']
+    if array_range:
+        args += ['-J', array_range]
+    args += ['-S', '/bin/sh'] + list(resource_options or [])
+    if output_dir:
+        args += ['-o', output_dir, '-e', output_dir]
+    args.append(script_file)
+    return ' '.join([pipes.quote(a) for a in args])
+
+def get_launcher(launcher_template, job_config):
+    '''
+    Get the MPI launcher command for a job from a launcher template, e.g. 
+    mpiexec -n $num_processes, or None if the job has a single process or no
+    template is provided. The template may reference $num_processes, 
+    $processes_per_node and $num_nodes.
+    '''
+    num_processes = int(getattr(job_config, 'num_processes', 1) or 1)
+    if not launcher_template or num_processes < 2:
+        return None
+    chunks = get_chunks(num_processes, 
+                        getattr(job_config, 'processes_per_node', 1))
+    return Template(launcher_template).safe_substitute(
+                num_processes=num_processes, 
+                processes_per_node=chunks[0][1],
+                num_nodes=sum([count for count, _ in chunks]))
+
+def get_job_commands(job_config, input_files=None, launcher=None):
+    '''
+    Get the shell commands that run the job described by job_config, with 
+    the paths of its transferred input files appended to its arguments. If 
+    provided, launcher is the MPI launcher command that starts the job.
+    '''
+    commands = []
+    working_dir = getattr(job_config, 'working_dir', None)
+    if working_dir:
+        commands.append('cd %s || exit 1' % pipes.quote(working_dir))
+    environment = getattr(job_config, 'environment', None) or {}
+    for name in sorted(environment.keys()):
+        commands.append('export %s=%s' 
+                        % (name, pipes.quote(str(environment[name]))))
+    arguments = list(getattr(job_config, 'args', None) or []) 
+    arguments += list(input_files or [])
+    command = ' '.join([pipes.quote(str(a)) for a in 
+                        [job_config.executable] + arguments])
+    if launcher:
+        command = launcher + ' ' + command
+    if getattr(job_config, 'stdout', None):
+        command += ' > %s' % pipes.quote(job_config.stdout)
+    if getattr(job_config, 'stderr', None):
+        command += ' 2> %s' % pipes.quote(job_config.stderr)
+    commands.append('exec ' + command)
+    return commands
+
+def get_job_script(job_config, input_files=None, launcher_template=None):
+    '''
+    Get the script that is submitted to run the job described by job_config.
+    '''
+    launcher = get_launcher(launcher_template, job_config)
+    return '\n'.join(['#!/bin/sh', 
+                      '# Job script generated by libhpc-deployer'] + 
+                     get_job_commands(job_config, input_files, launcher) + 
+                     [''])
@@ -0,0 +1,176 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Placement of a job's processes on cloud nodes.
+
+Given the number of processes a job requires and the sizes available on a 
+cloud platform, as cached in the platform's metadata cache, the placement 
+planner chooses the node type, the number of nodes and the number of 
+processes to run on each node. Nodes are filled up to their number of 
+cores, limited by the memory required per process, so that nodes are 
+neither under-filled nor over-subscribed. Where more than one node type is 
+allowed, the type is chosen by cost or by throughput.
+'''
+import logging
+from math import ceil
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+# 'cost' chooses the placement with the lowest total price per hour, 
+# 'throughput' chooses the placement using the fewest nodes, and so the 
+# least inter-node communication.
+PLACEMENT_OBJECTIVES = ['cost', 'throughput']
+
+class PlacementPlan(object):
+    '''
+    A placement of num_processes processes on num_nodes nodes of type 
+    node_type. slots contains the number of processes to run on each node. 
+    '''
+    
+    def __init__(self, node_type, num_processes, slots, cores, price=None):
+        self.node_type = node_type
+        self.num_processes = num_processes
+        self.slots = slots
+        self.cores = cores
+        self.price = price
+    
+    @property
+    def num_nodes(self):
+        return len(self.slots)
+    
+    @property
+    def processes_per_node(self):
+        return max(self.slots)
+    
+    @property
+    def cost(self):
+        if self.price is None:
+            return None
+        return self.price * self.num_nodes
+    
+    @property
+    def idle_cores(self):
+        return self.cores * self.num_nodes - self.num_processes
+    
+    def __repr__(self):
+        return ('<PlacementPlan %s x %s, slots %s, cost %s>' 
+                % (self.num_nodes, self.node_type, self.slots, self.cost))
+
+def get_node_slots(num_processes, num_nodes):
+    '''
+    Spread num_processes processes as evenly as possible across num_nodes 
+    nodes, returning the number of processes for each node.
+    '''
+    base, extra = divmod(num_processes, num_nodes)
+    return [base + 1] * extra + [base] * (num_nodes - extra)
+
+def plan_placement(num_processes, sizes, node_types=None, objective='cost',
+                   default_cores=None, memory_per_process=None):
+    '''
+    Plan the placement of num_processes processes. sizes is a list of node 
+    size dictionaries as returned by metadata_cache.size_to_dict. Only the 
+    sizes in node_types are considered if it is provided. Sizes for which 
+    the platform doesn't report a number of cores are assumed to have 
+    default_cores cores, or are ignored if it isn't set. memory_per_process 
+    is the memory, in MB, required by each process. Raises a ValueError if 
+    no size can run the job.
+    '''
+    if objective not in PLACEMENT_OBJECTIVES:
+        raise ValueError('Placement objective <%s> is not one of <%s>.' 
+                         % (objective, PLACEMENT_OBJECTIVES))
+    num_processes = int(num_processes)
+    plans = []
+    for size in sizes:
+        if node_types and size['id'] not in node_types:
+            continue
+        cores = size.get('cores') or default_cores
+        if not cores:
+            LOG.debug('Ignoring node type <%s> with an unknown number of '
+                      'cores.' % size['id'])
+            continue
+        processes_per_node = int(cores)
+        if memory_per_process and size.get('ram'):
+            processes_per_node = min(processes_per_node, 
+                                     int(size['ram'] // memory_per_process))
+        if processes_per_node < 1:
+            LOG.debug('Ignoring node type <%s> with insufficient memory for '
+                      'a process.' % size['id'])
+            continue
+        num_nodes = int(ceil(float(num_processes) / processes_per_node))
+        plans.append(PlacementPlan(size['id'], num_processes, 
+                                   get_node_slots(num_processes, num_nodes),
+                                   int(cores), size.get('price')))
+    if not plans:
+        raise ValueError('None of the node types <%s> can be used to run <%s>'
+                         ' processes.' % (node_types or 
+                         [size['id'] for size in sizes], num_processes))
+    
+    # Plans without a known price are only chosen by cost if no price is 
+    # known for any of the plans.
+    def _cost(plan):
+        return (plan.cost is None, plan.cost)
+    if objective == 'cost':
+        key = lambda plan: (_cost(plan), plan.num_nodes, plan.idle_cores)
+    else:
+        key = lambda plan: (plan.num_nodes, _cost(plan), plan.idle_cores)
+    plan = min(plans, key=key)
+    LOG.debug('Placement plan for <%s> processes: %s' % (num_processes, plan))
+    return plan
+
+def get_machinefile(hosts, slots):
+    '''
+    Get the content of an MPI machinefile running slots[i] processes on 
+    hosts[i].
+    '''
+    lines = ['# Machine file for MPI job runs']
+    for host, host_slots in zip(hosts, slots):
+        lines.append('%s slots=%s max_slots=%s' % (host, host_slots, 
+                                                   host_slots))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,185 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Concurrent readiness probing of remote nodes.
+
+Each node is probed independently by its own worker, first with a cheap check
+that the node's SSH server is accepting connections and then with a full 
+check (e.g. an authenticated SFTP directory listing). Failed probes are 
+retried with exponential backoff and jitter until the node responds, the 
+maximum number of attempts is reached or an overall deadline passes. Probing
+finishes as soon as all nodes have responded.
+'''
+import logging
+import random
+import socket
+import time
+
+from deployer.core.parallel import run_parallel
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+DEFAULT_PROBE_INITIAL_DELAY = 10
+DEFAULT_PROBE_MAX_DELAY = 60
+DEFAULT_PROBE_BACKOFF = 2.0
+DEFAULT_PROBE_JITTER = 0.25
+DEFAULT_PROBE_DEADLINE = 600
+DEFAULT_PROBE_CONNECT_TIMEOUT = 5
+DEFAULT_PROBE_THREADS = 16
+
+def get_backoff_delay(attempt, initial_delay, max_delay, backoff, jitter, 
+                      random_func=random.random):
+    '''
+    Get the delay in seconds before retrying after the given number of 
+    failed attempts (starting at 1). The delay grows by a factor of backoff 
+    for each attempt up to max_delay and is then reduced by a random fraction
+    of up to jitter so that probes of different nodes don't run in lockstep.
+    '''
+    delay = min(float(max_delay), initial_delay * (backoff ** (attempt - 1)))
+    return delay * (1.0 - jitter * random_func())
+
+def check_ssh_banner(host, port=22, timeout=DEFAULT_PROBE_CONNECT_TIMEOUT):
+    '''
+    Check whether an SSH server is accepting connections on host:port by 
+    opening a TCP connection and reading the server's identification string.
+    Returns True if the server responded with an SSH banner.
+    '''
+    sock = None
+    try:
+        sock = socket.create_connection((host, int(port)), timeout)
+        banner = sock.recv(256)
+        return banner.startswith('SSH-')
+    except (socket.error, socket.timeout) as e:
+        LOG.debug('SSH banner check for <%s:%s> failed: %s' 
+                  % (host, port, str(e)))
+        return False
+    finally:
+        if sock is not None:
+            sock.close()
+
+class NodeProber(object):
+    '''
+    Probe a set of nodes concurrently until they are all accessible.
+    
+    check is a function taking a node identifier and returning True if the 
+    node is accessible. If pre_check is provided, it is called before check 
+    on each attempt and check is only called if pre_check returns True. 
+    Exceptions that are instances of the types in fatal_errors are re-raised
+    by probe(), any other exception counts as a failed attempt.
+    '''
+    
+    def __init__(self, check, pre_check=None, 
+                 initial_delay=DEFAULT_PROBE_INITIAL_DELAY, 
+                 max_delay=DEFAULT_PROBE_MAX_DELAY, 
+                 backoff=DEFAULT_PROBE_BACKOFF, jitter=DEFAULT_PROBE_JITTER,
+                 deadline=DEFAULT_PROBE_DEADLINE, max_attempts=None,
+                 max_workers=DEFAULT_PROBE_THREADS, fatal_errors=(),
+                 sleep_func=time.sleep, time_func=time.time):
+        self.check = check
+        self.pre_check = pre_check
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.max_workers = max_workers
+        self.fatal_errors = tuple(fatal_errors)
+        self._sleep = sleep_func
+        self._time = time_func
+    
+    def _attempt(self, node):
+        if self.pre_check and not self.pre_check(node):
+            return False
+        return bool(self.check(node))
+    
+    def _probe_node(self, node, end_time):
+        attempt = 0
+        while True:
+            attempt += 1
+            LOG.debug('Attempt <%s> to connect to remote node <%s>...' 
+                      % (attempt, node))
+            try:
+                if self._attempt(node):
+                    LOG.debug('Remote node <%s> is accessible.' % node)
+                    return True
+            except self.fatal_errors:
+                raise
+            except Exception as e:
+                LOG.debug('Error probing remote node <%s>: %s' % (node, str(e)))
+            
+            if self.max_attempts and attempt >= self.max_attempts:
+                return False
+            delay = get_backoff_delay(attempt, self.initial_delay, 
+                                      self.max_delay, self.backoff, 
+                                      self.jitter)
+            remaining = end_time - self._time()
+            if remaining <= 0:
+                return False
+            delay = min(delay, remaining)
+            LOG.debug('Waiting <%.1f> seconds before retrying connection to '
+                      '<%s>...' % (delay, node))
+            self._sleep(delay)
+    
+    def probe(self, nodes):
+        '''
+        Probe the nodes and return a list of the nodes that were not 
+        accessible within the deadline or maximum number of attempts. An 
+        empty list is returned if all nodes are accessible.
+        '''
+        end_time = self._time() + self.deadline
+        results = run_parallel(lambda node: self._probe_node(node, end_time),
+                               nodes, self.max_workers)
+        for result in results:
+            if not result.succeeded and isinstance(result.error, 
+                                                   self.fatal_errors):
+                raise result.error
+        return [result.item for result in results 
+                if not (result.succeeded and result.result)]
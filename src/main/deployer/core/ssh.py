@@ -0,0 +1,101 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Helpers for running the OpenSSH command line tools directly, for operations 
+that need a raw byte stream to or from a remote resource rather than the 
+command/response interface provided by SAGA-Python.
+'''
+import logging
+import pipes
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+DEFAULT_SSH_OPTIONS = {'StrictHostKeyChecking': 'no', 
+                       'BatchMode': 'yes'}
+
+def split_host_port(host, port=None):
+    '''
+    Split a host string of the form host:port into its host and port parts.
+    If host doesn't contain a port, the provided port value is returned.
+    '''
+    if host and ':' in host:
+        host, host_port = host.rsplit(':', 1)
+        port = int(host_port)
+    return (host, port)
+
+def get_ssh_command(host, user_id=None, key_file=None, port=None, 
+                    options=None):
+    '''
+    Get the argument list to run ssh to the specified host. host may be of the 
+    form host:port. Any options provided are added as -o options in addition
+    to DEFAULT_SSH_OPTIONS. The remote command, if any, should be appended
+    to the returned list by the caller.
+    '''
+    host, port = split_host_port(host, port)
+    ssh_options = dict(DEFAULT_SSH_OPTIONS)
+    if options:
+        ssh_options.update(options)
+    cmd = ['ssh']
+    if key_file:
+        cmd += ['-i', key_file]
+    if port:
+        cmd += ['-p', str(port)]
+    for key in sorted(ssh_options.keys()):
+        cmd += ['-o', '%s=%s' % (key, ssh_options[key])]
+    cmd.append('%s@%s' % (user_id, host) if user_id else host)
+    return cmd
+
+def get_ssh_command_string(*args, **kwargs):
+    '''
+    As get_ssh_command but returns the command (without the target host) as a
+    single shell-quoted string, as required for the rsync -e option. 
+    '''
+    return ' '.join([pipes.quote(arg) for arg in 
+                     get_ssh_command(*args, **kwargs)[:-1]])
@@ -0,0 +1,234 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Concurrent staging of job input files to a remote resource.
+
+The InputStager sends a list of local files to a directory on a remote 
+resource using a bounded pool of worker threads. Each worker opens a single
+connection (e.g. a SAGA PTYShell) when it starts and reuses it for every file 
+that it transfers so the cost of authenticating is paid once per worker 
+rather than once per file.
+
+Alternatively, for jobs with large numbers of small input files, the files 
+can be streamed into a single (optionally compressed) tar archive on the 
+client using create_input_bundle. The archive is then sent in a single
+transfer and unpacked remotely.
+'''
+import logging
+import os
+import pipes
+import subprocess
+import tarfile
+import tempfile
+
+from deployer.core.exceptions import FileTransferError, JobConfigurationError,\
+    JobError
+from deployer.core.parallel import run_parallel
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+DEFAULT_TRANSFER_THREADS = 4
+
+# Supported input bundle compression types. Each entry maps to the suffix
+# of the bundle file, the tarfile mode used to write the bundle and the
+# command used to unpack the bundle on the remote platform.
+BUNDLE_COMPRESSION_TYPES = {
+    'none': ('.tar', 'w|', 'tar -xf %s'),
+    'gzip': ('.tar.gz', 'w|gz', 'tar -xzf %s'),
+    'zstd': ('.tar.zst', 'w|', 'zstd -dcq %s | tar -xf -'),
+}
+
+def _get_bundle_compression(compression):
+    if not compression:
+        compression = 'none'
+    compression = str(compression).lower()
+    if compression not in BUNDLE_COMPRESSION_TYPES:
+        raise JobConfigurationError('Unsupported input bundle compression '
+                                    'type <%s>, expected one of <%s>.' 
+                                    % (compression, 
+                                       BUNDLE_COMPRESSION_TYPES.keys()))
+    return compression
+
+def create_input_bundle(local_files, bundle_name, compression=None,
+                        bundle_dir=None):
+    '''
+    Stream the provided local files into a single tar archive named 
+    bundle_name, plus the suffix for the compression type, in bundle_dir (or 
+    the system temporary directory if bundle_dir is not specified). Files are 
+    stored at the top level of the archive using their basenames. 
+    
+    compression can be None, 'none', 'gzip' or 'zstd'. zstd compression 
+    requires the zstd command line tool on both the client and the remote 
+    platform. 
+    
+    Returns the full path of the created bundle.
+    '''
+    compression = _get_bundle_compression(compression)
+    suffix, mode, _ = BUNDLE_COMPRESSION_TYPES[compression]
+    if not bundle_dir:
+        bundle_dir = tempfile.gettempdir()
+    bundle_path = os.path.join(bundle_dir, bundle_name + suffix)
+    
+    LOG.debug('Creating input bundle <%s> from <%s> files...' 
+              % (bundle_path, len(local_files)))
+    
+    with open(bundle_path, 'wb') as bundle_file:
+        compressor = None
+        if compression == 'zstd':
+            try:
+                compressor = subprocess.Popen(['zstd', '-q', '-c'], 
+                                              stdin=subprocess.PIPE,
+                                              stdout=bundle_file)
+            except OSError as e:
+                raise JobError('Unable to run zstd to compress the input '
+                               'bundle <%s>: %s' % (bundle_path, str(e)))
+            output = compressor.stdin
+        else:
+            output = bundle_file
+        
+        try:
+            tar = tarfile.open(mode=mode, fileobj=output)
+            try:
+                for local_file in local_files:
+                    tar.add(local_file, arcname=os.path.basename(local_file))
+            finally:
+                tar.close()
+        finally:
+            if compressor:
+                compressor.stdin.close()
+                if compressor.wait() != 0:
+                    raise JobError('Compression of the input bundle <%s> '
+                                   'failed with exit code <%s>.' 
+                                   % (bundle_path, compressor.returncode))
+    
+    return bundle_path
+
+def get_bundle_extract_command(bundle_file, compression=None):
+    '''
+    Get the shell command to unpack the specified bundle file within the 
+    current directory on the remote platform. The bundle file name is quoted
+    for the remote shell.
+    '''
+    compression = _get_bundle_compression(compression)
+    return BUNDLE_COMPRESSION_TYPES[compression][2] % pipes.quote(bundle_file)
+
+class InputStager(object):
+    '''
+    Stages local files to a remote directory using a fixed number of worker
+    threads.
+    
+    connection_factory is a callable taking no arguments that returns a new
+    connection object. The connection object must provide a 
+    stage_to_remote(source, target) function, as provided by the SAGA-Python
+    PTYShell class. If the object has a finalize() function, this is called 
+    once the worker using the connection has finished. A connection on which
+    a transfer fails is closed rather than reused, connections from a 
+    ConnectionManager are discarded rather than returned to its idle pool, 
+    and the worker opens a new connection for its next file.
+    '''
+
+    def __init__(self, connection_factory, max_workers=DEFAULT_TRANSFER_THREADS):
+        self.connection_factory = connection_factory
+        if not max_workers or max_workers < 1:
+            max_workers = 1
+        self.max_workers = int(max_workers)
+    
+    def stage(self, local_files, remote_dir):
+        '''
+        Transfer each of the files in local_files to remote_dir. Returns a list
+        of the remote paths of the transferred files in the same order as the 
+        files were provided in local_files.
+        
+        If any of the transfers fail, the remaining files are still 
+        transferred and a FileTransferError is then raised. The errors 
+        property of the exception provides a dictionary mapping each local 
+        file that could not be transferred to a description of the error.
+        '''
+        remote_paths = [os.path.join(remote_dir, os.path.basename(f)) 
+                        for f in local_files]
+        self.stage_to(zip(local_files, remote_paths))
+        return remote_paths
+    
+    def stage_to(self, transfers):
+        '''
+        Transfer each (local_file, remote_path) pair in transfers. Errors are
+        handled as described for stage().
+        '''
+        if not transfers:
+            return
+        
+        local_files = [local_file for local_file, _ in transfers]
+        
+        LOG.debug('Staging <%s> input files using up to <%s> worker(s)...'
+                  % (len(transfers), self.max_workers))
+        
+        def _transfer(conn, transfer):
+            local_file, remote_path = transfer
+            LOG.debug('Staging input file <%s> to <%s>...' 
+                      % (local_file, remote_path))
+            conn.stage_to_remote(local_file, remote_path)
+        
+        results = run_parallel(_transfer, transfers, self.max_workers,
+                               self.connection_factory)
+        errors = dict([(r.item[0], str(r.error)) for r in results 
+                       if not r.succeeded])
+        
+        if errors:
+            for local_file in local_files:
+                if local_file in errors:
+                    LOG.error('Error copying the input file <%s> to the remote '
+                              'platform: %s' % (local_file, errors[local_file]))
+            raise FileTransferError('Error copying <%s> of <%s> input files to '
+                                    'the remote platform: %s' 
+                                    % (len(errors), len(local_files), 
+                                       ', '.join(sorted(errors.keys()))),
+                                    errors)
+        
+        LOG.debug('Staging of <%s> input files complete.' % len(local_files))
@@ -0,0 +1,381 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Parameter sweeps: running many jobs, generated from a job specification 
+template and a matrix of parameter values, on one set of resources.
+
+Parameters are referenced in a job specification template as $name or 
+${name}. A string value that consists only of a parameter reference is 
+replaced with the parameter value itself so that numeric parameters, e.g. 
+num_processes, keep their type. Other references are substituted as text.
+
+The outcome of each job in a sweep is recorded in a JSON results index.
+
+On platforms that support job arrays, e.g. PBS, the jobs of a sweep can be 
+submitted together as a single job array rather than as one submission per
+job.
+'''
+import copy
+import itertools
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from string import Template
+
+import yaml
+
+from deployer.config.job import JobConfiguration
+from deployer.core.exceptions import JobConfigurationError
+from deployer.core.parallel import run_parallel
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+SWEEP_JOB_PENDING = 'pending'
+SWEEP_JOB_RUNNING = 'running'
+SWEEP_JOB_DONE = 'done'
+SWEEP_JOB_FAILED = 'failed'
+# A job that finished but whose exit code couldn't be determined
+SWEEP_JOB_UNKNOWN = 'unknown'
+
+# The minimum time, in seconds, between writes of a sweep's results index 
+# while the sweep is running.
+DEFAULT_INDEX_WRITE_INTERVAL = 5
+
+_PARAMETER_REF = re.compile(r'^\$(?:(\w+)|\{(\w+)\})$')
+
+def expand_parameters(matrix):
+    '''
+    Expand a parameter matrix into a list of parameter combinations. matrix 
+    may be a dictionary mapping each parameter name to a list of values, 
+    which is expanded to every combination of the values, or a list of 
+    dictionaries, each giving one combination explicitly.
+    '''
+    if isinstance(matrix, dict):
+        names = sorted(matrix.keys())
+        values = []
+        for name in names:
+            value = matrix[name]
+            values.append(value if isinstance(value, list) else [value])
+        return [dict(zip(names, combination)) 
+                for combination in itertools.product(*values)]
+    if isinstance(matrix, list) and all([isinstance(combination, dict) 
+                                         for combination in matrix]):
+        return [dict(combination) for combination in matrix]
+    raise JobConfigurationError('A parameter matrix must be a dictionary of '
+                                'parameter value lists or a list of parameter '
+                                'dictionaries, got <%s>.' % matrix)
+
+def substitute_parameters(value, parameters):
+    '''
+    Substitute parameter values into value, which may be a string or a 
+    dictionary or list containing strings, e.g. a loaded job specification.
+    '''
+    if isinstance(value, dict):
+        return dict([(k, substitute_parameters(v, parameters)) 
+                     for k, v in value.items()])
+    if isinstance(value, list):
+        return [substitute_parameters(v, parameters) for v in value]
+    if isinstance(value, basestring):
+        match = _PARAMETER_REF.match(value)
+        if match and (match.group(1) or match.group(2)) in parameters:
+            return parameters[match.group(1) or match.group(2)]
+        str_params = dict([(k, str(v)) for k, v in parameters.items()])
+        # Unknown references, e.g. to environment variables in job 
+        # arguments, are left unchanged.
+        return Template(value).safe_substitute(str_params)
+    return value
+
+def load_parameter_matrix(yaml_file):
+    '''
+    Load the parameter matrix from a sweep specification file. The matrix 
+    is given by the parameters key under the libhpc_sweep root key.
+    '''
+    try:
+        with open(yaml_file, 'r') as f:
+            sweep_spec = yaml.load(f.read())
+    except IOError as e:
+        raise JobConfigurationError('Unable to read sweep specification: '
+                                    '[%s]' % str(e))
+    if not isinstance(sweep_spec, dict) or 'libhpc_sweep' not in sweep_spec:
+        raise JobConfigurationError('The root key of a sweep specification '
+                                    'must be "libhpc_sweep"')
+    if 'parameters' not in (sweep_spec['libhpc_sweep'] or {}):
+        raise JobConfigurationError('The sweep specification <%s> has no '
+                                    'parameters.' % yaml_file)
+    return sweep_spec['libhpc_sweep']['parameters']
+
+def expand_jobs(template_file, matrix):
+    '''
+    Create a job configuration for each combination of parameters in matrix 
+    from the job specification template in template_file. Returns a list of
+    (parameters, job configuration) tuples.
+    '''
+    try:
+        with open(template_file, 'r') as f:
+            template = yaml.load(f.read())
+    except IOError as e:
+        raise JobConfigurationError('Unable to read job specification: '
+                                    '[%s]' % str(e))
+    jobs = []
+    for parameters in expand_parameters(matrix):
+        jobspec = substitute_parameters(copy.deepcopy(template), parameters)
+        jobs.append((parameters, JobConfiguration.from_dict(jobspec)))
+    LOG.debug('Expanded job specification template <%s> into <%d> jobs.' 
+              % (template_file, len(jobs)))
+    return jobs
+
+def get_resource_job(jobs):
+    '''
+    Get the job configuration to size a sweep's shared resources from, the 
+    job with the largest number of processes.
+    '''
+    return max([jc for _, jc in jobs], key=lambda jc: int(jc.num_processes))
+
+class SweepIndex(object):
+    '''
+    The results index of a sweep, a JSON file containing a record for each 
+    job in the sweep, in sweep order, with the job's parameters, state, exit
+    code, output location and any error. So that the cost of writing the 
+    index doesn't grow with the square of the number of jobs, the file is 
+    rewritten at most once every write_interval seconds as records are 
+    updated, and by flush(), which must be called once the sweep completes.
+    '''
+    
+    def __init__(self, index_file, write_interval=DEFAULT_INDEX_WRITE_INTERVAL,
+                 time_func=time.time):
+        self.index_file = index_file
+        self.write_interval = write_interval
+        self._time = time_func
+        self._lock = threading.Lock()
+        self._records = []
+        self._by_job_id = {}
+        self._last_write = None
+        self._changed = False
+    
+    def add_job(self, job_id, parameters, output=None):
+        self.add_jobs([(job_id, parameters, output)])
+    
+    def add_jobs(self, jobs):
+        '''
+        Add a record for each (job_id, parameters, output) in jobs and write
+        the index.
+        '''
+        with self._lock:
+            for job_id, parameters, output in jobs:
+                record = {'job_id': job_id, 'parameters': parameters, 
+                          'state': SWEEP_JOB_PENDING, 'exit_code': None, 
+                          'output': output, 'error': None, 
+                          'start_time': None, 'end_time': None}
+                self._records.append(record)
+                self._by_job_id[job_id] = record
+            self._write()
+    
+    def update(self, job_id, state, **kwargs):
+        with self._lock:
+            record = self._by_job_id[job_id]
+            if state != record['state']:
+                record['state'] = state
+                if state == SWEEP_JOB_RUNNING:
+                    record['start_time'] = self._time()
+                elif state in [SWEEP_JOB_DONE, SWEEP_JOB_FAILED, 
+                               SWEEP_JOB_UNKNOWN]:
+                    record['end_time'] = self._time()
+                self._changed = True
+            for key, value in kwargs.items():
+                if record.get(key) != value:
+                    record[key] = value
+                    self._changed = True
+            if (self._changed and 
+                self._time() - self._last_write >= self.write_interval):
+                self._write()
+    
+    def flush(self):
+        '''
+        Write any updates that haven't yet been written to the index.
+        '''
+        with self._lock:
+            if self._changed:
+                self._write()
+    
+    def get_records(self):
+        with self._lock:
+            return copy.deepcopy(self._records)
+    
+    def _write(self):
+        index_dir = os.path.dirname(os.path.abspath(self.index_file))
+        if not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        fd, tmp_file = tempfile.mkstemp(dir=index_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'jobs': self._records}, f, indent=2)
+        os.rename(tmp_file, self.index_file)
+        self._last_write = self._time()
+        self._changed = False
+
+def _get_job_state(job_id, code):
+    # Only an exit code of 0 is success, a job whose exit code is unknown 
+    # may have failed.
+    if code is None:
+        LOG.warning('Unable to determine the exit code of sweep job <%s>.' 
+                    % job_id)
+        return SWEEP_JOB_UNKNOWN
+    return SWEEP_JOB_DONE if code == 0 else SWEEP_JOB_FAILED
+
+def run_sweep_jobs(deployer, jobs, index, max_concurrent=1):
+    '''
+    Run the jobs of a sweep on the resources that deployer has initialised 
+    and prepared, with at most max_concurrent jobs running at once. Each job
+    is run by a job deployer obtained from deployer, sharing its session, 
+    connections and resources. A failed job is recorded in the index and 
+    doesn't stop the sweep. Returns the number of jobs that failed or whose
+    exit code is unknown.
+    '''
+    index.add_jobs([(jc.job_id, parameters, jc.output_file_destination) 
+                    for parameters, jc in jobs])
+    
+    def _run_job(job):
+        parameters, jc = job
+        index.update(jc.job_id, SWEEP_JOB_RUNNING)
+        LOG.debug('Running sweep job <%s> with parameters <%s>.' 
+                  % (jc.job_id, parameters))
+        try:
+            d = deployer.get_job_deployer(jc)
+            d.prepare_job()
+            d.transfer_files()
+            d.run_job()
+            state, code = d.wait_for_job_completion()
+            d.collect_output(jc.output_file_destination)
+        except Exception as e:
+            LOG.error('Sweep job <%s> failed: <%s>' % (jc.job_id, str(e)))
+            index.update(jc.job_id, SWEEP_JOB_FAILED, error=str(e))
+            raise
+        index.update(jc.job_id, _get_job_state(jc.job_id, code), 
+                     exit_code=code)
+        return code
+    
+    results = run_parallel(_run_job, jobs, max_concurrent)
+    index.flush()
+    failed = len([r for r in results 
+                  if not r.succeeded or r.result != 0])
+    LOG.debug('Sweep complete, <%d> of <%d> jobs failed.' 
+              % (failed, len(jobs)))
+    return failed
+
+def run_sweep_array(deployer, jobs, index, max_concurrent=1):
+    '''
+    Run the jobs of a sweep as a single job array on a platform whose 
+    deployer supports job arrays. The input files of at most max_concurrent
+    jobs are transferred at once, the jobs whose files were transferred are
+    then submitted together using the deployer's run_job_array and each 
+    job's output is collected as it finishes, again for at most 
+    max_concurrent jobs at once. How many of the array's jobs run at once is
+    decided by the scheduler. Returns the number of jobs that failed or 
+    whose exit code is unknown.
+    '''
+    index.add_jobs([(jc.job_id, parameters, jc.output_file_destination) 
+                    for parameters, jc in jobs])
+    
+    def _stage_job(job):
+        parameters, jc = job
+        d = deployer.get_job_deployer(jc)
+        d.prepare_job()
+        d.transfer_files()
+        return d
+    
+    job_deployers = []
+    for result in run_parallel(_stage_job, jobs, max_concurrent):
+        jc = result.item[1]
+        if result.succeeded:
+            job_deployers.append(result.result)
+        else:
+            LOG.error('Unable to prepare sweep job <%s>: <%s>' 
+                      % (jc.job_id, str(result.error)))
+            index.update(jc.job_id, SWEEP_JOB_FAILED, error=str(result.error))
+    
+    if job_deployers:
+        try:
+            array_id = deployer.run_job_array(job_deployers)
+        except Exception as e:
+            LOG.error('Unable to submit the sweep job array: <%s>' % str(e))
+            for d in job_deployers:
+                index.update(d.job_config.job_id, SWEEP_JOB_FAILED, 
+                             error=str(e))
+            index.flush()
+            return len(jobs)
+        LOG.debug('Submitted <%d> sweep jobs as job array <%s>.' 
+                  % (len(job_deployers), array_id))
+        for d in job_deployers:
+            index.update(d.job_config.job_id, SWEEP_JOB_RUNNING)
+    
+    def _finish_job(d):
+        jc = d.job_config
+        try:
+            state, code = d.wait_for_job_completion()
+            d.collect_output(jc.output_file_destination)
+        except Exception as e:
+            LOG.error('Sweep job <%s> failed: <%s>' % (jc.job_id, str(e)))
+            index.update(jc.job_id, SWEEP_JOB_FAILED, error=str(e))
+            raise
+        index.update(jc.job_id, _get_job_state(jc.job_id, code), 
+                     exit_code=code)
+        return code
+    
+    results = run_parallel(_finish_job, job_deployers, max_concurrent)
+    index.flush()
+    failed = (len(jobs) - len(job_deployers) + 
+              len([r for r in results 
+                   if not r.succeeded or r.result != 0]))
+    LOG.debug('Sweep complete, <%d> of <%d> jobs failed.' 
+              % (failed, len(jobs)))
+    return failed
@@ -0,0 +1,246 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Termination of cloud nodes.
+
+Termination requests for all of a job's nodes are sent to an EC2-compatible 
+service in a single TerminateInstances request, falling back to terminating
+nodes individually if the bulk request fails. Rather than blocking until all
+nodes have terminated, a deployer can record the pending terminations on 
+disk and start a background reaper process that confirms them so that the 
+command line tool can return as soon as the job's output is safe.
+'''
+import fcntl
+import json
+import logging
+import os
+import time
+
+from deployer.core.utils import get_libhpc_dir, start_detached_process
+
+LOG = logging.getLogger(__name__)
+logging.basicConfig(level=logging.DEBUG,
+                    format='%(asctime)s %(name)-12s %(levelname)-8s %(message)s',
+                    datefmt='%m-%d %H:%M')
+logging.getLogger(__name__).setLevel(logging.DEBUG)
+
+# Number of seconds between checks for termination of nodes
+DEFAULT_TERMINATION_POLL_DELAY = 4
+# Number of seconds the reaper waits for nodes to terminate before 
+# re-sending their termination requests.
+DEFAULT_REAPER_TIMEOUT = 600
+
+def terminate_nodes(driver, nodes):
+    '''
+    Request termination of the specified libcloud nodes using a single 
+    TerminateInstances request. If the bulk request fails, each node is 
+    terminated individually. Returns the list of nodes for which the 
+    termination request failed.
+    '''
+    if not nodes:
+        return []
+    params = {'Action': 'TerminateInstances'}
+    for i, node in enumerate(nodes):
+        params['InstanceId.%d' % (i + 1)] = node.id
+    try:
+        driver.connection.request(driver.path, params=params)
+        LOG.debug('Requested termination of nodes <%s>.' 
+                  % ', '.join([node.id for node in nodes]))
+        return []
+    except Exception as e:
+        LOG.debug('Bulk termination request failed <%s>, terminating nodes '
+                  'individually.' % str(e))
+    
+    failed = []
+    for node in nodes:
+        try:
+            driver.destroy_node(node)
+        except Exception as e:
+            LOG.error('Unable to terminate node <%s>: %s' % (node.id, str(e)))
+            failed.append(node)
+    return failed
+
+def wait_for_termination(get_running, node_ids, 
+                         poll_delay=DEFAULT_TERMINATION_POLL_DELAY,
+                         timeout=None, sleep_func=time.sleep,
+                         time_func=time.time):
+    '''
+    Wait until the nodes with the specified IDs have terminated. get_running
+    is called with the list of IDs of nodes that haven't yet terminated and 
+    returns the IDs of those that are still running, allowing the status of 
+    all nodes to be obtained in a single request. Returns the list of IDs of
+    nodes that haven't terminated when the timeout is reached.
+    '''
+    node_ids = list(node_ids)
+    start = time_func()
+    while node_ids:
+        still_running = get_running(node_ids)
+        for node_id in node_ids:
+            if node_id not in still_running:
+                LOG.debug('Resource <%s> has terminated...' % node_id)
+        node_ids = [node_id for node_id in node_ids 
+                    if node_id in still_running]
+        if not node_ids:
+            break
+        if timeout is not None and time_func() - start >= timeout:
+            LOG.warning('Resources %s have not terminated after <%s> '
+                        'seconds.' % (node_ids, timeout))
+            break
+        LOG.debug('Still waiting for termination of resources %s...' 
+                  % node_ids)
+        sleep_func(poll_delay)
+    return node_ids
+
+class PendingTerminations(object):
+    '''
+    Terminations that have been requested but not yet confirmed. Each record
+    is stored as a JSON file named after the job whose nodes are being
+    terminated and contains the platform ID and the IDs of the nodes.
+    '''
+    
+    def __init__(self, state_dir=None):
+        if not state_dir:
+            state_dir = get_libhpc_dir('state', 'terminations')
+        self.state_dir = state_dir
+    
+    def add(self, platform_id, node_ids, job_id):
+        record = {'platform_id': platform_id, 'node_ids': list(node_ids),
+                  'job_id': job_id, 'requested': time.time()}
+        self._write(os.path.join(self.state_dir, '%s.json' % job_id), record)
+        LOG.debug('Recorded pending termination of nodes <%s> for job <%s>.'
+                  % (', '.join(node_ids), job_id))
+    
+    def get_pending(self):
+        '''
+        Get the list of pending termination records. The path of the file 
+        the record was loaded from is stored in the record's 'file' key.
+        '''
+        records = []
+        for name in sorted(os.listdir(self.state_dir)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.state_dir, name)
+            try:
+                with open(path, 'r') as f:
+                    record = json.load(f)
+            except (IOError, ValueError) as e:
+                LOG.warning('Ignoring unreadable termination record <%s>: %s'
+                            % (path, str(e)))
+                continue
+            record['file'] = path
+            records.append(record)
+        return records
+    
+    def update(self, record, node_ids):
+        '''
+        Update a record with the IDs of the nodes that haven't yet been 
+        confirmed as terminated, removing the record if there are none.
+        '''
+        if not node_ids:
+            os.remove(record['file'])
+            return
+        record = dict(record)
+        path = record.pop('file')
+        record['node_ids'] = list(node_ids)
+        self._write(path, record)
+    
+    def _write(self, path, record):
+        tmp_file = '%s.%s.tmp' % (path, os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump(record, f, indent=1)
+        os.rename(tmp_file, path)
+
+def reap(get_deployer, pending=None, timeout=DEFAULT_REAPER_TIMEOUT):
+    '''
+    Confirm the termination of the nodes in all pending termination records.
+    get_deployer is called with a platform ID and returns a deployer for the
+    platform. Only one reaper runs at a time, other reapers wait for the 
+    lock and then process any records that remain. Records that are added 
+    while the reaper is running are also processed. Returns the number of 
+    records that could not be completed.
+    '''
+    if not pending:
+        pending = PendingTerminations()
+    with open(os.path.join(pending.state_dir, 'reaper.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            failed = set()
+            while True:
+                records = [r for r in pending.get_pending() 
+                           if r['file'] not in failed]
+                if not records:
+                    break
+                for record in records:
+                    try:
+                        deployer = get_deployer(record['platform_id'])
+                        remaining = deployer.confirm_termination(
+                                            record['node_ids'], timeout)
+                    except Exception as e:
+                        LOG.error('Unable to confirm termination of nodes '
+                                  '<%s> for job <%s>: %s' 
+                                  % (', '.join(record['node_ids']), 
+                                     record['job_id'], str(e)))
+                        failed.add(record['file'])
+                        continue
+                    pending.update(record, remaining)
+                    if remaining:
+                        failed.add(record['file'])
+            return len(failed)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def start_reaper(log_file=None):
+    '''
+    Start a background reaper process, detached from the current process, 
+    using the reap subcommand of the command line tool.
+    '''
+    if not log_file:
+        log_file = os.path.join(get_libhpc_dir('state', 'terminations'), 
+                                'reaper.log')
+    pid = start_detached_process(['reap'], log_file)
+    LOG.info('Started termination reaper process <%s>, logging to <%s>.' 
+             % (pid, log_file))
+    return pid
@@ -42,8 +42,12 @@
 #  -----------------------------------------------------------------------------
 
 import binascii
+import errno
 import logging
 import os
+import pwd
+import subprocess
+import sys
 
 LOG = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG,
@@ -60,3 +64,51 @@ def generate_instance_id():
     LOG.debug('Generating instance ID...')
     inst_id = 'inst-' + str(binascii.hexlify(os.urandom(4)))
     return inst_id
+
+def get_libhpc_dir(*subdirs):
+    '''
+    Get the path of a directory within the current user's .libhpc directory,
+    creating it if it doesn't already exist. As in the configuration managers,
+    the home directory is obtained via getpwuid rather than expanding ~ since 
+    the USER and HOME environment variables may not be set correctly.
+    '''
+    username = pwd.getpwuid(os.getuid())[0]
+    path = os.path.join(os.path.expanduser('~%s' % username), '.libhpc', 
+                        *subdirs)
+    if not os.path.exists(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            # The directory may have been created by another process
+            if not os.path.isdir(path):
+                raise
+    return path
+
+def start_detached_process(args, log_file):
+    '''
+    Start the command line tool, with the specified arguments, in a 
+    background process detached from the current process, appending its 
+    output to log_file. Returns the process ID.
+    '''
+    # Ensure the process can import the deployer package however the command
+    # line tool was started.
+    env = dict(os.environ)
+    pkg_dir = os.path.dirname(os.path.dirname(os.path.dirname(
+                                                os.path.abspath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join([pkg_dir] + 
+        [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p])
+    with open(os.devnull, 'r') as devnull, open(log_file, 'a') as log:
+        proc = subprocess.Popen([sys.executable, '-m', 
+                                 'deployer.libhpc_run_job'] + list(args),
+                                stdin=devnull, stdout=log, 
+                                stderr=subprocess.STDOUT, close_fds=True,
+                                preexec_fn=os.setsid, env=env)
+    return proc.pid
+
+def is_process_running(pid):
+    # Check whether a process with the specified ID exists
+    try:
+        os.kill(int(pid), 0)
+    except OSError as e:
+        return e.errno == errno.EPERM
+    return True
@@ -65,6 +65,15 @@ from deployer.config.job import JobConfiguration
 from deployer.core.exceptions import JobConfigurationError, ConnectionError,\
     StorageDirectoryNotFoundError, DirectoryExistsError
 from deployer.core.deployment_factory import JobDeploymentFactory
+from deployer.core.job_store import JobStore, start_job_worker,\
+    JOB_RUNNING, JOB_COMPLETED, JOB_FAILED
+from deployer.core.lifecycle import (LifecycleExecutor, RetryPolicy, 
+                                     STAGE_COMPLETED)
+from deployer.core.monitor import FINAL_JOB_STATES
+from deployer.core.sweep import SweepIndex, expand_jobs, get_resource_job,\
+    load_parameter_matrix, run_sweep_array, run_sweep_jobs
+from deployer.core.termination import reap, DEFAULT_REAPER_TIMEOUT
+from deployer.core.utils import is_process_running
 from os.path import expanduser
 from deployer.plugins.openstack_ec2_deployer import JobDeploymentEC2Openstack
 from deployer.plugins.ec2_deployer import JobDeploymentEC2
@@ -105,6 +114,27 @@ def libhpc_run_job():
                                 help='List registered platforms and software')
     run_parser = subparsers.add_parser('run', help='Run jobs using the '
                                        'specified software and platform.')
+    reap_parser = subparsers.add_parser('reap', help='Confirm termination '
+                                        'of cloud nodes shut down without '
+                                        'waiting.')
+    metadata_parser = subparsers.add_parser('metadata', help='Refresh the '
+                                        'cached image and node type '
+                                        'metadata for a cloud platform.')
+    submit_parser = subparsers.add_parser('submit', help='Start a job and '
+                                        'return once it is running, leaving '
+                                        'its output to be collected later.')
+    status_parser = subparsers.add_parser('status', help='Show the state of '
+                                        'submitted jobs.')
+    collect_parser = subparsers.add_parser('collect', help='Collect the '
+                                        'output of a finished job and shut '
+                                        'down its resources.')
+    reattach_parser = subparsers.add_parser('reattach', help='Resume a '
+                                        'job\'s lifecycle from its last '
+                                        'completed stage.')
+    sweep_parser = subparsers.add_parser('sweep', help='Run a parameter '
+                                        'sweep, a set of jobs generated from '
+                                        'a job specification template, on '
+                                        'one set of resources.')
     
     
     list_parser.add_argument('info',
@@ -126,6 +156,102 @@ def libhpc_run_job():
                             help="The full path for a file that should have "
                             "IP addresses of the started cloud nodes written "
                             "to it once the nodes are started and accessible.")
+    run_parser.add_argument('--detach-shutdown', action='store_true',
+                            dest="detach_shutdown",
+                            help="Don't wait for cloud nodes to terminate "
+                            "once the job has finished, their termination "
+                            "is confirmed by a background process.")
+    
+    submit_parser.add_argument('-p', type=str, required=True, 
+                               dest="platform",
+                               help="The ID or full path to a YAML file "
+                               "representing the platform to use to run the "
+                               "job.")
+    submit_parser.add_argument('-j', type=str, required=True, 
+                               dest="job_spec",
+                               help="Full path to a job specification file "
+                               "defining the job to run.")
+    submit_parser.add_argument('-s', type=str, required=False, 
+                               dest="software_to_deploy",
+                               help="The software ID or full path to a YAML "
+                               "file representing the software to deploy on "
+                               "the specified platform.")
+    submit_parser.add_argument('--detach', action='store_true', 
+                               dest="detach",
+                               help="Return immediately, the job is started "
+                               "by a background process.")
+    submit_parser.set_defaults(submit=True)
+    
+    status_parser.add_argument('status_job_id', nargs='?', default=None,
+                               metavar='JOB_ID',
+                               help="The ID of the job to show the state of. "
+                               "If not specified, all stored jobs are listed.")
+    status_parser.set_defaults(status=True)
+    
+    collect_parser.add_argument('collect_job_id', metavar='JOB_ID',
+                                help="The ID of the job to collect.")
+    collect_parser.add_argument('--detach-shutdown', action='store_true',
+                                dest="detach_shutdown",
+                                help="Don't wait for cloud nodes to "
+                                "terminate once the output has been "
+                                "collected.")
+    collect_parser.set_defaults(collect=True)
+    
+    reattach_parser.add_argument('reattach_job_id', metavar='JOB_ID',
+                                 help="The ID of the job to resume.")
+    reattach_parser.add_argument('--until', type=str, required=False, 
+                                 dest="until",
+                                 help="Stop once the specified lifecycle "
+                                 "stage, e.g. run_job, has completed.")
+    reattach_parser.add_argument('--detach-shutdown', action='store_true',
+                                 dest="detach_shutdown",
+                                 help="Don't wait for cloud nodes to "
+                                 "terminate once the job has finished.")
+    reattach_parser.set_defaults(reattach=True)
+    
+    reap_parser.add_argument('-t', type=int, required=False, dest="timeout",
+                             default=DEFAULT_REAPER_TIMEOUT,
+                             help="The time in seconds to wait for the nodes "
+                             "of each pending termination to terminate.")
+    reap_parser.set_defaults(reap=True)
+    
+    metadata_parser.add_argument('-p', type=str, required=True, 
+                                 dest="metadata_platform",
+                                 help="The ID of the platform to refresh "
+                                 "the metadata for.")
+    
+    sweep_parser.add_argument('-p', type=str, required=True, dest="platform",
+                              help="The ID or full path to a YAML file "
+                              "representing the platform to use to run the "
+                              "jobs.")
+    sweep_parser.add_argument('-j', type=str, required=True, dest="job_spec",
+                              help="Full path to a job specification "
+                              "template referencing the sweep parameters as "
+                              "$name or ${name}.")
+    sweep_parser.add_argument('-m', type=str, required=True, 
+                              dest="sweep_spec",
+                              help="Full path to a sweep specification file "
+                              "defining the parameter matrix.")
+    sweep_parser.add_argument('-s', type=str, required=False, 
+                              dest="software_to_deploy",
+                              help="The software ID or full path to a YAML "
+                              "file representing the software to deploy on "
+                              "the specified platform.")
+    sweep_parser.add_argument('-c', type=int, required=False, default=1,
+                              dest="max_concurrent",
+                              help="The maximum number of jobs to run at "
+                              "once on the shared resources.")
+    sweep_parser.add_argument('-o', type=str, required=False, 
+                              dest="index_file",
+                              help="The full path of the JSON results index "
+                              "to write. Defaults to sweep-index.json in the "
+                              "output directory of the largest job.")
+    sweep_parser.add_argument('--array', action='store_true', 
+                              dest="job_array",
+                              help="Submit the sweep's jobs as a single job "
+                              "array on platforms that support job arrays, "
+                              "e.g. PBS.")
+    sweep_parser.set_defaults(sweep=True)
     
     args = parser.parse_args()
     
@@ -148,63 +274,99 @@ def libhpc_run_job():
             list_parser.print_help()
             exit()
             
-    elif hasattr(args, 'platform'):
-        # Load the platform configuration
-        platform_config = None
+    elif hasattr(args, 'reap'):
+        failed = ldt.reap_terminations(args.timeout)
+        if failed:
+            LOG.error('<%s> pending termination(s) could not be confirmed.' 
+                      % failed)
+            sys.exit(1)
+    
+    elif hasattr(args, 'metadata_platform'):
+        if args.metadata_platform not in ldt.dcm.get_platform_names():
+            print('The specified platform ID <%s> is not recognised. ' 
+                  % (args.metadata_platform))
+            metadata_parser.print_help()
+            exit()
+        sizes = ldt.refresh_metadata(args.metadata_platform)
+        print('Node types for platform <%s>:\n' % args.metadata_platform)
+        for size in sizes:
+            print('\t\t%s (%s cores, %s MB RAM)' 
+                  % (size['id'], size['cores'] or 'unknown', size['ram']))
+    
+    elif hasattr(args, 'sweep'):
+        platform_config = _get_platform_config(ldt, args.platform, 
+                                               sweep_parser)
         try:
-            platform = args.platform
-            if os.path.isfile(platform):
-                # raise NotImplementedError('Support for using a YAML file '
-                #    'describing the platform to use for running a job is not '
-                #    'yet implemented. Please use a platform ID instead.')
-                # Check if the specified job spec parameter is a YAML file that
-                # we can open.
-                #try:
-                #    job_config = JobConfiguration.from_yaml(jobspec)
-                #except JobConfigurationError as e:
-                #    LOG.debug('Unable to read the YAML configuration from '
-                #              'the specified YAML file <%s>: %s' 
-                #              % (jobspec, str(e)))
-                dcm = DeployerConfigManager.get_instance()
-                conf = dcm.load_platform_config(platform, resource=False)
-                platform_config = dcm.read_platform_config(conf)
-            elif platform in ldt.dcm.get_platform_names():
-                LOG.debug('We have a platform configuration ID <%s> to '
-                          'identify the platform to use for running this task.'
-                          % (platform))
-                platform_config = platform                
-            else:
-                print('The specified platform file/ID <%s> is not recognised. '
-                      % (platform))
-                run_parser.print_help()
-                exit()
-        except ValueError as e:
-            LOG.debug('Unable to run job: [%s]' % str(e))
-            run_parser.print_help()
+            jobs = expand_jobs(args.job_spec, 
+                               load_parameter_matrix(args.sweep_spec))
+        except (JobConfigurationError, KeyError) as e:
+            print('\nERROR: Unable to expand the job specification template '
+                  '<%s>: %s\n' % (args.job_spec, str(e)))
             exit()
-        
-        
-        # Load the job specification
-        job_config = None
+        failed = ldt.run_sweep(platform_config, jobs, args.software_to_deploy,
+                               args.max_concurrent, args.index_file,
+                               args.job_array)
+        if failed:
+            LOG.error('<%s> of <%s> sweep job(s) failed or have an unknown exit '
+                      'code.' % (failed, len(jobs)))
+            sys.exit(100)
+    
+    elif hasattr(args, 'submit'):
+        platform_config = _get_platform_config(ldt, args.platform, 
+                                               submit_parser)
+        job_config = _get_job_config(args.job_spec, submit_parser)
+        if args.detach:
+            # The job is recorded and its lifecycle, up to the point where 
+            # the job has been started, is run by a background process.
+            if not isinstance(platform_config, PlatformConfig):
+                platform_config = ldt.dcm.get_platform_configuration(
+                                                            platform_config)
+            job_id = ldt.add_job(platform_config, job_config, 
+                                 args.software_to_deploy, args.platform)
+            start_job_worker(job_id, until='run_job')
+        else:
+            job_id = ldt.run_job(platform_config, job_config, 
+                                 args.software_to_deploy, until='run_job',
+                                 platform_ref=args.platform)
+        print('Submitted job <%s>.' % job_id)
+    
+    elif hasattr(args, 'status'):
         try:
-            jobspec = args.job_spec
-            if os.path.isfile(jobspec):
-                # Check if the specified job spec parameter is a YAML file that
-                # we can open.
-                try:
-                    job_config = JobConfiguration.from_yaml(jobspec)
-                except JobConfigurationError as e:
-                    LOG.debug('Unable to read the YAML configuration from '
-                              'the specified YAML file <%s>: %s' 
-                              % (jobspec, str(e)))
-            else:
-                print('\nERROR: Unable to find the specified job '
-                      'specification: %s\n' % (jobspec))
-                exit()
+            _print_job_status(ldt, args.status_job_id)
         except ValueError as e:
-            LOG.debug('Unable to run job: [%s]' % str(e))
-            run_parser.print_help()
-            exit()
+            print('\nERROR: %s\n' % str(e))
+            sys.exit(1)
+    
+    elif hasattr(args, 'collect'):
+        try:
+            record, _, remote_state = ldt.get_job_status(args.collect_job_id)
+            if record['state'] not in [JOB_RUNNING, JOB_FAILED]:
+                print('Job <%s> is %s, only a running or failed job\'s output '
+                      'can be collected.' 
+                      % (args.collect_job_id, record['state']))
+                sys.exit(1)
+            if remote_state not in FINAL_JOB_STATES:
+                print('Job <%s> has not finished, its state is <%s>.' 
+                      % (args.collect_job_id, remote_state or 'unknown'))
+                sys.exit(1)
+            ldt.resume_job(args.collect_job_id, 
+                           detach_shutdown=args.detach_shutdown)
+        except ValueError as e:
+            print('\nERROR: %s\n' % str(e))
+            sys.exit(1)
+    
+    elif hasattr(args, 'reattach'):
+        try:
+            ldt.resume_job(args.reattach_job_id, until=args.until, 
+                           detach_shutdown=args.detach_shutdown)
+        except ValueError as e:
+            print('\nERROR: %s\n' % str(e))
+            sys.exit(1)
+    
+    elif hasattr(args, 'platform'):
+        platform_config = _get_platform_config(ldt, args.platform, run_parser)
+        
+        job_config = _get_job_config(args.job_spec, run_parser)
         
         # Check if we have a software config specified
         software_config = None
@@ -219,13 +381,100 @@ def libhpc_run_job():
             ip_file = args.ip_file
             LOG.debug('We have an ip_file specified: <%s>' % ip_file)
 
-        ldt.run_job(platform_config, job_config, software_config, ip_file)
+        ldt.run_job(platform_config, job_config, software_config, ip_file,
+                    detach_shutdown=args.detach_shutdown, 
+                    platform_ref=args.platform)
     else:
         parser.print_help()
         LOG.debug('No expected values were present in the parsed input '
                   'data.' % str(e))
         exit()
 
+def _print_job_status(ldt, job_id=None):
+    # Print the status of a stored job or, if no job ID is specified, list 
+    # the stored jobs.
+    if not job_id:
+        print('Jobs:\n')
+        for record in ldt.store.list_jobs():
+            print('\t\t%s\t%-10s\t%s' % (record['job_id'], record['state'],
+                                          record['platform']))
+        return
+    record, stages, remote_state = ldt.get_job_status(job_id)
+    print('Job <%s>:\n' % job_id)
+    print('\t\tState:\t\t\t%s' % record['state'])
+    print('\t\tPlatform:\t\t%s' % record['platform'])
+    print('\t\tWorking directory:\t%s' % record['working_dir'])
+    print('\t\tNode IDs:\t\t%s' 
+          % ', '.join(record['deployment_state'].get('node_ids', [])))
+    print('\t\tRemote job ID:\t\t%s' % record['remote_job_id'])
+    if remote_state:
+        print('\t\tRemote job state:\t%s' % remote_state)
+    if record['exit_code'] is not None:
+        print('\t\tExit code:\t\t%s' % record['exit_code'])
+    if record['error']:
+        print('\t\tError:\t\t\t%s' % record['error'])
+    print('\n\t\tStages:')
+    for stage in stages:
+        print('\t\t\t%-24s %s' % (stage['stage'], stage['state']))
+
+def _get_platform_config(ldt, platform, subparser):
+    # Load the platform configuration
+    platform_config = None
+    try:
+        if os.path.isfile(platform):
+            # raise NotImplementedError('Support for using a YAML file '
+            #    'describing the platform to use for running a job is not '
+            #    'yet implemented. Please use a platform ID instead.')
+            # Check if the specified job spec parameter is a YAML file that
+            # we can open.
+            #try:
+            #    job_config = JobConfiguration.from_yaml(jobspec)
+            #except JobConfigurationError as e:
+            #    LOG.debug('Unable to read the YAML configuration from '
+            #              'the specified YAML file <%s>: %s' 
+            #              % (jobspec, str(e)))
+            dcm = DeployerConfigManager.get_instance()
+            conf = dcm.load_platform_config(platform, resource=False)
+            platform_config = dcm.read_platform_config(conf)
+        elif platform in ldt.dcm.get_platform_names():
+            LOG.debug('We have a platform configuration ID <%s> to '
+                      'identify the platform to use for running this task.'
+                      % (platform))
+            platform_config = platform                
+        else:
+            print('The specified platform file/ID <%s> is not recognised. '
+                  % (platform))
+            subparser.print_help()
+            exit()
+    except ValueError as e:
+        LOG.debug('Unable to run job: [%s]' % str(e))
+        subparser.print_help()
+        exit()
+    return platform_config
+
+def _get_job_config(jobspec, subparser):
+    # Load the job specification
+    job_config = None
+    try:
+        if os.path.isfile(jobspec):
+            # Check if the specified job spec parameter is a YAML file that
+            # we can open.
+            try:
+                job_config = JobConfiguration.from_yaml(jobspec)
+            except JobConfigurationError as e:
+                LOG.debug('Unable to read the YAML configuration from '
+                          'the specified YAML file <%s>: %s' 
+                          % (jobspec, str(e)))
+        else:
+            print('\nERROR: Unable to find the specified job '
+                  'specification: %s\n' % (jobspec))
+            exit()
+    except ValueError as e:
+        LOG.debug('Unable to run job: [%s]' % str(e))
+        subparser.print_help()
+        exit()
+    return job_config
+
 class LibhpcDeployerTool(object):
     
     def __init__(self):
@@ -234,6 +483,15 @@ class LibhpcDeployerTool(object):
         
         self.dcm.init_configuration()
         self.scm.init_configuration()
+        
+        self._store = None
+    
+    @property
+    def store(self):
+        # The job state store is opened when it is first needed
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
     
     def list_configuration(self, config_type):
         if config_type not in LIST_INFO_OPTIONS:
@@ -252,7 +510,14 @@ class LibhpcDeployerTool(object):
             LOG.debug('Unexpected config type <%s> received.', config_type)
             
     def run_job(self, platform_config_input, job_config, software_config=None,
-                ip_file=None):
+                ip_file=None, detach_shutdown=False, until=None, 
+                platform_ref=None):
+        # Run a job, recording its progress in the job store so that its 
+        # lifecycle can be resumed by another process if this one exits. If
+        # until is specified, the lifecycle stops once that stage has 
+        # completed and the job's resources are left running. platform_ref 
+        # is the platform ID or file path that is stored for resuming the 
+        # job, by default the platform's ID. Returns the job ID.
         LOG.debug('Received a request to run a job with the platform config '
                   '<%s> and job specification <%s>.' 
                   % (platform_config_input, job_config.__dict__))
@@ -273,12 +538,12 @@ class LibhpcDeployerTool(object):
                       'Getting platform config from deployer.')
             platform_config = d.get_platform_configuration()
         
-        job_id = job_config.job_id
+        # Termination of cloud nodes can be confirmed in the background 
+        if detach_shutdown and hasattr(platform_config, 'shutdown_wait'):
+            platform_config.shutdown_wait = False
         
-        if not job_config.working_dir:
-            job_config.working_dir = os.path.join(
-                        platform_config.storage_job_directory,
-                        job_id)
+        job_id = self.add_job(platform_config, job_config, software_config,
+                              platform_ref)
         
         LOG.debug('Preparing to run job: <%s> on platform <%s>' 
                   % (job_id, platform_config.platform_name))
@@ -292,21 +557,117 @@ class LibhpcDeployerTool(object):
         LOG.debug('Deployer instance <%s> obtained and configured '
                   'successfully...' % d)
         
+        self._run_lifecycle(d, job_config, software_config, ip_file, until)
+        return job_id
+    
+    def add_job(self, platform_config, job_config, software_config=None,
+                platform_ref=None):
+        # Record a job in the job store, without running it, and return its 
+        # ID. 
+        if not job_config.working_dir:
+            job_config.working_dir = os.path.join(
+                        platform_config.storage_job_directory,
+                        job_config.job_id)
+        self.store.add_job(job_config.job_id, 
+                           platform_ref or platform_config.platform_id,
+                           job_config.to_dict(), software_config,
+                           job_config.working_dir)
+        return job_config.job_id
+    
+    def resume_job(self, job_id, until=None, detach_shutdown=False):
+        # Resume the lifecycle of a stored job from its first incomplete 
+        # stage. A job that failed after it was started, and whose resources
+        # were kept running, has its failed stages retried. Returns the job's
+        # stored record once the lifecycle has finished or the until stage 
+        # has completed.
+        record = self._get_job_record(job_id)
+        completed = self.store.get_resume_stages(job_id)
+        if (record['pid'] and record['pid'] != os.getpid() and 
+            is_process_running(record['pid'])):
+            raise ValueError('Job <%s> is being run by process <%s>.' 
+                             % (job_id, record['pid']))
+        
+        d, job_config = self._restore_deployer(record)
+        if detach_shutdown and hasattr(d.platform_config, 'shutdown_wait'):
+            d.platform_config.shutdown_wait = False
+        if record['state'] == JOB_FAILED:
+            LOG.info('Retrying the failed stages of job <%s>.' % job_id)
+            self.store.update_job(job_id, state=JOB_RUNNING, error=None)
         
-                
-        try:
-            # Now that the initial configuration has been done, we can run the job
-            # Begin by initialising the resources...
-            
-            # This call can generate an exception when waiting for resources
-            # to become available or accessible, this will leave resources 
-            # running when the call returns so this needs to go within the  
-            # try/finally block.
-            resource_info = d.initialise_resources(node_type=job_config.node_type,
-                                                   num_processes=job_config.num_processes,
-                                                   processes_per_node=job_config.processes_per_node,
-                                                   job_id=job_config.job_id,
-                                                   software_config=software_config)
+        # The local preparation of the job isn't stored so it is repeated if
+        # any stage that depends on it hasn't completed.
+        if not set(['deploy_software', 'transfer_files']) <= set(completed):
+            completed = [s for s in completed if s != 'prepare_job']
+        LOG.debug('Resuming job <%s>, completed stages: <%s>' 
+                  % (job_id, ', '.join(completed)))
+        self._run_lifecycle(d, job_config, record['software_config'], 
+                            until=until, completed=completed)
+        return self.store.get_job(job_id)
+    
+    def get_job_status(self, job_id):
+        # Get a job's stored record, its stages and, if the job has been 
+        # started and its resources are still running, the current state of
+        # the remote job.
+        record = self._get_job_record(job_id)
+        stages = self.store.get_stages(job_id)
+        remote_state = None
+        if (record['state'] in [JOB_RUNNING, JOB_FAILED] and 
+            record['deployment_state'].get('remote_job_id')):
+            try:
+                d, _ = self._restore_deployer(record)
+                remote_state = d.job.state
+            except Exception as e:
+                LOG.debug('Unable to get the state of job <%s>: %s' 
+                          % (job_id, str(e)))
+        return record, stages, remote_state
+    
+    def _get_job_record(self, job_id):
+        record = self.store.get_job(job_id)
+        if not record:
+            raise ValueError('Job <%s> is not in the job store.' % job_id)
+        return record
+    
+    def _restore_deployer(self, record):
+        # Get a deployer for a stored job with its deployment state restored
+        platform = str(record['platform'])
+        if os.path.isfile(platform):
+            conf = self.dcm.load_platform_config(platform, resource=False)
+            platform = self.dcm.read_platform_config(conf)
+        deployment_factory = JobDeploymentFactory()
+        d = deployment_factory.get_deployer(platform)
+        job_config = JobConfiguration.from_dict(record['job_spec'])
+        d.set_job_config(job_config)
+        d.restore_deployment_state(record['deployment_state'])
+        return d, job_config
+    
+    def _run_lifecycle(self, d, job_config, software_config, ip_file=None,
+                       until=None, completed=None):
+        job_id = job_config.job_id
+        resource_info = []
+        # Record the process running the job's lifecycle so that it isn't 
+        # resumed by another process at the same time.
+        self.store.update_job(job_id, pid=os.getpid())
+        
+        # The job lifecycle stages are run by a lifecycle executor that runs
+        # stages that don't depend on each other concurrently. Resources are
+        # started while the job is prepared locally (input bundle, software 
+        # configuration) and software is deployed while the input files are 
+        # transferred.
+        def _initialise_resources():
+            # Waiting for resources to become available or accessible can 
+            # generate an exception, this will leave resources running so 
+            # this needs to go within the try/finally block.
+            future = d.initialise_resources_async(
+                            state_callback=self._log_resource_state,
+                            node_type=job_config.node_type,
+                            num_processes=job_config.num_processes,
+                            processes_per_node=job_config.processes_per_node,
+                            job_id=job_config.job_id,
+                            software_config=software_config)
+            # Wait with a timeout so that the wait can be interrupted.
+            while not future.wait(1.0):
+                pass
+            resource_info.extend(future.result() or [])
             
             # If an ip file was specified, write the public IPs of the resources
             # to this file. Currently only supports EC2-style cloud platforms
@@ -315,33 +676,110 @@ class LibhpcDeployerTool(object):
                 with open(ip_file, 'w') as f:
                     for node in resource_info:
                         f.write(node[0].public_ips[0] + '\n')
-                        
+        
+        def _deploy_software():
             if software_config:
                 d.deploy_software(software_config)
             else:
                 d.deploy_software()
-            
-            d.transfer_files()
-            
-            d.run_job()
+        
+        def _wait_for_job():
             LOG.debug('Waiting for job to finish...')
             (state, code) = d.wait_for_job_completion()
             LOG.debug('Finished waiting...State: %s,   Exit code: %s' % (state, code))
-            
-            d.collect_output(job_config.output_file_destination)
+            self.store.update_job(job_id, exit_code=code)
+        
+        # The progress of each stage is recorded in the job store along with
+        # the deployment state needed to resume the job after each stage.
+        job_started = ['run_job' in (completed or [])]
+        def _record_stage(name, state, error):
+            self.store.set_stage_state(job_id, name, state, error)
+            if state == STAGE_COMPLETED:
+                if name == 'run_job':
+                    job_started[0] = True
+                fields = {'deployment_state': d.get_deployment_state()}
+                if name == 'run_job':
+                    fields['state'] = JOB_RUNNING
+                    fields['remote_job_id'] = \
+                            fields['deployment_state'].get('remote_job_id')
+                self.store.update_job(job_id, **fields)
+        
+        # Stages that work with resources that have already been started are
+        # retried if they fail, within the platform's retry budget, so that a
+        # transient failure doesn't lose the work done to start and set up 
+        # the resources. The resources are shut down once the budget has been
+        # used up, unless the job has been started and the platform keeps the
+        # resources of failed jobs, in which case the failed stages can be 
+        # retried later using reattach or collect.
+        retry_stages = ['prepare_resources', 'deploy_software', 
+                        'transfer_files', 'run_job', 'wait_for_job', 
+                        'collect_output']
+        stages = [('initialise_resources', _initialise_resources, []),
+                  ('prepare_job', lambda: d.prepare_job(software_config), []),
+                  ('prepare_resources', d.prepare_resources,
+                   ['initialise_resources']),
+                  ('deploy_software', _deploy_software,
+                   ['prepare_resources', 'prepare_job']),
+                  ('transfer_files', d.transfer_files,
+                   ['prepare_resources', 'prepare_job']),
+                  ('run_job', d.run_job, ['deploy_software', 'transfer_files']),
+                  ('wait_for_job', _wait_for_job, ['run_job']),
+                  ('collect_output', 
+                   lambda: d.collect_output(job_config.output_file_destination),
+                   ['wait_for_job'])]
+        if until:
+            names = [name for name, _, _ in stages]
+            if until not in names:
+                raise ValueError('Unknown lifecycle stage <%s>.' % until)
+            stages = stages[:names.index(until) + 1]
+        
+        pc = d.platform_config
+        retry_policy = RetryPolicy(retries=pc.lifecycle_retries,
+                                   delay=pc.lifecycle_retry_delay,
+                                   max_delay=pc.lifecycle_retry_max_delay,
+                                   budget=pc.lifecycle_retry_budget)
+        lifecycle = LifecycleExecutor(stage_callback=_record_stage,
+                                      retry_policy=retry_policy)
+        for name, func, depends_on in stages:
+            lifecycle.add_stage(name, func, depends_on, 
+                                retry=(name in retry_stages))
+        
+        def _job_failed(e):
+            # Record the failure and return whether to shut down the resources
+            self.store.update_job(job_id, state=JOB_FAILED, error=str(e))
+            if job_started[0] and pc.lifecycle_keep_failed_resources:
+                LOG.info('Job <%s> failed after it was started, its resources '
+                         'have been kept running. Its failed stages can be '
+                         'retried using "libhpc_run_job reattach %s".' 
+                         % (job_id, job_id))
+                return False
+            return True
+        
+        # The resources are shut down unless the lifecycle is stopping after
+        # the until stage, leaving the job running.
+        shutdown = not until
+        succeeded = False
+        try:
+            # Now that the initial configuration has been done, we can run the job
+            lifecycle.run(completed)
+            succeeded = True
             
             #d.shutdown_resources()
         except ConnectionError as e:
+            shutdown = _job_failed(e)
             LOG.error('Connection error when trying to run job: <%s>' % str(e))
             sys.exit(10)
         except StorageDirectoryNotFoundError as e:
+            shutdown = _job_failed(e)
             LOG.error('The job storage directory specified for the remote '
                       'compute platform does not exist.')
             sys.exit(11)
         except DirectoryExistsError as e:
+            shutdown = _job_failed(e)
             LOG.error('The job directory for this job already exists.')
             sys.exit(12)  
         except Exception as e:
+            shutdown = _job_failed(e)
             LOG.error('Unknown error running the job: <%s>' % str(e))
             if resource_info:
                 LOG.debug('We have node info so there may be nodes to shut '
@@ -351,12 +789,122 @@ class LibhpcDeployerTool(object):
         # Finally block will still be run even though sys.exit is called above
         # https://docs.python.org/2/library/sys.html#sys.exit
         finally:
+            LOG.info(lifecycle.get_timing_report())
+            
             # If an IP file was created, delete it
             if ip_file and os.path.exists(ip_file):
                 os.remove(ip_file)
-
-            d.shutdown_resources()
+            
+            if shutdown:
+                d.shutdown_resources()
+                self.store.set_resources_shutdown(job_id)
+                if succeeded:
+                    self.store.update_job(job_id, state=JOB_COMPLETED)
+                elif self.store.get_job(job_id)['state'] != JOB_FAILED:
+                    self.store.update_job(job_id, state=JOB_FAILED, 
+                                          error='Interrupted')
+    
+    def run_sweep(self, platform_config_input, jobs, software_config=None,
+                  max_concurrent=1, index_file=None, job_array=False):
+        # Run the jobs of a parameter sweep, a list of (parameters, job 
+        # configuration) tuples, on one set of resources. The resources are
+        # sized for the largest job and set up, and software deployed, once.
+        # If job_array is set, the jobs are submitted as a single job array.
+        # Returns the number of jobs that failed.
+        LOG.debug('Received a request to run a sweep of <%d> jobs with the '
+                  'platform config <%s>.' % (len(jobs), platform_config_input))
+        
+        deployment_factory = JobDeploymentFactory()
+        d = deployment_factory.get_deployer(platform_config_input)
         
+        if isinstance(platform_config_input, PlatformConfig):
+            platform_config = platform_config_input
+        else:
+            platform_config = d.get_platform_configuration()
+        
+        if job_array and not d.supports_job_arrays:
+            LOG.warning('The platform <%s> doesn\'t support job arrays, the '
+                        'sweep\'s jobs will be submitted individually.' 
+                        % platform_config.platform_id)
+            job_array = False
+        
+        for _, job_config in jobs:
+            if not job_config.working_dir:
+                job_config.working_dir = os.path.join(
+                            platform_config.storage_job_directory,
+                            job_config.job_id)
+        
+        resource_job = get_resource_job(jobs)
+        d.set_job_config(resource_job)
+        
+        if not index_file:
+            index_file = os.path.join(resource_job.output_file_destination,
+                                      'sweep-index.json')
+        index = SweepIndex(index_file)
+        LOG.debug('Writing the sweep results index to <%s>.' % index_file)
+        
+        def _initialise_resources():
+            future = d.initialise_resources_async(
+                            state_callback=self._log_resource_state,
+                            node_type=resource_job.node_type,
+                            num_processes=resource_job.num_processes,
+                            processes_per_node=resource_job.processes_per_node,
+                            job_id=resource_job.job_id,
+                            software_config=software_config)
+            # Wait with a timeout so that the wait can be interrupted.
+            while not future.wait(1.0):
+                pass
+            future.result()
+        
+        def _deploy_software():
+            if software_config:
+                d.deploy_software(software_config)
+            else:
+                d.deploy_software()
+        
+        # The shared resources are set up using the same lifecycle stages as
+        # a single job, the jobs themselves are then run by run_sweep_jobs.
+        lifecycle = LifecycleExecutor()
+        lifecycle.add_stage('initialise_resources', _initialise_resources)
+        lifecycle.add_stage('prepare_job', 
+                            lambda: d.prepare_job(software_config))
+        lifecycle.add_stage('prepare_resources', d.prepare_resources,
+                            ['initialise_resources'])
+        lifecycle.add_stage('deploy_software', _deploy_software,
+                            ['prepare_resources', 'prepare_job'])
+        
+        try:
+            lifecycle.run()
+            if job_array:
+                return run_sweep_array(d, jobs, index, max_concurrent)
+            return run_sweep_jobs(d, jobs, index, max_concurrent)
+        except ConnectionError as e:
+            LOG.error('Connection error when trying to run sweep: <%s>' 
+                      % str(e))
+            sys.exit(10)
+        except Exception as e:
+            LOG.error('Unknown error running the sweep: <%s>' % str(e))
+            sys.exit(100)
+        finally:
+            LOG.info(lifecycle.get_timing_report())
+            d.shutdown_resources()
+    
+    def refresh_metadata(self, platform_id):
+        # Refresh the platform's cached metadata and return its node sizes
+        deployment_factory = JobDeploymentFactory()
+        d = deployment_factory.get_deployer(platform_id)
+        return d.refresh_metadata()
+    
+    def reap_terminations(self, timeout=DEFAULT_REAPER_TIMEOUT):
+        # Confirm pending terminations of cloud nodes, returning the number
+        # of pending terminations that couldn't be confirmed.
+        deployment_factory = JobDeploymentFactory()
+        return reap(lambda platform_id: 
+                    deployment_factory.get_deployer(str(platform_id)),
+                    timeout=timeout)
+    
+    def _log_resource_state(self, state, info):
+        LOG.info('Resource state changed to <%s>.' % state)
             
 if __name__ == '__main__':
     libhpc_run_job()
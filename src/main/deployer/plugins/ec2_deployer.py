@@ -51,6 +51,7 @@ un-configured resources.
 '''
 import logging
 import os
+import pipes
 import tempfile
 import time
 import socket
@@ -62,14 +63,29 @@ from saga.utils.pty_shell import PTYShell
 from saga.filesystem import Directory, File
 from saga.exceptions import NoSuccess, BadParameter, AuthenticationFailed
 
+from libcloud.compute.base import NodeImage, NodeSize
 from libcloud.compute.providers import get_driver
 from libcloud.compute.types import Provider, NodeState
 from libcloud.security import VERIFY_SSL_CERT
 
 from deployer.config.software.base import SoftwareConfigManager,\
-    SoftwareConfigFile
+    SoftwareConfigFile, parse_install_script_output
 from deployer.core.deployment_interface import JobDeploymentBase
+from deployer.core.distribution import binomial_tree_schedule,\
+    get_chain_command, get_node_copy_command
 from deployer.core.exceptions import ResourceInitialisationError, JobError
+from deployer.core.future import RESOURCES_REQUESTED, RESOURCES_RUNNING,\
+    RESOURCES_REACHABLE, RESOURCES_MACHINEFILE_INSTALLED
+from deployer.core.image_registry import ImageRegistry, get_image_key
+from deployer.core.metadata_cache import MetadataCache, image_to_dict,\
+    size_to_dict
+from deployer.core.monitor import poll_processes
+from deployer.core.node_pool import NodePool
+from deployer.core.parallel import run_parallel
+from deployer.core.placement import get_machinefile, plan_placement
+from deployer.core.probe import NodeProber, check_ssh_banner
+from deployer.core.termination import PendingTerminations, start_reaper,\
+    terminate_nodes, wait_for_termination
 from deployer.core.utils import generate_instance_id
 
 LOG = logging.getLogger(__name__)
@@ -90,6 +106,22 @@ class JobDeploymentEC2(JobDeploymentBase):
     # The libcloud driver for EC2, configured in the constructor
     driver = None
     
+    # Set once the job account has been created on unconfigured resources
+    job_accounts_ready = False
+    # The output of software install commands, keyed by node URL
+    software_install_output = None
+    # The image registry key for the prebaked image to be created from this
+    # job's resources, if image caching is enabled.
+    image_cache_key = None
+    _snapshot_pending = False
+    _metadata_cache = None
+    _admin_session = None
+    # The warm node pool configuration key for this job's nodes and whether
+    # the nodes have been fully configured and can be returned to the pool.
+    pool_key = None
+    pool_node_type = None
+    resources_configured = False
+    
     REGION_MAPPINGS = {'ap-northeast-1':Provider.EC2_AP_NORTHEAST,
                        'ap-southeast-1':Provider.EC2_AP_SOUTHEAST,
                        'ap-southeast-2':Provider.EC2_AP_SOUTHEAST2,
@@ -134,6 +166,10 @@ class JobDeploymentEC2(JobDeploymentBase):
         self.job_ctx.user_id = self.platform_config.user_id
         self.job_ctx.user_key = self.platform_config.user_key_file
         self.admin_ctx = None
+        # The job context is added to the session created by the superclass.
+        # This session is used for all connections made using the job 
+        # account so that they can be reused by the connection manager.
+        self.session.add_context(self.job_ctx)
         LOG.debug('Set up security context for job account...')
 
     def initialise_resources(self, prefer_unconfigured=True, 
@@ -183,6 +219,15 @@ class JobDeploymentEC2(JobDeploymentBase):
                              'available in the platform configuration, unable '
                              'to initialise resources.')
             
+        # If image caching is enabled and a prebaked image has been created
+        # from this unconfigured image with the same software configuration,
+        # use the prebaked image as a preconfigured image.
+        if self.use_unconfigured and self.platform_config.image_cache:
+            cached_image_id = self._get_cached_image(image_id, software_config)
+            if cached_image_id:
+                image_id = cached_image_id
+                self.use_unconfigured = False
+        
         # If we're using an unconfigured image, we need to prepare the admin
         # security context based on the information that should be provided
         # in the YAML file with the unconfigured image details.
@@ -193,9 +238,9 @@ class JobDeploymentEC2(JobDeploymentBase):
             
         # Check that the image is present and then use the libcloud driver to  
         # start the resources and return once they're running. 
-        # TODO: This is currently synchronous but could also be done  
-        # asynchronously using a callback to notify the caller when the nodes 
-        # are ready. 
+        # This is synchronous, use initialise_resources_async to start the 
+        # resources in the background. State changes are reported via 
+        # _notify_resource_state. 
         
         #images = self.driver.list_images()
         #img = next((i for i in images if i.id == image_id), None)
@@ -204,7 +249,7 @@ class JobDeploymentEC2(JobDeploymentBase):
         img = None
         try:
             #img = self.driver.get_image(image_id)
-            img = self.driver.list_images(ex_image_ids=[image_id])[0]
+            img = self._get_image(image_id)
             if img == None:
                 raise ResourceInitialisationError('The specified image <%s> '
                                                   'could not be found' % image_id)
@@ -219,8 +264,18 @@ class JobDeploymentEC2(JobDeploymentBase):
                              'finding the specified image <%s>. Unable to '
                              'start resources.' % image_id)
         
-        sizes = self.driver.list_sizes()
-        size = next((s for s in sizes if s.id == node_type), None)
+        # If automatic placement is enabled in the job specification, the 
+        # node type, number of nodes and processes per node are chosen based
+        # on the sizes available on the platform.
+        self.placement_plan = None
+        if self.job_config.auto_placement:
+            self.placement_plan = self._plan_placement(num_processes, 
+                                                       node_type, 
+                                                       processes_per_node)
+            node_type = self.placement_plan.node_type
+            processes_per_node = self.placement_plan.processes_per_node
+        
+        size = self._get_node_size(node_type)
         if not size:
             raise ResourceInitialisationError('ERROR: The specified resource '
                              'size <%s> is not present on the target platform. '
@@ -248,29 +303,59 @@ class JobDeploymentEC2(JobDeploymentBase):
         #              'node type <%s>.' % (processes_per_node, cores_per_node,
         #                                   node_type))
         #    processes_per_node = cores_per_node
-        num_nodes = int(ceil(float(num_processes)/float(processes_per_node)))
-        
-        # At this point we know that the image is available and the specified 
-        # resource type is valid so we can request to start the instance(s)
-        LOG.debug('About to start <%s> resources of type <%s> based on image '
-                  '<%s (%s)> with keypair <%s>.' % (num_nodes, size.name, 
-                  img.id, img.name, keypair_name))
-        
-        # When starting a resource we need the name, image, type, keypair, 
-        # configuration data and details of the number of resources to start.
-        name = job_id
-        if not name:
-            name = generate_instance_id()
+        if self.placement_plan:
+            num_nodes = self.placement_plan.num_nodes
+        else:
+            num_nodes = int(ceil(float(num_processes)/float(processes_per_node)))
+        
+        # If a warm node pool is enabled for this platform, try to lease 
+        # running nodes with the required image and software configuration 
+        # from the pool rather than starting new nodes.
+        self.nodes = None
+        if self.platform_config.pool_size:
+            self.pool_key = self._get_pool_key(image_id, software_config)
+            self.pool_node_type = node_type
+            self.nodes = self._lease_pool_nodes(node_type, num_nodes, job_id)
+        
+        if self.nodes:
+            # Nodes from the pool have already been configured
+            self.use_unconfigured = False
+            self.running_nodes = [(node, node.public_ips) 
+                                  for node in self.nodes]
+            self._notify_resource_state(RESOURCES_RUNNING, self.running_nodes)
+        else:
+            # At this point we know that the image is available and the 
+            # specified resource type is valid so we can request to start the
+            # instance(s)
+            LOG.debug('About to start <%s> resources of type <%s> based on image '
+                      '<%s (%s)> with keypair <%s>.' % (num_nodes, size.name, 
+                      img.id, img.name, keypair_name))
+        
+            # When starting a resource we need the name, image, type, 
+            # keypair, configuration data and details of the number of 
+            # resources to start.
+            name = job_id
+            if not name:
+                name = generate_instance_id()
          
-        self.nodes = self.driver.create_node(name=name, image=img, size=size,
-                                        ex_keyname=keypair_name,
-                                        ex_mincount=num_nodes,
-                                        ex_maxcount=num_nodes)
-        
-        if type(self.nodes) != type([]):
-            self.nodes = [self.nodes]
-        
-        self.running_nodes = self.driver.wait_until_running(self.nodes)
+            try:
+                self.nodes = self.driver.create_node(name=name, image=img, 
+                                                     size=size,
+                                                     ex_keyname=keypair_name,
+                                                     ex_mincount=num_nodes,
+                                                     ex_maxcount=num_nodes)
+            except Exception:
+                # The cached image or size details may be out of date
+                self._get_metadata_cache().invalidate()
+                raise
+        
+            if type(self.nodes) != type([]):
+                self.nodes = [self.nodes]
+        
+            self._notify_resource_state(RESOURCES_REQUESTED, self.nodes)
+        
+            self.running_nodes = self.driver.wait_until_running(self.nodes)
+            self._notify_resource_state(RESOURCES_RUNNING, self.running_nodes)
                 
         # Before we return details of the running nodes, we need to check
         # that they're accessible - it takes some time for the nodes to boot
@@ -296,16 +381,18 @@ class JobDeploymentEC2(JobDeploymentBase):
                            'still not accessible <%s>. Cancelling job.'
                            % (retries, nodes_to_check))
         
+        self._notify_resource_state(RESOURCES_REACHABLE, self.running_nodes)
+        
         # If we have multiple nodes, now is the time to create the machinefile
         # for MPI job runs
         # For the machinefile we need the private IP of each node and the 
         # number of cores.
+        slots = [cores_per_node] * len(self.running_nodes)
+        if self.placement_plan:
+            slots = self.placement_plan.slots
         machinefile = tempfile.NamedTemporaryFile('w', delete=True)
-        machinefile.write("# Machine file for MPI job runs\n")
-        for node in self.running_nodes:
-            machinefile.write('%s slots=%s max_slots=%s\n' 
-                              % (node[0].private_ips[0],
-                                 cores_per_node, cores_per_node))
+        machinefile.write(get_machinefile([node[0].private_ips[0] for node 
+                                           in self.running_nodes], slots))
         machinefile.flush()
         LOG.debug('The following machinefile has been created:\n\n%s\n' 
                   % machinefile.name)
@@ -313,19 +400,180 @@ class JobDeploymentEC2(JobDeploymentBase):
         # The master node is always considered to be node 0 in 
         # the self.running_nodes list.
         LOG.debug('Copying machinefile to master node...')
-        saga_machinefile = File('file://%s' % machinefile.name, session=self.session)
-        saga_machinefile.copy('sftp://%s/tmp/machinefile' 
-                              % self.running_nodes[0][0].public_ips[0])
+        # If we're using an unconfigured image, the job account hasn't been
+        # set up yet so the admin account is used.
+        master_ip = self.running_nodes[0][0].public_ips[0]
+        session, user_id = self._get_node_session()
+        saga_machinefile = File('file://%s' % machinefile.name, session=session)
+        saga_machinefile.copy('sftp://%s/tmp/machinefile' % master_ip)
         machinefile.close()
         LOG.debug('machinefile copied to master node...')
         
-        conn = PTYShell('ssh://%s' % self.running_nodes[0][0].public_ips[0], 
-                        session=self.session)
-        conn.run_sync('chmod 644 /tmp/machinefile')
+        with self.connections.connection(master_ip, user_id, session) as conn:
+            conn.run_sync('chmod 644 /tmp/machinefile')
         LOG.debug('Set permissions on /tmp/machinefile on master node to 644.')
+        self._notify_resource_state(RESOURCES_MACHINEFILE_INSTALLED, 
+                                    self.running_nodes)
+        if not self.use_unconfigured:
+            self.resources_configured = True
         
         return self.running_nodes
 
+    def get_deployment_state(self):
+        state = JobDeploymentBase.get_deployment_state(self)
+        # The nodes are stored in order so that the master node is restored 
+        # as the first of the running nodes.
+        nodes = getattr(self, 'nodes', None) or []
+        state.update({'node_ids': [node.id for node in nodes],
+                      'use_unconfigured': getattr(self, 'use_unconfigured', 
+                                                  False),
+                      'job_accounts_ready': self.job_accounts_ready,
+                      'resources_configured': self.resources_configured,
+                      'pool_key': self.pool_key,
+                      'pool_node_type': self.pool_node_type,
+                      'image_cache_key': self.image_cache_key,
+                      'snapshot_pending': self._snapshot_pending})
+        return state
+    
+    def restore_deployment_state(self, state):
+        node_ids = state.get('node_ids', [])
+        nodes = dict([(node.id, node) 
+                      for node in self._get_nodes_by_id(node_ids)])
+        missing = [node_id for node_id in node_ids if node_id not in nodes]
+        if missing:
+            raise ResourceInitialisationError('Unable to find the job\'s '
+                                              'nodes <%s>.' % missing)
+        self.nodes = [nodes[node_id] for node_id in node_ids]
+        self.running_nodes = [(node, node.public_ips) for node in self.nodes]
+        self.use_unconfigured = state.get('use_unconfigured', False)
+        self.job_accounts_ready = state.get('job_accounts_ready', False)
+        self.resources_configured = state.get('resources_configured', False)
+        self.pool_key = state.get('pool_key')
+        self.pool_node_type = state.get('pool_node_type')
+        self.image_cache_key = state.get('image_cache_key')
+        self._snapshot_pending = state.get('snapshot_pending', False)
+        if self.use_unconfigured:
+            self.admin_ctx = saga.Context("ssh")
+            self.admin_ctx.user_id = self.platform_config.image_unconfigured_admin_key_user
+            self.admin_ctx.user_key = self.platform_config.image_unconfigured_admin_key_file
+        JobDeploymentBase.restore_deployment_state(self, state)
+    
+    def prepare_resources(self):
+        JobDeploymentBase.prepare_resources(self)
+        # When using an unconfigured image, the job account needs to be 
+        # created, and the job key installed, on each node before job files 
+        # can be transferred. This doesn't depend on the software to be 
+        # deployed so it is done separately from deploy_software to allow
+        # software deployment and file transfer to run concurrently.
+        if not self.use_unconfigured:
+            # A preconfigured, or cached, image has the job account but the 
+            # nodes may not have the job key that they need to send job data
+            # to each other.
+            self._distribute_job_key()
+            return
+        if self.job_accounts_ready:
+            return
+        
+        if not self.admin_ctx:
+            raise JobError('prepare_resources: There is no admin context '
+                           'available so it will not be possible to connect '
+                           'to remote resources to configure them.')
+        
+        node_ips = [node[0].public_ips[0] for node in self.running_nodes]
+        LOG.debug('Setting up job account on the following list of nodes: %s' 
+                  % node_ips)
+        shell_conns = self._open_admin_shells(node_ips, 
+                                              self._get_admin_session())
+        try:
+            self._setup_job_accounts(shell_conns)
+        finally:
+            for conn in shell_conns:
+                conn.release()
+        self.job_accounts_ready = True
+    
+    def _setup_job_accounts(self, shell_conns):
+        for conn in shell_conns:
+            if self.platform_config.image_unconfigured_os == 'linux':
+                self._setup_job_account(conn, self.platform_config)
+            else:
+                LOG.warning('Support for creation of job accounts on ' 
+                    'platforms other than linux is not yet supported...')
+        # Copy the job account key to the node(s) that send job data
+        # With the sequential distribution strategy only the master 
+        # node sends data to other nodes. Other strategies require slave 
+        # nodes to be able to connect to each other so they also need 
+        # the job key.
+        key_conns = shell_conns[:1]
+        if self.platform_config.distribution_strategy != 'sequential':
+            key_conns = shell_conns
+        self._copy_job_key([key_conn.url for key_conn in key_conns])
+    
+    def _distribute_job_key(self):
+        # Copy the job key to every node, using the job account, if slave 
+        # nodes need to connect to each other to distribute job data.
+        if (self.platform_config.distribution_strategy == 'sequential' or
+            len(self.running_nodes) < 2):
+            return
+        if not self.platform_config.user_home:
+            raise JobError('The <%s> job data distribution strategy requires '
+                           'the job key to be copied to each node but the '
+                           'platform doesn\'t specify the job account\'s home '
+                           'directory.' 
+                           % self.platform_config.distribution_strategy)
+        self._copy_job_key(['sftp://%s' % node[0].public_ips[0] 
+                            for node in self.running_nodes])
+    
+    def _copy_job_key(self, node_urls):
+        keyfile = File('file://%s' % self.platform_config.user_key_file,
+                       session=self.session)
+        for node_url in node_urls:
+            keyfile_target = node_url + os.path.join( 
+                                          self.platform_config.user_home,
+                                          '.ssh','id_rsa')
+            LOG.debug('Copying job key to target directory <%s>' 
+                      % keyfile_target)
+            try:
+                keyfile.copy(keyfile_target)
+            except saga.SagaException as e:
+                raise JobError('Unable to copy the job key to <%s>, it is '
+                               'needed to distribute job data between the '
+                               'nodes: %s' % (keyfile_target, str(e)))
+    
+    def _get_admin_session(self):
+        # Set up a session using the admin user and key provided for the 
+        # unconfigured image. The session is kept so that connections made
+        # using it can be reused.
+        if not self._admin_session:
+            adm_session = saga.Session(default=False)
+            adm_ctx = saga.Context("ssh")
+            adm_ctx.user_id = self.platform_config.image_unconfigured_admin_key_user
+            adm_ctx.user_key = self.platform_config.image_unconfigured_admin_key_file
+            adm_session.add_context(adm_ctx)
+            self._admin_session = adm_session
+        return self._admin_session
+    
+    def _get_node_session(self):
+        # Get the session, and user, for connecting to the nodes before the 
+        # job account has been set up.
+        if self.admin_ctx:
+            return (self._get_admin_session(), None)
+        return (self.session, self.platform_config.user_id)
+    
+    def _open_admin_shells(self, node_ips, adm_session):
+        # The shells must be released when no longer required
+        return [self.connections.acquire(node_ip, session=adm_session)
+                for node_ip in node_ips]
+    
+    def _open_connection(self, host, user_id, session):
+        # Cloud nodes are new hosts so their host keys are not checked. Where
+        # no user is specified, the session's user is used and the URL has 
+        # no trailing slash so that paths can be appended to it.
+        opts = {}
+        opts['ssh_options'] = {'StrictHostKeyChecking':'no'}
+        url = ('ssh://%s@%s/' % (user_id, host) if user_id 
+               else 'ssh://%s' % host)
+        return PTYShell(url, session=session or self.session, opts=opts)
+
     def deploy_software(self, software_config = None):
         JobDeploymentBase.deploy_software(self)
         # Here we undertake transfer of the code to the remote platform if this 
@@ -382,7 +630,12 @@ class JobDeploymentEC2(JobDeploymentBase):
         sc_dict = {}
         for sc in software_config:
             try:
-                conf = scm.get_software_configuration(sc)
+                # Use the configuration loaded by prepare_job if available
+                if self.prepared_software_configs and \
+                        sc in self.prepared_software_configs:
+                    conf = self.prepared_software_configs[sc]
+                else:
+                    conf = scm.get_software_configuration(sc)
                 sc_dict[sc] = conf
             except ValueError as e:
                 raise JobError('Job error - no software could be found for '
@@ -404,72 +657,129 @@ class JobDeploymentEC2(JobDeploymentBase):
         # If we reach this point we assume that each of the software 
         # configurations has been found and they are for the right target 
         # platform.
+        # The job account must be set up on each node before the software 
+        # is deployed. This does nothing if prepare_resources has already 
+        # been run.
+        self.prepare_resources()
+        
+        # Now run each of the install commands synchronously on all of the
+        # target machines to get the software installed.
+        node_ips = [node[0].public_ips[0] for node in self.running_nodes]
+        LOG.debug('Deploying to the following list of nodes: %s' % node_ips)
+        adm_session = self._get_admin_session()
+        self.software_install_output = {}
         for sc_key in sc_dict.keys():
             sc_obj = sc_dict[sc_key]
-            install_commands = sc_obj.get_install_commands()
-            
-            # Now run each of the install commands synchronously on all of the
-            # target machines to get the software installed.
-            node_ips = [node[0].public_ips[0] for node in self.running_nodes]
-            LOG.debug('Deploying to the following list of nodes: %s' % node_ips)
             
-            # Set up a new session using the admin user and key provided for 
-            # the unconfigured image.
-            adm_session = saga.Session(default=False)
-            adm_ctx = saga.Context("ssh")
-            adm_ctx.user_id = admin_key_user
-            adm_ctx.user_key = admin_key_file
-            adm_session.add_context(adm_ctx)
             # Open shell connections to each of the machines
-            shell_conns = []
-            opts = {}
-            opts['ssh_options'] = {'StrictHostKeyChecking':'no'}
-            for node_ip in node_ips:
-                conn = PTYShell('ssh://%s' % node_ip, session=adm_session,
-                                opts=opts)
-                shell_conns.append(conn)
-                if conf.software_os_type == 'linux':
-                    self._setup_job_account(conn, self.platform_config)
-                else:
-                    LOG.warning('Support for creation of job accounts on ' 
-                        'platforms other than linux is not yet supported...')
-            # Copy the job account key to the master node
-            job_session = saga.Session(default=False)
-            job_session.add_context(self.job_ctx)
+            shell_conns = self._open_admin_shells(node_ips, adm_session)
+            try:
+                # In script mode, the whole configuration is compiled into a 
+                # single script that is uploaded and run once on each node.
+                if sc_obj.software_install_mode == 'script':
+                    script = sc_obj.get_install_script()
+                    results = run_parallel(
+                            lambda conn: self._run_install_script(conn, 
+                                            sc_key, script, admin_key_user),
+                            shell_conns, len(shell_conns))
+                    self._check_install_results('install script for <%s>' 
+                                                % sc_key, results)
+                    continue
             
-            keyfile = File('file://%s' % self.platform_config.user_key_file,
-                           session=job_session)
-            keyfile_target = shell_conns[0].url + os.path.join( 
-                                          self.platform_config.user_home,
-                                          '.ssh','id_rsa')
-            LOG.debug('Copying job key to target directory <%s>' % keyfile_target)
-            keyfile.copy(keyfile_target)
-            for cmd in install_commands:
-                for shell_connection in shell_conns:
-                    if isinstance(cmd, SoftwareConfigFile):
-                        LOG.debug('Software deployment: About to write data to '
-                                  'remote file <%s> on node <%s>'
-                                  % (cmd.filename, shell_connection.url)) 
-                        # Write the file to the home directory of the current 
-                        # user account to avoid any problems with ownership of 
-                        # the target location
-                        shell_connection.write_to_remote(cmd.data, 
-                                            os.path.basename(cmd.filename))
-                        # Now use sudo to move the file to the target location
-                        local_cmd = ('sudo mv ~/%s %s' 
-                               % (os.path.basename(cmd.filename), cmd.filename))
-                        shell_connection.run_sync(local_cmd)
-                    else:
-                        LOG.debug('Software deployment: About to run command '
-                                  '<%s> on resource <%s>...' 
-                                  % (cmd, shell_connection.url))
-                        if admin_key_user != 'root':
-                            cmd = 'sudo ' + cmd
-                        result, out, err = shell_connection.run_sync(cmd)
-                        LOG.debug('Command completed - Exit code: <%s>, '
-                                  'StdOut: <%s>, StdErr:\n<%s>'
-                                  % (result, out, err))
+                install_commands = sc_obj.get_install_commands()
+                # Each command is run on all nodes concurrently. All nodes 
+                # must complete a command before the next command is started
+                # and deployment stops if the command fails on any node.
+                for cmd in install_commands:
+                    results = run_parallel(
+                            lambda conn: self._run_install_command(conn, 
+                                                        cmd, admin_key_user),
+                            shell_conns, len(shell_conns))
+                    self._check_install_results(cmd, results)
+            finally:
+                for conn in shell_conns:
+                    conn.release()
+        
+        self.resources_configured = True
+        
+        # The software has been deployed successfully so, if image caching is
+        # enabled, the master node is snapshotted when resources are shut down.
+        if self.image_cache_key:
+            self._snapshot_pending = True
+    
+    def _run_install_command(self, shell_connection, cmd, admin_key_user):
+        # Run a software install command or write a software configuration 
+        # file on a node. The output is recorded in software_install_output.
+        if isinstance(cmd, SoftwareConfigFile):
+            LOG.debug('Software deployment: About to write data to '
+                      'remote file <%s> on node <%s>'
+                      % (cmd.filename, shell_connection.url)) 
+            # Write the file to the home directory of the current 
+            # user account to avoid any problems with ownership of 
+            # the target location
+            shell_connection.write_to_remote(cmd.data, 
+                                             os.path.basename(cmd.filename))
+            # Now use sudo to move the file to the target location
+            local_cmd = ('sudo mv ~/%s %s' 
+                         % (os.path.basename(cmd.filename), cmd.filename))
+            result, out, err = shell_connection.run_sync(local_cmd)
+            cmd_str = 'write %s' % cmd.filename
+        else:
+            LOG.debug('Software deployment: About to run command '
+                      '<%s> on resource <%s>...' 
+                      % (cmd, shell_connection.url))
+            if admin_key_user != 'root':
+                cmd = 'sudo ' + cmd
+            result, out, err = shell_connection.run_sync(cmd)
+            LOG.debug('Command completed on resource <%s> - Exit code: <%s>, '
+                      'StdOut: <%s>, StdErr:\n<%s>'
+                      % (shell_connection.url, result, out, err))
+            cmd_str = cmd
+        self.software_install_output.setdefault(str(shell_connection.url), 
+                                                []).append(
+                    {'command': cmd_str, 'exit_code': result, 
+                     'stdout': out, 'stderr': err})
+        return (result, out, err)
     
+    def _run_install_script(self, shell_connection, software_id, script, 
+                            admin_key_user):
+        # Upload the install script to the admin user's home directory on 
+        # the node and run it. The status of each step is parsed from the 
+        # output and recorded in software_install_output.
+        script_file = 'libhpc-install-%s.sh' % software_id
+        LOG.debug('Software deployment: About to run install script <%s> on '
+                  'resource <%s>...' % (script_file, shell_connection.url))
+        shell_connection.write_to_remote(script, script_file)
+        cmd = 'sh ~/%s' % pipes.quote(script_file)
+        if admin_key_user != 'root':
+            cmd = 'sudo ' + cmd
+        result, out, err = shell_connection.run_sync(cmd)
+        steps = parse_install_script_output(out)
+        LOG.debug('Install script completed on resource <%s> - Exit code: '
+                  '<%s>, Steps: <%s>' % (shell_connection.url, result, steps))
+        self.software_install_output.setdefault(str(shell_connection.url), 
+                                                []).append(
+                    {'command': cmd, 'exit_code': result, 'steps': steps,
+                     'stdout': out, 'stderr': err})
+        if result != 0 and steps:
+            err = ('step <%s> failed with exit code <%s>: %s' 
+                   % (steps[-1][0], steps[-1][1], err or out))
+        return (result, out, err)
+    
+    def _check_install_results(self, cmd, results):
+        # Raise a JobError if the install command failed on any node
+        failures = []
+        for result in results:
+            if not result.succeeded:
+                failures.append('%s: %s' % (result.item.url, str(result.error)))
+            elif result.result[0] != 0:
+                failures.append('%s: exit code <%s>, output <%s>' 
+                                % (result.item.url, result.result[0], 
+                                   result.result[2] or result.result[1]))
+        if failures:
+            raise JobError('Software deployment command <%s> failed on '
+                           '<%s> node(s):\n%s' 
+                           % (cmd, len(failures), '\n'.join(failures)))
 
     def transfer_files(self):
         JobDeploymentBase.transfer_files(self)
@@ -479,11 +789,9 @@ class JobDeploymentEC2(JobDeploymentBase):
         LOG.debug('Transfer files...')
         job_dir = self.platform_config.storage_job_directory
         
-        # At this point we need to switch back to using the job secruity 
-        # context. If we were using unconfigured resources, these will have
-        # been configured using an admin context by now.
-        self.session = saga.Session(default = False)
-        self.session.add_context(self.job_ctx)
+        # At this point we use the job security context, held in 
+        # self.session. If we were using unconfigured resources, these will 
+        # have been configured using an admin context by now.
         
         # Begin by checking if we're working with more than one instance, if
         # so we have a master and one or more slave nodes. We'll push the data 
@@ -517,25 +825,14 @@ class JobDeploymentEC2(JobDeploymentBase):
             #raise JobError('The specified job directory already exists on '
             #               'on node <%s> (%s)' % (node_ip, str(e)))
         
-        job_data_dir = os.path.join(str(directory.url),self.job_config.job_id)
-        
         # Now upload the file(s) to the job data directory
         # and create an input file list containing the resulting locations
         # of the files.
-        self.transferred_input_files = []
-        for f in self.job_config.input_files:
-            try:
-                f_obj = File('file://%s' % f, session=self.session)
-                f_obj.copy(job_data_dir)
-                dest_dir = os.path.join(directory.url.path,self.job_config.job_id)
-                self.transferred_input_files.append(
-                    os.path.join(dest_dir, 
-                    os.path.basename(f_obj.url.path)))
-            except:
-                LOG.error('Error copying the input file <%s> to the remote '
-                          'platform.' % f)
-                raise JobError('Error copying the input file <%s> to the '
-                               'remote platform.' % f)
+        # The files are sent concurrently but the list of remote paths is 
+        # returned in the same order as the input files were specified.
+        dest_dir = os.path.join(directory.url.path, self.job_config.job_id)
+        self.transferred_input_files = self._stage_input_files(node_ip, 
+                                                               dest_dir)
         
         # At this point input files have been successfully transferred to 
         # the master node. We now direct the master node to send the files 
@@ -559,7 +856,10 @@ class JobDeploymentEC2(JobDeploymentBase):
         # resource management service to handle this?
         LOG.debug('Run job...')
         
-        job_arguments = getattr(self.job_config, 'args', [])
+        # The job configuration's arguments are copied so that running the 
+        # job again, e.g. when the run_job stage is retried, doesn't add the
+        # input files to them twice.
+        job_arguments = list(getattr(self.job_config, 'args', []))
         input_files = getattr(self, 'transferred_input_files', [])
         job_arguments += input_files
         
@@ -577,7 +877,8 @@ class JobDeploymentEC2(JobDeploymentBase):
         jd.working_directory = getattr(self.job_config, 'working_dir', None)
         jd.output      = getattr(self.job_config, 'stdout', None)
         jd.error       = getattr(self.job_config, 'stderr', None)
-        jd.wall_time_limit = getattr(self.job_config, 'time_limit_mins', 0)
+        jd.wall_time_limit = (getattr(self.job_config, 'time_limit_mins', 0)
+                              or 0)
         #jd.number_of_processes = 4
         #jd.processes_per_host = 1
         #jd.total_physical_memory = "2400"
@@ -587,15 +888,24 @@ class JobDeploymentEC2(JobDeploymentBase):
         if not jd.error:
             jd.error = 'std.err'
         
-        self.svc = Service('ssh://%s/' % self.running_nodes[0][0].public_ips[0], session=self.session)
+        self.svc = self._get_job_service(self.running_nodes[0][0].public_ips[0])
         self.job = self.svc.create_job(jd)
         self.job.run()
         
     def wait_for_job_completion(self):
         LOG.debug('Waiting for job completion...')
-        self.job.wait()
+        # The job process on the master node is polled by the job monitor 
+        # along with any other jobs running on the node.
+        (state, code) = self.await_completion()
         LOG.debug('Job has finished...')
-        return (None, None)
+        return (state, code)
+    
+    def _get_job_poller(self):
+        master_ip = self.running_nodes[0][0].public_ips[0]
+        user_id = self.platform_config.user_id
+        run_command = self._get_command_runner(master_ip, user_id)
+        return (('ps', master_ip, user_id),
+                lambda pids: poll_processes(run_command, pids))
 
     def collect_output(self, destination):
         # Before calling the base implementation of output file collection to 
@@ -625,49 +935,333 @@ class JobDeploymentEC2(JobDeploymentBase):
     def shutdown_resources(self):
         JobDeploymentBase.shutdown_resources(self)
         
-        # Number of seconds between chceking for shutdown of resources.
-        SHUTDOWN_POLL_DELAY = 4
+        if self._snapshot_pending:
+            # A failure to create the image must not prevent the resources 
+            # from being shut down.
+            try:
+                self._create_prebaked_image()
+            except Exception as e:
+                LOG.error('Unable to create a prebaked image from the master '
+                          'node: %s' % str(e))
+            self._snapshot_pending = False
         
         # Here we terminate the running resources for this job and 
         # wait until they have been shut down.
-        res_ids = [node.id for node in self.nodes]
+        # If a warm node pool is enabled, configured nodes are returned to 
+        # the pool rather than being shut down.
+        nodes_to_shutdown = self.nodes or []
+        if self.pool_key and self.resources_configured:
+            nodes_to_shutdown = self._release_pool_nodes()
+        
+        # Connections to the nodes are no longer needed
+        self.close_connections()
+        
+        res_ids = [node.id for node in nodes_to_shutdown]
         LOG.debug('About to shut down the following nodes: %s' % res_ids)
         
         LOG.debug('Shutdown resources...')
-        for node in self.nodes:
-            self.driver.destroy_node(node)
+        terminate_nodes(self.driver, nodes_to_shutdown)
+        if not res_ids:
+            return
         
-        while res_ids:
-            # TODO: Find a better approach to remove nodes that have vanished 
-            # from the system, at present we need to manually go through each
-            # node to identify individual nodes that are no longer accessible.
-            try:
-                nodes_to_wait_for = self._get_node_list(res_ids)
-            except Exception as e:
-                LOG.debug('Exception <%s> getting node list, getting node info'
-                           ' individually.' % str(e))
-                nodes_to_wait_for = self._get_node_list(res_ids, manual=True)
-            still_running = []
-            for node_info in nodes_to_wait_for:
-                if node_info.state != NodeState.TERMINATED:
-                    still_running.append(node_info.id)
-            
-            new_res_ids = []
-            # Now go through res_ids and delete the nodes that don't appear
-            # in still_running.
-            for res_id in res_ids:
-                if res_id not in still_running:
-                    LOG.debug('Resource <%s> has terminated...' % res_id)
-                else:
-                    new_res_ids.append(res_id)
-            res_ids = new_res_ids
-            if res_ids:
-                LOG.debug('Still waiting for termination of resources %s...'
-                          % res_ids)
-                time.sleep(SHUTDOWN_POLL_DELAY)
+        # If we're not waiting for the resources to terminate, the pending 
+        # terminations are recorded and confirmed by a background reaper 
+        # process so that we can return immediately.
+        if not self.platform_config.shutdown_wait:
+            job_id = generate_instance_id()
+            if self.job_config and self.job_config.job_id:
+                job_id = self.job_config.job_id
+            PendingTerminations().add(self.platform_config.platform_id, 
+                                      res_ids, job_id)
+            start_reaper()
+            return
         
+        self.confirm_termination(res_ids)
         LOG.debug('All resources terminated.')
+    
+    def confirm_termination(self, node_ids, timeout=None):
+        JobDeploymentBase.confirm_termination(self, node_ids, timeout)
+        remaining = wait_for_termination(self._get_running_node_ids, node_ids,
+                                         timeout=timeout)
+        if remaining:
+            # Re-send the termination requests in case they were lost
+            nodes = [node for node in self._get_node_list(remaining, True)
+                     if node.state != NodeState.TERMINATED]
+            terminate_nodes(self.driver, nodes)
+        return remaining
+    
+    def _get_running_node_ids(self, res_ids):
+        # TODO: Find a better approach to remove nodes that have vanished 
+        # from the system, at present we need to manually go through each
+        # node to identify individual nodes that are no longer accessible.
+        try:
+            nodes_to_wait_for = self._get_node_list(res_ids)
+        except Exception as e:
+            LOG.debug('Exception <%s> getting node list, getting node info'
+                       ' individually.' % str(e))
+            nodes_to_wait_for = self._get_node_list(res_ids, manual=True)
+        return [node_info.id for node_info in nodes_to_wait_for 
+                if node_info.state != NodeState.TERMINATED]
 
+    def refresh_metadata(self):
+        JobDeploymentBase.refresh_metadata(self)
+        # Clear the cached metadata and look up the node sizes and the 
+        # configured images again.
+        self._get_metadata_cache().invalidate()
+        sizes = self._list_sizes()
+        for image_id in [self.platform_config.image_preconfigured_id,
+                         self.platform_config.image_unconfigured_id]:
+            if not image_id:
+                continue
+            try:
+                if not self._get_image(image_id):
+                    LOG.warning('Image <%s> could not be found.' % image_id)
+            except Exception as e:
+                LOG.warning('Unable to get details of image <%s>: %s' 
+                            % (image_id, str(e)))
+        return sizes
+    
+    def _get_metadata_cache(self):
+        if not self._metadata_cache:
+            self._metadata_cache = MetadataCache(
+                                self.platform_config.platform_id,
+                                self.platform_config.metadata_cache_ttl)
+        return self._metadata_cache
+    
+    def _list_sizes(self):
+        sizes = [size_to_dict(size) for size in self.driver.list_sizes()]
+        self._get_metadata_cache().set_sizes(sizes)
+        return sizes
+    
+    def _get_sizes(self):
+        # Get the sizes from the metadata cache, listing the sizes available
+        # on the platform if they're not cached.
+        sizes = self._get_metadata_cache().get_sizes()
+        if sizes is None:
+            sizes = self._list_sizes()
+        return sizes
+    
+    def _get_node_size(self, node_type):
+        size = next((s for s in self._get_sizes() if s['id'] == node_type), 
+                    None)
+        if not size:
+            return None
+        return NodeSize(size['id'], size['name'], size['ram'], size['disk'],
+                        size['bandwidth'], size['price'], self.driver)
+    
+    def _plan_placement(self, num_processes, node_type, processes_per_node):
+        # Choose from the node types allowed by the job specification, or 
+        # the specified node type. Where the platform doesn't report the 
+        # number of cores for a node type, processes_per_node is used.
+        node_types = self.job_config.node_types
+        if not node_types and node_type:
+            node_types = [node_type]
+        try:
+            plan = plan_placement(num_processes, self._get_sizes(), 
+                            node_types, self.job_config.placement_objective,
+                            default_cores=processes_per_node,
+                            memory_per_process=self.job_config.memory_per_process)
+        except ValueError as e:
+            raise ResourceInitialisationError('ERROR: Unable to plan the '
+                             'placement of the job\'s processes: %s' % str(e))
+        LOG.info('Placing <%s> processes on <%s> node(s) of type <%s> with '
+                 'slots <%s>.' % (num_processes, plan.num_nodes, 
+                                  plan.node_type, plan.slots))
+        return plan
+    
+    def _get_image(self, image_id):
+        # Get the image from the metadata cache, looking it up on the 
+        # platform if it's not cached.
+        cache = self._get_metadata_cache()
+        image = cache.get_image(image_id)
+        if image:
+            return NodeImage(image['id'], image['name'], self.driver)
+        img = self.driver.list_images(ex_image_ids=[image_id])[0]
+        cache.set_images([image_to_dict(img)])
+        return img
+    
+    def _get_cached_image(self, base_image_id, software_config):
+        # Get the ID of the prebaked image recorded for the base image and 
+        # software configuration(s), or None if there is no such image. If 
+        # there is no prebaked image, the key is stored so that an image can
+        # be created once the software has been deployed.
+        if not software_config:
+            return None
+        if type(software_config) != type([]):
+            software_config = [software_config]
+        scm = SoftwareConfigManager.get_instance()
+        scm.init_configuration()
+        try:
+            configs = [scm.get_software_configuration(sc) 
+                       for sc in software_config]
+        except ValueError as e:
+            raise JobError('Job error - unable to find software configuration '
+                           'for image cache lookup: %s' % str(e))
+        key = get_image_key(base_image_id, configs)
+        registry = ImageRegistry(self.platform_config.platform_id)
+        entry = registry.get(key)
+        if entry:
+            try:
+                if self.driver.list_images(ex_image_ids=[entry['image_id']]):
+                    LOG.info('Using prebaked image <%s> for base image <%s> '
+                             'and software <%s>.' % (entry['image_id'], 
+                             base_image_id, ', '.join(software_config)))
+                    return entry['image_id']
+            except Exception as e:
+                LOG.debug('Error looking up prebaked image <%s>: %s' 
+                          % (entry['image_id'], str(e)))
+            LOG.warning('The prebaked image <%s> is no longer available, '
+                        'removing it from the image registry.' 
+                        % entry['image_id'])
+            registry.remove(key)
+            registry.save()
+        self.image_cache_key = key
+        return None
+    
+    def _create_prebaked_image(self):
+        # Remove this job's data from the master node, create an image from
+        # the node and record it in the image registry once it is available.
+        IMAGE_POLL_DELAY = 15
+        
+        master_node = self.running_nodes[0][0]
+        job_dir = os.path.join(self.platform_config.storage_job_directory,
+                               self.job_config.job_id)
+        with self.connections.connection(master_node.public_ips[0],
+                                         self.platform_config.user_id,
+                                         self.session) as conn:
+            ret, out, err = conn.run_sync('rm -rf %s /tmp/machinefile' 
+                                          % pipes.quote(job_dir))
+        LOG.debug('Removed job data from master node before creating image, '
+                  'return value <%s>.' % ret)
+        
+        base_image_id, software_ids, _ = self.image_cache_key.split('|')
+        name = 'libhpc-%s' % generate_instance_id()
+        LOG.info('Creating prebaked image <%s> from node <%s>...' 
+                 % (name, master_node.id))
+        image = self.driver.create_image(master_node, name, 
+                    description='libhpc prebaked image: base image <%s>, '
+                    'software <%s>' % (base_image_id, software_ids))
+        
+        deadline = time.time() + self.platform_config.image_cache_timeout
+        while True:
+            images = self.driver.list_images(ex_image_ids=[image.id])
+            state = images[0].extra.get('state') if images else None
+            if state == 'available':
+                break
+            if state == 'failed' or time.time() > deadline:
+                raise JobError('The prebaked image <%s> did not become '
+                               'available, last state <%s>.' % (image.id, state))
+            LOG.debug('Waiting for prebaked image <%s> to become available, '
+                      'current state <%s>...' % (image.id, state))
+            time.sleep(IMAGE_POLL_DELAY)
+        
+        registry = ImageRegistry(self.platform_config.platform_id)
+        registry.record(self.image_cache_key, image.id, base_image_id, 
+                        software_ids.split(','))
+        registry.save()
+        LOG.info('Prebaked image <%s> is available and has been recorded in '
+                 'the image registry.' % image.id)
+    
+    def _get_node_pool(self):
+        return NodePool(self.platform_config.platform_id,
+                        self.platform_config.pool_size,
+                        self.platform_config.pool_idle_timeout)
+    
+    def _get_pool_key(self, image_id, software_config):
+        # Nodes in the pool are matched on the image they were started from 
+        # and the software configuration deployed to them.
+        if not software_config:
+            return image_id
+        if type(software_config) != type([]):
+            software_config = [software_config]
+        scm = SoftwareConfigManager.get_instance()
+        scm.init_configuration()
+        try:
+            configs = [scm.get_software_configuration(sc) 
+                       for sc in software_config]
+        except ValueError as e:
+            raise JobError('Job error - unable to find software configuration '
+                           'for node pool lookup: %s' % str(e))
+        return get_image_key(image_id, configs)
+    
+    def _get_nodes_by_id(self, node_ids):
+        if not node_ids:
+            return []
+        try:
+            return self.driver.list_nodes(node_ids)
+        except Exception as e:
+            LOG.debug('Error getting node info for nodes <%s>: %s' 
+                      % (node_ids, str(e)))
+            return []
+    
+    def _lease_pool_nodes(self, node_type, num_nodes, job_id):
+        # Lease nodes from the warm pool, shutting down any nodes that the 
+        # pool has evicted. Returns None if the required nodes aren't 
+        # available.
+        pool = self._get_node_pool()
+        leased, evicted = pool.lease(node_type, self.pool_key, num_nodes, 
+                                     job_id)
+        for node in self._get_nodes_by_id(evicted):
+            LOG.debug('Shutting down node <%s> evicted from the node pool.' 
+                      % node.id)
+            self.driver.destroy_node(node)
+        if not leased:
+            return None
+        
+        nodes = dict([(node.id, node) for node in 
+                      self._get_nodes_by_id(leased)])
+        running = [nodes[node_id] for node_id in leased if node_id in nodes
+                   and nodes[node_id].state == NodeState.RUNNING]
+        if len(running) != len(leased):
+            LOG.warning('Some nodes leased from the node pool are no longer '
+                        'running, starting new nodes instead.')
+            pool.remove(leased)
+            for node in nodes.values():
+                self.driver.destroy_node(node)
+            return None
+        LOG.info('Using <%d> node(s) from the node pool: <%s>' 
+                 % (len(running), ', '.join(leased)))
+        return running
+    
+    def _release_pool_nodes(self):
+        # Remove this job's data from each node and return the nodes to the
+        # pool. Returns the nodes that need to be shut down because they 
+        # couldn't be cleaned, the pool is full or they have been evicted.
+        job_dir = os.path.join(self.platform_config.storage_job_directory,
+                               self.job_config.job_id)
+        
+        def _clean(node):
+            with self.connections.connection(node.public_ips[0],
+                                             self.platform_config.user_id,
+                                             self.session) as conn:
+                ret, out, err = conn.run_sync('rm -rf %s /tmp/machinefile' 
+                                              % pipes.quote(job_dir))
+            if ret != 0:
+                raise JobError('Unable to remove job data from node <%s>, '
+                               'return value <%s>.' % (node.id, ret))
+        
+        results = run_parallel(_clean, self.nodes, len(self.nodes))
+        nodes_to_shutdown = []
+        clean_nodes = []
+        for result in results:
+            if result.succeeded:
+                clean_nodes.append(result.item)
+            else:
+                LOG.warning('Not returning node <%s> to the node pool: %s' 
+                            % (result.item.id, str(result.error)))
+                nodes_to_shutdown.append(result.item)
+        
+        pool = self._get_node_pool()
+        rejected, evicted = pool.release([node.id for node in clean_nodes],
+                                         self.pool_node_type, 
+                                         self.pool_key)
+        nodes_to_shutdown += [node for node in clean_nodes 
+                              if node.id in rejected]
+        nodes_to_shutdown += self._get_nodes_by_id(evicted)
+        LOG.info('Returned <%d> node(s) to the node pool.' 
+                 % (len(clean_nodes) - len(rejected)))
+        return nodes_to_shutdown
+    
     # This abstraction previously allowed easy switching between the saga and
     # paramiko implementations of this function. For now, the paramiko version
     # has been removed to remove the dependency on paramiko.
@@ -676,82 +1270,53 @@ class JobDeploymentEC2(JobDeploymentBase):
 
     def _wait_for_node_accessbility_saga(self, node_ip_list, user_id, key_file, 
                                     port=22, retries=3):
-        # Using saga to check if remote resources are accessible
-        retries = 3
-        attempts_made = 0
-        connection_successful = False
-        
-        # Create an empty session with no contexts
-        self.session = saga.Session(default = False)
-        if self.admin_ctx:
-            self.session.add_context(self.admin_ctx)
-        else:
-            self.session.add_context(self.job_ctx)
-
-        # TODO: Shouldn't try other security contexts until we've tried one 
-        # context with all nodes, at present connection fails because we 
-        # switch contexts before checking each node?
-        while attempts_made < retries and not connection_successful:
-            nodes_ok = []
-            for ip in node_ip_list:
-                try:
-                    LOG.debug('Attempt <%s> to connect to remote resource '
-                              '<%s> using SAGA...' % (attempts_made+1, ip))
-                    dir_obj = Directory('sftp://%s/' % ip, 
-                                        session=self.session)
-                    LOG.debug('Triggering connection to remote node by '
-                              'attempting root dir list...')
-                    dir_obj.list()
-                    LOG.debug('Connected to remote node successfully...')
-                    dir_obj.close()
-                    LOG.debug('Closed connection to remote node...')
-                    nodes_ok.append(ip)
-                except socket.timeout:
-                    LOG.debug('Timed out trying to connect to <%s>...'
-                              % ip)
-                except OSError as e:
-                    LOG.debug('OSError trying to connect to <%s>: %s' % (ip, str(e)))
-                except NoSuccess as e:
-                    LOG.debug('NoSuccess making connection to resource <%s>: %s'
-                              % (ip, str(e)))
-                except BadParameter as e:
-                    LOG.debug('BadParameter making connection to resource <%s>'
-                              ': %s' % (ip, str(e)))
-                except AuthenticationFailed as e:
-                    LOG.debug('Authentication failure when making connection '
-                              'to resource <%s>: %s\nTrying next security '
-                              'context...' % (ip, str(e)))
-#                     try:
-#                         next_ctx = contexts.pop()
-#                         self.session = saga.Session(default = False)
-#                         self.session.add_context(next_ctx)
-#                         attempts_made -=1
-#                     except IndexError as e:
-#                         LOG.debug('No more security contexts available: %s '
-#                                   % str(e))
-#                         raise NoSuccess('No valid security context for '
-#                                         'connection to resource <%s>.' % ip)
-                    raise NoSuccess('No valid security context for '
-                                        'connection to resource <%s>.' % ip)
-            
-            node_ip_list = [item for item in node_ip_list if item not in nodes_ok]
-            # if node list is empty and all nodes are running set flag to true
-            if not node_ip_list:
-                connection_successful = True
-            attempts_made += 1
-            
-            if not connection_successful and attempts_made < retries: 
-                wait_time = 10*attempts_made
-                LOG.debug('Waiting <%s> seconds before retrying connection...' 
-                          % wait_time)
-                time.sleep(wait_time)
-        
-        if not connection_successful:
-            LOG.debug('ERROR: Unable to connect to remote node...')
-        else:
-            LOG.debug('**** SAGA CONNECTION TO REMOTE NODE(S) SUCCESSFUL ****')
-        
-        return connection_successful
+        # Using saga to check if remote resources are accessible. All nodes 
+        # are probed concurrently, each node first with a cheap check that its
+        # SSH server is responding and then with an SFTP connection. Failed 
+        # probes are retried with exponential backoff until the probe 
+        # deadline configured for the platform. retries limits the number of
+        # attempts made for each node.
+        # Nodes started from an unconfigured image are accessed using the 
+        # admin account until the job account has been set up.
+        session, _ = self._get_node_session()
+        
+        conf = self.platform_config
+        
+        def _check_ssh(ip):
+            return check_ssh_banner(ip, port, conf.probe_connect_timeout)
+        
+        def _check_sftp(ip):
+            dir_obj = Directory('sftp://%s/' % ip, session=session)
+            LOG.debug('Triggering connection to remote node <%s> by '
+                      'attempting root dir list...' % ip)
+            dir_obj.list()
+            dir_obj.close()
+            return True
+        
+        prober = NodeProber(_check_sftp, pre_check=_check_ssh,
+                            initial_delay=conf.probe_initial_delay,
+                            max_delay=conf.probe_max_delay,
+                            backoff=conf.probe_backoff,
+                            jitter=conf.probe_jitter,
+                            deadline=conf.probe_deadline,
+                            max_attempts=retries,
+                            max_workers=conf.probe_threads,
+                            fatal_errors=(AuthenticationFailed,))
+        try:
+            failed_nodes = prober.probe(node_ip_list)
+        except AuthenticationFailed as e:
+            LOG.debug('Authentication failure when making connection to '
+                      'remote resource: %s' % str(e))
+            raise NoSuccess('No valid security context for connection to '
+                            'resource(s) <%s>.' % ', '.join(node_ip_list))
+        
+        if failed_nodes:
+            LOG.debug('ERROR: Unable to connect to remote node(s) <%s>...' 
+                      % ', '.join(failed_nodes))
+            return False
+        
+        LOG.debug('**** SAGA CONNECTION TO REMOTE NODE(S) SUCCESSFUL ****')
+        return True
     
     def _distribute_job_data(self, master_ip, target_node_ip_list, 
                              user_id, key_file, remote_job_dir, job_id, 
@@ -761,29 +1326,93 @@ class JobDeploymentEC2(JobDeploymentBase):
             LOG.debug('No slave nodes to transfer data to...')
             return
         
-        # Set up SAGA shell object for access to the remote resources
-        if not hasattr(self,'shell'):
-            self.shell = PTYShell('ssh://%s@%s/' % 
-                                  (user_id, master_ip), session=self.session)
-        
-        # Execute command(s) on the remote master node to transfer data to 
-        # slave nodes. 
-        command_template = 'scp -o StrictHostKeyChecking=no -rp %s %s:%s/'
-        # Now trigger the scp command to push data to each of the nodes
-        for target_ip in target_node_ip_list:
-            LOG.debug('About to transfer job files from master node to '
-                      'remote node <%s>' % target_ip)
-            command_to_run = command_template % (os.path.join(remote_job_dir, job_id),
-                                           target_ip, remote_job_dir)
-            LOG.debug('Command to run %s' % command_to_run)
-            ret, out, err = self.shell.run_sync(command_to_run)
+        strategy = self.platform_config.distribution_strategy
+        LOG.debug('Distributing job data to <%d> slave node(s) using the <%s> '
+                  'strategy.' % (len(target_node_ip_list), strategy))
+        if strategy == 'binomial':
+            self._distribute_job_data_tree(master_ip, target_node_ip_list, 
+                                           user_id, remote_job_dir, job_id)
+            return
+        
+        # The shell connection to the master node is obtained from the 
+        # connection manager so it reuses a connection opened earlier, e.g. 
+        # to transfer the input files.
+        with self.connections.connection(master_ip, user_id, 
+                                         self.session) as shell:
+            if strategy == 'chain':
+                command_to_run = get_chain_command(target_node_ip_list, 
+                                                   remote_job_dir, job_id)
+                LOG.debug('Command to run %s' % command_to_run)
+                ret, out, err = shell.run_sync(command_to_run)
+                LOG.debug('Command has run with return value <%s>\nstdout:'
+                          '\n<%s>\nstderr: <%s>\n\n' % (ret, out, err))
+                if ret != 0:
+                    raise JobError('Unable to distribute job data along the '
+                                   'chain of remote nodes <%s>, return value '
+                                   '<%s>' % (', '.join(target_node_ip_list), 
+                                             ret))
+                return
             
+            # Execute command(s) on the remote master node to transfer data 
+            # to slave nodes. 
+            job_data_dir = os.path.join(remote_job_dir, job_id)
+            # Now trigger the scp command to push data to each of the nodes
+            for target_ip in target_node_ip_list:
+                LOG.debug('About to transfer job files from master node to '
+                          'remote node <%s>' % target_ip)
+                command_to_run = get_node_copy_command(None, target_ip, 
+                                                       job_data_dir, 
+                                                       remote_job_dir)
+                LOG.debug('Command to run %s' % command_to_run)
+                ret, out, err = shell.run_sync(command_to_run)
+                
+                LOG.debug('Command has run with return value <%s>\nstdout:'
+                          '\n<%s>\nstderr: <%s>\n\n' % (ret, out, err))
+                
+                if ret != 0:
+                    raise JobError('Unable to distribute job data to remote '
+                                   'node <%s>, scp return value <%s>' 
+                                   % (target_ip, ret))
+    
+    def _distribute_job_data_tree(self, master_ip, target_node_ip_list, 
+                                  user_id, remote_job_dir, job_id):
+        # Distribute the data in rounds. In each round every node that has 
+        # the data sends it to one node that doesn't. All commands are run 
+        # from the master node, copies from slave nodes are triggered via ssh.
+        # Each worker in a round uses its own shell connection to the master.
+        _get_connection = self.connections.factory(master_ip, user_id, 
+                                                   self.session)
+        
+        job_data_dir = os.path.join(remote_job_dir, job_id)
+        
+        def _send(shell, transfer):
+            sender, receiver = transfer
+            command_to_run = get_node_copy_command(sender, receiver, 
+                                                   job_data_dir, remote_job_dir)
+            LOG.debug('Command to run %s' % command_to_run)
+            ret, out, err = shell.run_sync(command_to_run)
             LOG.debug('Command has run with return value <%s>\nstdout:\n<%s>'
                       '\nstderr: <%s>\n\n' % (ret, out, err))
-            
             if ret != 0:
-                raise JobError('Unable to distribute job data to remote node '
-                               '<%s>, scp return value <%s>' % (target_ip, ret))
+                raise JobError('Unable to distribute job data from node <%s> '
+                               'to remote node <%s>, return value <%s>' 
+                               % (sender or master_ip, receiver, ret))
+        
+        rounds = binomial_tree_schedule(None, target_node_ip_list)
+        for round_num, transfers in enumerate(rounds):
+            LOG.debug('Job data distribution round <%d> of <%d>: <%d> '
+                      'transfer(s).' % (round_num + 1, len(rounds), 
+                                        len(transfers)))
+            results = run_parallel(_send, transfers, len(transfers),
+                                   _get_connection)
+            failed = [result for result in results if not result.succeeded]
+            for result in failed:
+                LOG.error('Failed to distribute job data to node <%s>: %s' 
+                          % (result.item[1], str(result.error)))
+            if failed:
+                raise JobError('Unable to distribute job data to remote '
+                               'node(s) <%s>.' 
+                               % ', '.join([r.item[1] for r in failed]))
                 
                 
     def _gather_results_data(self, master_ip, target_node_ip_list, 
@@ -794,30 +1423,52 @@ class JobDeploymentEC2(JobDeploymentBase):
             LOG.debug('No slave nodes to gather data from...')
             return
         
-        # Set up SAGA shell object for access to the remote resources
-        if not hasattr(self,'shell'):
-            self.shell = PTYShell('ssh://%s@%s/' % 
-                                  (user_id, master_ip), session=self.session)
+        # Data is pulled from the slave nodes concurrently. Each worker opens 
+        # its own shell connection to the master node so that the transfers 
+        # run over independent channels. The number of concurrent transfers
+        # is bounded by the platform's storage_transfer_threads value.
+        _get_connection = self.connections.factory(master_ip, user_id, 
+                                                   self.session)
         
-        # Execute command(s) on the remote master node to transfer data to 
-        # slave nodes. 
+        job_data_dir = os.path.join(remote_job_dir, job_id)
         command_template = 'scp -rp %s:%s/* %s/'
-        # Now trigger the scp command to push data to each of the nodes
-        for target_ip in target_node_ip_list:
-            LOG.debug('About to transfer job files from master node to '
-                      'remote node <%s>' % target_ip)
-            command_to_run = command_template % (target_ip, 
-                                                 os.path.join(remote_job_dir, job_id),
-                                                 os.path.join(remote_job_dir, job_id))
-            LOG.debug('Command to run %s' % command_to_run)
-            ret, out, err = self.shell.run_sync(command_to_run)
+        
+        def _gather(shell, target_ip):
+            command_to_run = command_template % (target_ip, job_data_dir,
+                                                 job_data_dir)
+            LOG.debug('About to gather job files from remote node <%s> to '
+                      'master node: %s' % (target_ip, command_to_run))
+            ret, out, err = shell.run_sync(command_to_run)
             
-            LOG.debug('Gather command has run with return value <%s>\nstdout:'
-                      '\n<%s>\nstderr: <%s>\n\n' % (ret, out, err))
+            LOG.debug('Gather command for node <%s> has run with return value '
+                      '<%s>\nstdout:\n<%s>\nstderr: <%s>\n\n' 
+                      % (target_ip, ret, out, err))
             
             if ret != 0:
                 raise JobError('Unable to gather job data from remote node '
                                '<%s>, scp return value <%s>' % (target_ip, ret))
+        
+        results = run_parallel(_gather, target_node_ip_list,
+                               self.platform_config.storage_transfer_threads,
+                               _get_connection)
+        
+        # Record and report the time taken to gather data from each node
+        self.gather_timings = {}
+        failed_nodes = []
+        for result in results:
+            self.gather_timings[result.item] = result.elapsed
+            if result.succeeded:
+                LOG.info('Gathered job data from node <%s> in <%.2f> seconds.'
+                         % (result.item, result.elapsed))
+            else:
+                LOG.error('Failed to gather job data from node <%s> after '
+                          '<%.2f> seconds: %s' 
+                          % (result.item, result.elapsed, str(result.error)))
+                failed_nodes.append(result.item)
+        
+        if failed_nodes:
+            raise JobError('Unable to gather job data from remote node(s) '
+                           '<%s>.' % ', '.join(failed_nodes))
                 
     def _setup_job_account(self, pty_conn, platform_config):
         user_id = platform_config.user_id
@@ -918,8 +1569,7 @@ class JobDeploymentEC2(JobDeploymentBase):
             node_list = []
             for res_id in res_ids:
                 try:
-                    node_info = self.driver.list_nodes(res_id)
-                    node_list.append(node_info)
+                    node_list.extend(self.driver.list_nodes([res_id]))
                 except Exception as e:
                     LOG.debug('Error getting node info for node <%s>,'
                               'assuming this node has terminated...' % res_id)
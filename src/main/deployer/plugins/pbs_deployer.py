@@ -47,12 +47,20 @@ Created on 31 Jul 2015
 @author: jcohen02
 '''
 import os
+import copy
 import logging
+import pipes
 
 from deployer.core.deployment_interface import JobDeploymentBase
 from deployer.core.exceptions import JobError
+from deployer.core.job_array import ARRAY_SCRIPT_NAME, MIN_ARRAY_JOBS,\
+    get_array_script, get_array_submit_command, get_subjob_id, \
+    parse_qsub_output
+from deployer.core.monitor import JobMonitor, poll_pbs_jobs
+from deployer.core.pbs_resources import JOB_SCRIPT_NAME, get_job_script,\
+    get_qsub_command, get_resource_options
 
-from saga.filesystem import Directory, File
+from saga.filesystem import Directory
 import saga.job
 
 LOG = logging.getLogger(__name__)
@@ -70,7 +78,12 @@ class JobDeploymentPBS(JobDeploymentBase):
     job execution used here does not include the start_resources and 
     shutdown_resources stages but implementations are provided for all other 
     phases of the deployment process.   
+    
+    A set of jobs, e.g. the jobs of a parameter sweep, can be submitted as a
+    single PBS job array using run_job_array.
     '''
+    
+    supports_job_arrays = True
 
     def __init__(self, platform_config):
         '''
@@ -94,12 +107,24 @@ class JobDeploymentPBS(JobDeploymentBase):
         # Resource initialisation is not required directly but we use this 
         # function to intiialise the connection with the PBS platform via the 
         # SAGA-Python library.
-        self.svc = saga.job.Service('pbs+ssh://%s/'
-                                    % self.platform_config.platform_service_host,
+        self.svc = saga.job.Service(self._get_service_url(), 
                                     session=self.session)
         
         return None        
     
+    def restore_deployment_state(self, state):
+        # The job service is created by initialise_resources, which isn't run
+        # again when the job's lifecycle is resumed.
+        self.svc = saga.job.Service(self._get_service_url(), 
+                                    session=self.session)
+        JobDeploymentBase.restore_deployment_state(self, state)
+    
+    def _get_service_url(self):
+        return 'pbs+ssh://%s/' % self.platform_config.platform_service_host
+    
+    def _get_remote_job(self, remote_job_id):
+        return self.svc.get_job(remote_job_id)
+    
     def deploy_software(self, *args, **kwargs):
         JobDeploymentBase.deploy_software(self)
         # Here we undertake transfer of the code to the remote platform if this 
@@ -124,16 +149,19 @@ class JobDeploymentPBS(JobDeploymentBase):
             raise JobError('The specified job directory does not exist on PBS'
                            'submission node <%s> (%s)' % (host, str(e)))
         
-        try:
-            # directory.make_dir() does not return a handle to the new directory
-            # so need to create the directory URL manually.
-            directory.make_dir(self.job_config.job_id)
-            job_data_dir = os.path.join(str(directory.url),self.job_config.job_id)  
-        except saga.NoSuccess as e:
-            LOG.error('The specified job data directory already exists on '
-                      'PBS submission node <%s> (%s).' % (host, str(e)))
-            raise JobError('The specified job directory already exists on PBS'
-                           'submission node <%s> (%s)' % (host, str(e)))
+        # If the stage is being retried, the job directory has already been
+        # created by the earlier attempt.
+        if not self.job_dir_created:
+            try:
+                # directory.make_dir() does not return a handle to the new 
+                # directory so need to create the directory URL manually.
+                directory.make_dir(self.job_config.job_id)
+            except saga.NoSuccess as e:
+                LOG.error('The specified job data directory already exists on '
+                          'PBS submission node <%s> (%s).' % (host, str(e)))
+                raise JobError('The specified job directory already exists on '
+                               'PBS submission node <%s> (%s)' % (host, str(e)))
+            self.job_dir_created = True
         
         # Now upload the file(s) to the job data directory
         # and create an input file list containing the resulting locations
@@ -146,57 +174,139 @@ class JobDeploymentPBS(JobDeploymentBase):
             LOG.debug('There are no input files to transfer for this job...')
             return
         
-        self.transferred_input_files = []
-        for f in self.job_config.input_files:
-            try:
-                f_obj = File('file://%s' % f, session=self.session)
-                f_obj.copy(job_data_dir)
-                dest_dir = os.path.join(directory.url.path,self.job_config.job_id)
-                self.transferred_input_files.append(
-                    os.path.join(dest_dir, 
-                    os.path.basename(f_obj.url.path)))
-            except:
-                LOG.error('Error copying the input file <%s> to the remote '
-                          'platform.' % f)
-                raise JobError('Error copying the input file <%s> to the '
-                               'remote platform.' % f)
+        # The files are sent concurrently but the list of remote paths is 
+        # returned in the same order as the input files were specified.
+        dest_dir = os.path.join(directory.url.path, self.job_config.job_id)
+        self.transferred_input_files = self._stage_input_files(host, dest_dir)
         
     def run_job(self, job_details=None):
         JobDeploymentBase.run_job(self)
-        # This function uses the SAGA-Python library to run the job. Separate 
-        # functionality in the library is used for monitoring the job process.
+        # The job is submitted with qsub, rather than through SAGA-Python, so
+        # that its resource request can specify the number of processes to 
+        # run on each node, the memory required, the placement of the 
+        # processes and the queue to use. The job is then tracked as a SAGA 
+        # job.
         
         # TODO: Add modules to PBS job confiuguration
         
-        # Here we extract the job details from the previously stored job details
-        # object into a SAGA Python job description object so that we can run 
-        # the job.
-        job_arguments = getattr(self.job_config, 'args', [])
+        # The job script runs the job with the paths of its input files 
+        # appended to its arguments.
         input_files = getattr(self, 'transferred_input_files', [])
-        job_arguments += input_files
-        
-        jd = saga.job.Description()
-        jd.environment = getattr(self.job_config, 'environment', {})
-        jd.executable  = getattr(self.job_config, 'executable', None)
-        jd.arguments   = job_arguments
-        jd.working_directory = getattr(self.job_config, 'working_dir', None)
-        jd.output      = getattr(self.job_config, 'stdout', None)
-        jd.error       = getattr(self.job_config, 'stderr', None)
-        jd.wall_time_limit = getattr(self.job_config, 'time_limit_mins', 0)
-        jd.total_cpu_count = getattr(self.job_config, 'num_processes', 1)
-        #jd.processes_per_host = 1
-        #jd.total_physical_memory = "2400"
-        
-        self.job = self.svc.create_job(jd)
-        self.job.run() 
+        script = get_job_script(self.job_config, input_files, 
+                                self.platform_config.pbs_mpi_launcher)
+        job_dir = os.path.join(self.platform_config.storage_job_directory,
+                               self.job_config.job_id)
+        script_file = os.path.join(job_dir, JOB_SCRIPT_NAME)
+        command = get_qsub_command(script_file, 
+                                   self._get_resource_options(self.job_config),
+                                   output_dir=job_dir)
+        
+        out = self._submit(script, script_file, command)
+        pbs_job_id = out.strip()
+        if not pbs_job_id:
+            raise JobError('Unable to get the ID of the PBS job from the qsub '
+                           'output.')
+        LOG.debug('Submitted PBS job <%s>.' % pbs_job_id)
+        self.job = self._get_remote_job('[%s]-[%s]' % (self._get_service_url(),
+                                                       pbs_job_id))
+    
+    def run_job_array(self, job_deployers):
+        '''
+        Run the jobs of the specified job deployers, obtained from 
+        get_job_deployer and with their input files transferred, as a single
+        job array submitted with qsub -J. Sub-job i runs the job of 
+        job_deployers[i] in its own working directory with its own 
+        environment, arguments and input files. Each job deployer's job is 
+        watched as a sub-job of the array so that wait_for_job_completion 
+        and collect_output can then be called for each job deployer. All of
+        the sub-jobs are polled with one qstat command. Returns the ID of 
+        the job array.
+        '''
+        if len(job_deployers) < MIN_ARRAY_JOBS:
+            LOG.debug('Too few jobs for a job array, running <%d> job(s) '
+                      'individually.' % len(job_deployers))
+            for d in job_deployers:
+                d.run_job()
+            return None
+        
+        job_configs = [d.job_config for d in job_deployers]
+        script = get_array_script(
+                    [(d.job_config, getattr(d, 'transferred_input_files', []))
+                     for d in job_deployers],
+                    self.platform_config.pbs_mpi_launcher)
+        # The array's script and the output of its sub-jobs' scripts are 
+        # stored in a directory for the array alongside the job directories.
+        array_dir = os.path.join(self.platform_config.storage_job_directory,
+                                 'array-%s' % job_configs[0].job_id)
+        script_file = os.path.join(array_dir, ARRAY_SCRIPT_NAME)
+        # Every sub-job is allocated the resources of the largest job with 
+        # the longest time limit of any of the jobs.
+        resource_job = copy.copy(max(job_configs, 
+                                     key=lambda jc: int(jc.num_processes)))
+        resource_job.time_limit_mins = max([jc.time_limit_mins or 0 
+                                            for jc in job_configs])
+        command = get_array_submit_command(
+                    script_file, len(job_deployers),
+                    self._get_resource_options(resource_job),
+                    output_dir=array_dir)
+        
+        out = self._submit(script, script_file, command)
+        array_id = parse_qsub_output(out)
+        LOG.debug('Submitted job array <%s>.' % array_id)
+        
+        group, poll_func = self._get_job_poller()
+        monitor = JobMonitor.get_instance()
+        for index, d in enumerate(job_deployers):
+            d.job_future = monitor.watch(group, get_subjob_id(array_id, index),
+                                         poll_func)
+        return array_id
+    
+    def _get_resource_options(self, job_config):
+        # Get the qsub options requesting the resources for a job, using the
+        # platform's queue rules to choose the queue.
+        options = get_resource_options(
+                    job_config, 
+                    queue_rules=self.platform_config.pbs_queues,
+                    default_queue=self.platform_config.pbs_default_queue,
+                    default_placement=self.platform_config.pbs_placement)
+        LOG.debug('PBS resource request for job <%s>: %s' 
+                  % (job_config.job_id, ' '.join(options)))
+        return options
+    
+    def _submit(self, script, script_file, command):
+        # Write a job script to the submission node and submit it using the
+        # specified qsub command, returning the output of qsub.
+        host = self.platform_config.platform_service_host
+        script_dir = os.path.dirname(script_file)
+        with self.connections.connection(host, self.platform_config.user_id, 
+                                         self.session) as shell:
+            ret, out, err = shell.run_sync('mkdir -p %s' 
+                                           % pipes.quote(script_dir))
+            if ret != 0:
+                raise JobError('Unable to create the job script directory '
+                               '<%s> on PBS submission node <%s>: %s' 
+                               % (script_dir, host, err))
+            shell.write_to_remote(script, script_file)
+            LOG.debug('Submitting job script <%s>: %s' % (script_file, command))
+            ret, out, err = shell.run_sync(command)
+        if ret != 0:
+            raise JobError('Unable to submit the job to PBS submission node '
+                           '<%s>, qsub return value <%s>: %s' 
+                           % (host, ret, err))
+        return out
     
     def wait_for_job_completion(self):
         JobDeploymentBase.wait_for_job_completion(self)
         
-        # Wait for job to complete
-        self.job.wait()
+        # Wait for job to complete, the job's state is polled by the job 
+        # monitor along with any other jobs submitted via the same host.
+        return self.await_completion()
     
-        return (self.job.state, self.job.exit_code)
+    def _get_job_poller(self):
+        host = self.platform_config.platform_service_host
+        run_command = self._get_command_runner(host)
+        return (('pbs', host, self.platform_config.user_id),
+                lambda job_ids: poll_pbs_jobs(run_command, job_ids))
     
     def collect_output(self, destination):
         JobDeploymentBase.collect_output(self, destination)
@@ -56,8 +56,9 @@ import saga.job
 from deployer.core.deployment_interface import JobDeploymentBase
 from deployer.core.exceptions import JobError, ConnectionError, DirectoryExistsError,\
     StorageDirectoryNotFoundError
+from deployer.core.monitor import poll_processes
 
-from saga.filesystem import Directory, File, RECURSIVE
+from saga.filesystem import Directory, RECURSIVE
 
 LOG = logging.getLogger(__name__)
 logging.basicConfig(level=logging.DEBUG,
@@ -134,16 +135,20 @@ class JobDeploymentSSH(JobDeploymentBase):
             raise StorageDirectoryNotFoundError('The specified job data base '
                     'directory does not exist on resource <%s> (%s)'
                     % (self.host, str(e)))
-        try:
-            # directory.make_dir() does not return a handle to the new directory
-            # so need to create the directory URL manually.
-            directory.make_dir(self.job_config.job_id)
-            job_data_dir = os.path.join(str(directory.url),self.job_config.job_id)  
-        except saga.NoSuccess as e:
-            LOG.error('The specified job data directory already exists on '
-                      'resource <%s> (%s).' % (self.host, str(e)))
-            raise DirectoryExistsError('The specified job directory already '
-                           'exists on resource <%s> (%s)' % (self.host, str(e)))
+        # If the stage is being retried, the job directory has already been
+        # created by the earlier attempt.
+        if not self.job_dir_created:
+            try:
+                # directory.make_dir() does not return a handle to the new 
+                # directory so need to create the directory URL manually.
+                directory.make_dir(self.job_config.job_id)
+            except saga.NoSuccess as e:
+                LOG.error('The specified job data directory already exists on '
+                          'resource <%s> (%s).' % (self.host, str(e)))
+                raise DirectoryExistsError('The specified job directory '
+                               'already exists on resource <%s> (%s)' 
+                               % (self.host, str(e)))
+            self.job_dir_created = True
         
         # Now upload the file(s) to the job data directory
         # and create an input file list containing the resulting locations
@@ -156,20 +161,11 @@ class JobDeploymentSSH(JobDeploymentBase):
             LOG.debug('There are no input files to transfer for this job...')
             return
         
-        self.transferred_input_files = []
-        for f in self.job_config.input_files:
-            try:
-                f_obj = File('file://%s' % f, session=self.session)
-                f_obj.copy(job_data_dir)
-                dest_dir = os.path.join(directory.url.path,self.job_config.job_id)
-                self.transferred_input_files.append(
-                    os.path.join(dest_dir, 
-                    os.path.basename(f_obj.url.path)))
-            except:
-                LOG.error('Error copying the input file <%s> to the remote '
-                          'platform.' % f)
-                raise JobError('Error copying the input file <%s> to the '
-                               'remote platform.' % f)
+        # The files are sent concurrently but the list of remote paths is 
+        # returned in the same order as the input files were specified.
+        dest_dir = os.path.join(directory.url.path, self.job_config.job_id)
+        self.transferred_input_files = self._stage_input_files(
+                                '%s:%s' % (self.host, self.port), dest_dir)
 
     def run_job(self):
         JobDeploymentBase.run_job(self)
@@ -183,7 +179,10 @@ class JobDeploymentSSH(JobDeploymentBase):
         # execution and handle compressing and returning the output files. 
         LOG.debug('SSH Deployer: Run job...')
         
-        job_arguments = getattr(self.job_config, 'args', [])
+        # The job configuration's arguments are copied so that running the 
+        # job again, e.g. when the run_job stage is retried, doesn't add the
+        # input files to them twice.
+        job_arguments = list(getattr(self.job_config, 'args', []))
         input_files = getattr(self, 'transferred_input_files', [])
         job_arguments += input_files
         
@@ -207,7 +206,8 @@ class JobDeploymentSSH(JobDeploymentBase):
         jd.working_directory = getattr(self.job_config, 'working_dir', None)
         jd.output      = getattr(self.job_config, 'stdout', None)
         jd.error       = getattr(self.job_config, 'stderr', None)
-        jd.wall_time_limit = getattr(self.job_config, 'time_limit_mins', 0)
+        jd.wall_time_limit = (getattr(self.job_config, 'time_limit_mins', 0)
+                              or 0)
         
         if not jd.output:
             jd.output = 'std.out'
@@ -220,18 +220,29 @@ class JobDeploymentSSH(JobDeploymentBase):
         
     def wait_for_job_completion(self):
         LOG.debug('SSH Deployer: Waiting for job completion...')
-        self.job.wait()
+        # The job process is polled by the job monitor along with any other 
+        # jobs running on the same host.
+        (state, code) = self.await_completion()
         LOG.debug('SSH Deployer: Job has finished...')
-        return (None, None)
+        return (state, code)
+    
+    def _get_job_poller(self):
+        # As for file transfers, the host needs to include the port.
+        host = '%s:%s' % (self.host, self.port)
+        run_command = self._get_command_runner(host)
+        return (('ps', host, self.platform_config.user_id),
+                lambda pids: poll_processes(run_command, pids))
 
+    def _get_output_host(self):
+        # The default implementation of the file transfer code doesn't take
+        # into account a different port for the remote host connection so 
+        # the port is included in the host used for output file collection.
+        return '%s:%s' % (self.host, self.port)
+    
     def collect_output(self, destination):
-        # We're using the default implementation of the file transfer code
-        # This doesn't take into account a different port for the remote host
-        # connection. To work around this, we temporarily set the host property
-        # to include the port and the revert to the original value after the
-        # file transfer is complete.
-        host_tmp = self.host
-        self.host = ('%s:%s' % (self.host, self.port)) 
+        # self.host is left unchanged so that collect_output can be retried
+        # if it fails.
+        host = self._get_output_host()
         
         # Using the base implementation of job output file collection...
         JobDeploymentBase.collect_output(self, destination)
@@ -244,17 +255,17 @@ class JobDeploymentSSH(JobDeploymentBase):
             # sub-directory specifically for this job.
             try:
                 LOG.debug('URL for file job directory: sftp://%s%s' 
-                          % (self.host, jobs_dir))
-                directory = Directory('sftp://%s%s' % (self.host, jobs_dir), 
+                          % (host, jobs_dir))
+                directory = Directory('sftp://%s%s' % (host, jobs_dir), 
                                       session=self.session)
             except saga.BadParameter as e:
                 LOG.error('The specified job directory does not exist on '
-                          'resource <%s> (%s).' % (self.host, str(e)))
+                          'resource <%s> (%s).' % (host, str(e)))
                 raise JobError('The specified job directory does not exist '
-                               'on resource <%s> (%s)' % (self.host, str(e)))
+                               'on resource <%s> (%s)' % (host, str(e)))
             try:
                 LOG.debug('Deleting job directory after job completion '
-                          '<sftp://%s%s/%s>' % (self.host, jobs_dir, 
+                          '<sftp://%s%s/%s>' % (host, jobs_dir, 
                                                 self.job_config.job_id))
                 directory.remove(self.job_config.job_id, RECURSIVE)
             except saga.NoSuccess as e:
@@ -262,9 +273,6 @@ class JobDeploymentSSH(JobDeploymentBase):
                           'removed <%s> (%s).' % (self.job_config.job_id, str(e)))
                 raise JobError('The specified job data directory couldn\'t be '
                                'removed <%s> (%s)' % (self.job_config.job_id, str(e)))
-
-        # Set the host value back to its original value
-        self.host = host_tmp
         
     def shutdown_resources(self):
         JobDeploymentBase.shutdown_resources(self)
@@ -0,0 +1,161 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the connection manager.
+'''
+import unittest
+
+from deployer.core.connections import ConnectionManager, get_control_options
+
+class FakeConnection(object):
+    
+    def __init__(self, host):
+        self.host = host
+        self.closed = False
+    
+    def run_sync(self, command):
+        return (0, '%s: %s' % (self.host, command), '')
+    
+    def finalize(self, kill_pty=False):
+        self.closed = True
+
+class ConnectionManagerTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.now = 1000.0
+        self.manager = ConnectionManager(
+            lambda host, user_id, session: FakeConnection(host), 
+            idle_timeout=300, time_func=lambda: self.now)
+    
+    def test_released_connection_is_reused(self):
+        conn = self.manager.acquire('10.0.0.1', 'user1')
+        self.assertEqual(conn.run_sync('ls'), (0, '10.0.0.1: ls', ''))
+        conn.release()
+        self.assertEqual(self.manager.get_counts('10.0.0.1', 'user1'), (0, 1))
+        
+        conn2 = self.manager.acquire('10.0.0.1', 'user1')
+        self.assertTrue(conn2 is conn)
+        self.assertEqual(self.manager.opened, 1)
+        # A different user or host gets a new connection
+        self.manager.acquire('10.0.0.1', 'user2')
+        self.manager.acquire('10.0.0.2', 'user1')
+        self.assertEqual(self.manager.opened, 3)
+    
+    def test_connection_in_use_is_not_shared(self):
+        conn1 = self.manager.acquire('10.0.0.1')
+        conn2 = self.manager.acquire('10.0.0.1')
+        self.assertFalse(conn1 is conn2)
+        self.assertEqual(self.manager.get_counts('10.0.0.1'), (2, 0))
+    
+    def test_idle_connections_expire(self):
+        conn = self.manager.acquire('10.0.0.1')
+        conn.release()
+        self.now += 200
+        self.assertEqual(self.manager.expire_idle(), 0)
+        self.now += 200
+        self.assertEqual(self.manager.expire_idle(), 1)
+        self.assertTrue(conn.connection.closed)
+        self.assertFalse(self.manager.acquire('10.0.0.1') is conn)
+    
+    def test_connection_discarded_on_error(self):
+        try:
+            with self.manager.connection('10.0.0.1') as conn:
+                raise ValueError('Command failed')
+        except ValueError:
+            pass
+        self.assertTrue(conn.connection.closed)
+        self.assertEqual(self.manager.get_counts('10.0.0.1'), (0, 0))
+        
+        with self.manager.connection('10.0.0.1') as conn:
+            pass
+        self.assertFalse(conn.connection.closed)
+        self.assertEqual(self.manager.get_counts('10.0.0.1'), (0, 1))
+    
+    def test_factory_connections_return_on_finalize(self):
+        factory = self.manager.factory('10.0.0.1', 'user1')
+        conns = [factory() for _ in range(3)]
+        for conn in conns:
+            conn.finalize(True)
+            self.assertFalse(conn.connection.closed)
+        self.assertEqual(self.manager.get_counts('10.0.0.1', 'user1'), (0, 3))
+        
+        self.manager.close_all()
+        self.assertTrue(all([c.connection.closed for c in conns]))
+        self.assertEqual(self.manager.get_counts('10.0.0.1', 'user1'), (0, 0))
+    
+    def test_release_is_idempotent(self):
+        conn = self.manager.acquire('10.0.0.1')
+        other = self.manager.acquire('10.0.0.1')
+        conn.release()
+        conn.finalize()
+        conn.release(broken=True)
+        self.assertTrue(conn.released)
+        self.assertFalse(conn.connection.closed)
+        self.assertEqual(self.manager.get_counts('10.0.0.1'), (1, 1))
+        # A reused connection can be released again
+        self.assertTrue(self.manager.acquire('10.0.0.1') is conn)
+        self.assertFalse(conn.released)
+        conn.release()
+        other.release()
+        self.assertEqual(self.manager.get_counts('10.0.0.1'), (0, 2))
+    
+    def test_broken_connection_is_discarded(self):
+        conn = self.manager.acquire('10.0.0.1')
+        conn.release(broken=True)
+        self.assertTrue(conn.connection.closed)
+        self.assertEqual(self.manager.get_counts('10.0.0.1'), (0, 0))
+        conn.finalize()
+        self.assertEqual(self.manager.get_counts('10.0.0.1'), (0, 0))
+        self.assertFalse(self.manager.acquire('10.0.0.1') is conn)
+    
+    def test_control_options(self):
+        options = get_control_options(120, '/tmp/cm')
+        self.assertEqual(options['ControlMaster'], 'auto')
+        self.assertEqual(options['ControlPath'], '/tmp/cm/%C')
+        self.assertEqual(options['ControlPersist'], '120')
+
+if __name__ == "__main__":
+    unittest.main()
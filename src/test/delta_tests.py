@@ -0,0 +1,145 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for delta transfer of input files.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+
+from deployer.core.delta import DeltaStager, RemoteCopyIndex, parse_rsync_stats
+from deployer.core.ssh import get_ssh_command
+
+RSYNC_OUTPUT = '''
+Number of files: 1 (reg: 1)
+Total file size: 1,048,576 bytes
+Literal data: 4,096 bytes
+Matched data: 1,044,480 bytes
+'''
+
+class FakeShell(object):
+    
+    def __init__(self, existing):
+        self.existing = existing
+        self.remote_files = {}
+    
+    def write_to_remote(self, data, path):
+        self.remote_files[path] = data
+    
+    def run_sync(self, cmd):
+        lines = self.remote_files['/jobs/job-2/.delta-basis'].splitlines()
+        out = ['BASIS %s' % t for b, t in zip(lines[::2], lines[1::2])
+               if b in self.existing]
+        return (0, '\n'.join(out), '')
+
+class FakeStager(object):
+    
+    def __init__(self, stats=None, saved=0):
+        self.transfers = []
+        self.stats = stats
+        self.saved = saved
+    
+    def stage_to(self, transfers):
+        self.transfers.extend(transfers)
+        if self.stats is not None:
+            self.stats['bytes_saved'] += self.saved * len(transfers)
+
+class DeltaTransferTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index = RemoteCopyIndex('test-platform', 
+                                     os.path.join(self.tmp_dir, 'index.json'))
+        self.files = []
+        for name in ['series.dat', 'params.xml']:
+            path = os.path.join(self.tmp_dir, name)
+            with open(path, 'w') as f:
+                f.write('0123456789')
+            self.files.append(path)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_parse_rsync_stats(self):
+        self.assertEqual(parse_rsync_stats(RSYNC_OUTPUT), (4096, 1044480))
+        self.assertEqual(parse_rsync_stats(''), (0, 0))
+    
+    def test_stage_uses_previous_copy_when_available(self):
+        self.index.set_previous_copy(self.files[0], '/jobs/job-1/series.dat')
+        self.index.set_previous_copy(self.files[1], '/jobs/job-1/params.xml')
+        stats = {'bytes_sent': 0, 'bytes_saved': 0}
+        shell = FakeShell(existing=['/jobs/job-1/series.dat'])
+        full_stager = FakeStager()
+        delta_stager = FakeStager(stats, saved=8)
+        
+        delta = DeltaStager(shell, full_stager, delta_stager, self.index, 
+                            stats)
+        paths = delta.stage(self.files, '/jobs/job-2', 'job-2')
+        
+        self.assertEqual(paths, ['/jobs/job-2/series.dat', 
+                                 '/jobs/job-2/params.xml'])
+        self.assertEqual(delta_stager.transfers, 
+                         [(self.files[0], '/jobs/job-2/series.dat')])
+        self.assertEqual(full_stager.transfers, 
+                         [(self.files[1], '/jobs/job-2/params.xml')])
+        
+        reloaded = RemoteCopyIndex('test-platform', self.index.index_file)
+        self.assertEqual(reloaded.get_previous_copy(self.files[0]),
+                         '/jobs/job-2/series.dat')
+        self.assertEqual(reloaded.get_job_stats('job-2'),
+                         {'bytes_sent': 10, 'bytes_saved': 8})
+
+class SSHCommandTestCase(unittest.TestCase):
+    
+    def test_get_ssh_command_with_port_in_host(self):
+        cmd = get_ssh_command('cluster.example.org:2222', 'hpcuser', 
+                              '/keys/id_rsa')
+        self.assertEqual(cmd[:5], ['ssh', '-i', '/keys/id_rsa', '-p', '2222'])
+        self.assertEqual(cmd[-1], 'hpcuser@cluster.example.org')
+
+if __name__ == "__main__":
+    unittest.main()
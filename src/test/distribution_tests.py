@@ -0,0 +1,131 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the job data distribution schedules and commands.
+'''
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from deployer.core.distribution import binomial_tree_schedule, \
+    get_chain_command, get_node_copy_command
+
+# A stand-in for ssh that runs the remote command locally in a directory 
+# named after the target host and records the order in which hosts are 
+# contacted.
+FAKE_SSH = '''#!/bin/sh
+while [ $# -gt 2 ]; do shift; done
+echo "$1" >> "$FAKE_SSH_ROOT/hosts"
+mkdir -p "$FAKE_SSH_ROOT/$1/jobs" && cd "$FAKE_SSH_ROOT/$1" && exec sh -c "$2"
+'''
+
+class DistributionTestCase(unittest.TestCase):
+    
+    def test_binomial_schedule(self):
+        targets = ['node%d' % i for i in range(1, 8)]
+        rounds = binomial_tree_schedule('master', targets)
+        self.assertEqual(len(rounds), 3)
+        self.assertEqual(rounds[0], [('master', 'node1')])
+        self.assertEqual(rounds[1], [('master', 'node2'), ('node1', 'node3')])
+        # Every target receives the data exactly once and only from a node 
+        # that received it in an earlier round.
+        have_data = set(['master'])
+        received = []
+        for transfers in rounds:
+            for sender, _ in transfers:
+                self.assertTrue(sender in have_data)
+            for _, receiver in transfers:
+                have_data.add(receiver)
+                received.append(receiver)
+        self.assertEqual(sorted(received), targets)
+    
+    def test_binomial_schedule_single_and_empty(self):
+        self.assertEqual(binomial_tree_schedule(None, ['a']), [[(None, 'a')]])
+        self.assertEqual(binomial_tree_schedule(None, []), [])
+    
+    def test_node_copy_command(self):
+        cmd = get_node_copy_command(None, '10.0.0.2', '/data/job1', '/data')
+        self.assertTrue(cmd.startswith('scp '))
+        self.assertTrue(cmd.endswith('/data/job1 10.0.0.2:/data/'))
+        relay_cmd = get_node_copy_command('10.0.0.3', '10.0.0.2', 
+                                          '/data/job1', '/data')
+        self.assertTrue(relay_cmd.startswith('ssh '))
+        self.assertTrue(' 10.0.0.3 ' in relay_cmd)
+    
+    def test_chain_command(self):
+        root = tempfile.mkdtemp()
+        try:
+            bin_dir = os.path.join(root, 'bin')
+            os.mkdir(bin_dir)
+            with open(os.path.join(bin_dir, 'ssh'), 'w') as f:
+                f.write(FAKE_SSH)
+            os.chmod(os.path.join(bin_dir, 'ssh'), 0o755)
+            os.makedirs(os.path.join(root, 'master', 'jobs', 'job1'))
+            with open(os.path.join(root, 'master', 'jobs', 'job1', 'in.xml'),
+                      'w') as f:
+                f.write('input data')
+            env = dict(os.environ)
+            env['PATH'] = bin_dir + os.pathsep + env['PATH']
+            env['FAKE_SSH_ROOT'] = root
+            
+            targets = ['node1', 'node2', 'node3']
+            cmd = get_chain_command(targets, 'jobs', 'job1')
+            subprocess.check_call(cmd, shell=True, env=env,
+                                  cwd=os.path.join(root, 'master'))
+            
+            with open(os.path.join(root, 'hosts')) as f:
+                self.assertEqual(f.read().split(), targets)
+            for target in targets:
+                with open(os.path.join(root, target, 'jobs', 'job1', 
+                                       'in.xml')) as f:
+                    self.assertEqual(f.read(), 'input data')
+        finally:
+            shutil.rmtree(root)
+
+if __name__ == "__main__":
+    unittest.main()
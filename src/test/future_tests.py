@@ -0,0 +1,104 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the deployment future and background operation support.
+'''
+import threading
+import unittest
+
+from deployer.core.future import DeploymentFuture, run_async, \
+    RESOURCES_REQUESTED, RESOURCES_RUNNING
+
+class DeploymentFutureTestCase(unittest.TestCase):
+    
+    def test_result_and_callbacks(self):
+        release = threading.Event()
+        states = []
+        done = []
+        future = DeploymentFuture()
+        future.add_state_callback(lambda state, info: states.append(state))
+        
+        def _start(num_nodes):
+            future.set_state(RESOURCES_REQUESTED, num_nodes)
+            release.wait(5)
+            future.set_state(RESOURCES_RUNNING, num_nodes)
+            return ['node%d' % i for i in range(num_nodes)]
+        
+        run_async(_start, 2, future=future)
+        future.add_done_callback(lambda f: done.append(f.result()))
+        self.assertFalse(future.done())
+        self.assertFalse(future.wait(0.01))
+        release.set()
+        self.assertTrue(future.wait(5))
+        self.assertEqual(future.result(5), ['node0', 'node1'])
+        self.assertTrue(future.done())
+        self.assertEqual(future.state, RESOURCES_RUNNING)
+        self.assertEqual(states, [RESOURCES_REQUESTED, RESOURCES_RUNNING])
+        self.assertEqual(done, [['node0', 'node1']])
+        
+        # Callbacks added late are called with the states reported so far
+        late_states = []
+        future.add_state_callback(lambda state, info: late_states.append(info))
+        self.assertEqual(late_states, [2, 2])
+    
+    def test_exception_is_raised_by_result(self):
+        def _fail():
+            raise ValueError('no resources')
+        future = run_async(_fail)
+        self.assertTrue(isinstance(future.exception(5), ValueError))
+        self.assertRaises(ValueError, future.result)
+    
+    def test_callback_errors_are_ignored(self):
+        future = DeploymentFuture()
+        future.add_done_callback(lambda f: 1/0)
+        future.set_result('ok')
+        self.assertEqual(future.result(), 'ok')
+    
+    def test_result_timeout(self):
+        self.assertRaises(RuntimeError, DeploymentFuture().result, 0.01)
+
+if __name__ == "__main__":
+    unittest.main()
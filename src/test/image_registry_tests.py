@@ -0,0 +1,94 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the prebaked image registry.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+
+from deployer.config.software.linux import LinuxAPTConfig
+from deployer.core.image_registry import ImageRegistry, get_image_key
+
+class ImageRegistryTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.registry_file = os.path.join(self.tmp_dir, 'images.json')
+        self.app = LinuxAPTConfig('my-app', 'myapp', 'linux', 'ubuntu')
+        self.app.software_packages = ['my-app']
+        self.mpi = LinuxAPTConfig('mpi', 'mpi', 'linux', 'ubuntu')
+        self.mpi.software_packages = ['openmpi-bin']
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_image_key(self):
+        key = get_image_key('ami-1234', [self.mpi, self.app])
+        self.assertEqual(key, get_image_key('ami-1234', [self.app, self.mpi]))
+        self.assertTrue(key.startswith('ami-1234|mpi,my-app|'))
+        self.assertNotEqual(key, get_image_key('ami-5678', [self.app, self.mpi]))
+        # Changing the configuration content changes the key
+        self.app.software_packages = ['my-app', 'my-app-tools']
+        self.assertNotEqual(key, get_image_key('ami-1234', [self.app, self.mpi]))
+    
+    def test_record_and_reload(self):
+        key = get_image_key('ami-1234', [self.app])
+        registry = ImageRegistry('test-platform', self.registry_file)
+        self.assertEqual(registry.get(key), None)
+        registry.record(key, 'ami-baked', 'ami-1234', ['my-app'])
+        registry.save()
+        
+        registry = ImageRegistry('test-platform', self.registry_file)
+        entry = registry.get(key)
+        self.assertEqual(entry['image_id'], 'ami-baked')
+        self.assertEqual(entry['software'], ['my-app'])
+        registry.remove(key)
+        self.assertEqual(registry.get(key), None)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the content-addressed input cache.
+'''
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from deployer.core.input_cache import LocalHashCache, RemoteInputStore
+
+class FakeShell(object):
+    
+    def __init__(self, stored_hashes):
+        self.stored_hashes = stored_hashes
+        self.remote_files = {}
+        self.commands = []
+    
+    def write_to_remote(self, data, path):
+        self.remote_files[path] = data
+    
+    def run_sync(self, cmd):
+        self.commands.append(cmd)
+        if '.input-cache-check' in cmd:
+            data = self.remote_files['/jobs/job-1/.input-cache-check']
+            missing = ['MISSING %s' % f for f in data.split() 
+                       if os.path.basename(f) not in self.stored_hashes]
+            return (0, '\n'.join(missing), '')
+        return (0, '', '')
+
+class FakeStager(object):
+    
+    def __init__(self):
+        self.transfers = []
+    
+    def stage_to(self, transfers):
+        self.transfers.extend(transfers)
+
+class InputCacheTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.hash_cache = LocalHashCache(os.path.join(self.tmp_dir, 
+                                                      'hashes.json'))
+        self.files = []
+        for name, content in [('a.xml', 'mesh-a'), ('b.xml', 'mesh-b'),
+                              ('c.xml', 'mesh-a')]:
+            path = os.path.join(self.tmp_dir, name)
+            with open(path, 'w') as f:
+                f.write(content)
+            self.files.append(path)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_hash_cache_persists_and_detects_changes(self):
+        h = self.hash_cache.get_hash(self.files[0])
+        self.assertEqual(h, hashlib.sha256('mesh-a').hexdigest())
+        self.hash_cache.save()
+        
+        reloaded = LocalHashCache(self.hash_cache.cache_file)
+        self.assertEqual(reloaded.get_hash(self.files[0]), h)
+        
+        with open(self.files[0], 'a') as f:
+            f.write('-appended')
+        self.assertEqual(reloaded.get_hash(self.files[0]),
+                         hashlib.sha256('mesh-a-appended').hexdigest())
+    
+    def test_stage_uploads_only_missing_blobs(self):
+        hash_a = hashlib.sha256('mesh-a').hexdigest()
+        hash_b = hashlib.sha256('mesh-b').hexdigest()
+        shell = FakeShell(stored_hashes=[hash_a])
+        stager = FakeStager()
+        store = RemoteInputStore(shell, '/jobs/.input-cache')
+        
+        paths = store.stage(self.files, '/jobs/job-1', stager, 
+                            self.hash_cache, 'job-1')
+        
+        self.assertEqual(paths, ['/jobs/job-1/a.xml', '/jobs/job-1/b.xml',
+                                 '/jobs/job-1/c.xml'])
+        self.assertEqual(stager.transfers, 
+                         [(self.files[1], '/jobs/.input-cache/%s/%s.part-job-1'
+                           % (hash_b[:2], hash_b))])
+        links = shell.remote_files['/jobs/job-1/.input-cache-links']
+        self.assertEqual(links.splitlines(), 
+                         ['%s/%s /jobs/job-1/a.xml' % (hash_a[:2], hash_a),
+                          '%s/%s /jobs/job-1/b.xml' % (hash_b[:2], hash_b),
+                          '%s/%s /jobs/job-1/c.xml' % (hash_a[:2], hash_a)])
+
+if __name__ == "__main__":
+    unittest.main()
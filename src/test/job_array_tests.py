@@ -0,0 +1,102 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for running jobs as PBS job arrays.
+'''
+import unittest
+
+from deployer.config.job import JobConfiguration
+from deployer.core.exceptions import JobError
+from deployer.core.job_array import get_array_script,\
+    get_array_submit_command, parse_qsub_output, get_subjob_id
+
+class JobArrayTestCase(unittest.TestCase):
+    
+    def _job_config(self, job_id, args):
+        jc = JobConfiguration()
+        jc.job_id = job_id
+        jc.executable = '/usr/bin/solver'
+        jc.args = args
+        jc.working_dir = '/scratch/jobs/%s' % job_id
+        jc.num_processes = 4 if job_id == 'job2' else 1
+        return jc
+    
+    def test_array_script(self):
+        script = get_array_script(
+                    [(self._job_config('job1', ['--alpha', '0.1']), []),
+                     (self._job_config('job2', ['--alpha', '0.2']), 
+                      ['/scratch/jobs/job2/in.dat'])],
+                    launcher_template='mpiexec -n $num_processes')
+        lines = script.splitlines()
+        self.assertEqual(lines[0], '#!/bin/sh')
+        self.assertTrue('case "$PBS_ARRAY_INDEX" in' in lines)
+        self.assertEqual(lines[lines.index('0)') + 2], 
+                         '    exec /usr/bin/solver --alpha 0.1')
+        self.assertEqual(lines[lines.index('1)') + 2], 
+                         '    exec mpiexec -n 4 /usr/bin/solver --alpha 0.2 '
+                         '/scratch/jobs/job2/in.dat')
+        self.assertEqual(lines[-1], 'esac')
+    
+    def test_array_submit_command(self):
+        self.assertEqual(get_array_submit_command(
+                            '/scratch/jobs/array-job1/libhpc-array.sh', 3, 
+                            ['-l', 'select=1:ncpus=4:mpiprocs=4'],
+                            output_dir='/scratch/jobs/array-job1'),
+                         'qsub -J 0-2 -S /bin/sh '
+                         '-l select=1:ncpus=4:mpiprocs=4 '
+                         '-o /scratch/jobs/array-job1 '
+                         '-e /scratch/jobs/array-job1 '
+                         '/scratch/jobs/array-job1/libhpc-array.sh')
+        self.assertRaises(JobError, get_array_submit_command, 'a.sh', 1)
+    
+    def test_array_ids(self):
+        array_id = parse_qsub_output('1234[].pbs-server\n')
+        self.assertEqual(array_id, '1234[].pbs-server')
+        self.assertEqual(get_subjob_id(array_id, 7), '1234[7].pbs-server')
+        self.assertRaises(JobError, parse_qsub_output, '1234.pbs-server')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the job state store.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+
+from deployer.config.job import JobConfiguration
+from deployer.core.job_store import JobStore, JOB_SUBMITTED, JOB_RUNNING,\
+    JOB_COMPLETED, JOB_FAILED
+from deployer.core.lifecycle import LifecycleExecutor, STAGE_STARTED,\
+    STAGE_COMPLETED, STAGE_FAILED
+
+class JobStoreTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.now = 1000.0
+        self.store = JobStore(os.path.join(self.tmp_dir, 'jobs.db'),
+                              time_func=lambda: self.now)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_add_and_update_job(self):
+        self.store.add_job('job-1', 'my-cloud', {'libhpc_jobspec': {}}, 
+                           ['my-app'], '/data/jobs/job-1')
+        record = self.store.get_job('job-1')
+        self.assertEqual(record['state'], JOB_SUBMITTED)
+        self.assertEqual(record['software_config'], ['my-app'])
+        self.assertEqual(record['deployment_state'], {})
+        self.assertEqual(record['working_dir'], '/data/jobs/job-1')
+        
+        self.now += 10
+        self.store.update_job('job-1', state=JOB_RUNNING, 
+                              remote_job_id='[ssh://10.0.0.1/]-[4242]',
+                              deployment_state={'node_ids': ['i-1', 'i-2']})
+        record = self.store.get_job('job-1')
+        self.assertEqual(record['state'], JOB_RUNNING)
+        self.assertEqual(record['deployment_state']['node_ids'], ['i-1', 'i-2'])
+        self.assertEqual(record['updated'], 1010.0)
+        self.assertRaises(KeyError, self.store.update_job, 'job-2', 
+                          state=JOB_RUNNING)
+        self.assertEqual(self.store.get_job('job-2'), None)
+        
+        self.store.add_job('job-2', 'my-cluster', {'libhpc_jobspec': {}})
+        self.assertEqual([r['job_id'] for r in self.store.list_jobs()], 
+                         ['job-1', 'job-2'])
+        self.assertEqual([r['job_id'] for r in 
+                          self.store.list_jobs([JOB_SUBMITTED])], ['job-2'])
+        self.store.remove_job('job-2')
+        self.assertEqual(len(self.store.list_jobs()), 1)
+    
+    def test_stage_states(self):
+        self.store.add_job('job-1', 'my-cloud', {'libhpc_jobspec': {}})
+        self.store.set_stage_state('job-1', 'initialise_resources', 
+                                   STAGE_STARTED)
+        self.now += 1
+        self.store.set_stage_state('job-1', 'prepare_job', STAGE_STARTED)
+        self.store.set_stage_state('job-1', 'prepare_job', STAGE_COMPLETED)
+        self.store.set_stage_state('job-1', 'initialise_resources', 
+                                   STAGE_FAILED, 'No nodes')
+        self.assertEqual(self.store.get_completed_stages('job-1'), 
+                         ['prepare_job'])
+        
+        # A stage that is run again replaces its earlier record
+        self.now += 1
+        self.store.set_stage_state('job-1', 'initialise_resources', 
+                                   STAGE_STARTED)
+        self.store.set_stage_state('job-1', 'initialise_resources', 
+                                   STAGE_COMPLETED)
+        stages = self.store.get_stages('job-1')
+        self.assertEqual([s['stage'] for s in stages], 
+                         ['prepare_job', 'initialise_resources'])
+        self.assertEqual(stages[1]['error'], None)
+        self.assertEqual(sorted(self.store.get_completed_stages('job-1')),
+                         ['initialise_resources', 'prepare_job'])
+    
+    def test_reattach_failed_collect_output(self):
+        stages = ['initialise_resources', 'prepare_job', 'prepare_resources',
+                  'deploy_software', 'transfer_files', 'run_job', 
+                  'wait_for_job']
+        self.store.add_job('job-1', 'my-cloud', {'libhpc_jobspec': {}})
+        for stage in stages:
+            self.store.set_stage_state('job-1', stage, STAGE_STARTED)
+            self.store.set_stage_state('job-1', stage, STAGE_COMPLETED)
+        self.store.set_stage_state('job-1', 'collect_output', STAGE_STARTED)
+        self.store.set_stage_state('job-1', 'collect_output', STAGE_FAILED,
+                                   'Connection lost')
+        self.store.update_job('job-1', state=JOB_FAILED, 
+                              remote_job_id='[ssh://10.0.0.1/]-[4242]',
+                              error='Connection lost')
+        
+        # The resources were kept running so only the failed stage is run
+        completed = self.store.get_resume_stages('job-1')
+        self.assertEqual(sorted(completed), sorted(stages))
+        run = []
+        lifecycle = LifecycleExecutor(stage_callback=lambda name, state, 
+                    error: self.store.set_stage_state('job-1', name, state, 
+                                                      error))
+        previous = []
+        for stage in stages + ['collect_output']:
+            lifecycle.add_stage(stage, lambda s=stage: run.append(s), 
+                                previous)
+            previous = [stage]
+        lifecycle.run(completed)
+        self.assertEqual(run, ['collect_output'])
+        self.assertTrue('collect_output' in 
+                        self.store.get_completed_stages('job-1'))
+        
+        # Once the resources have been shut down, the job can't be resumed
+        self.store.set_resources_shutdown('job-1')
+        self.assertRaises(ValueError, self.store.get_resume_stages, 'job-1')
+        self.store.update_job('job-1', state=JOB_COMPLETED)
+        self.assertRaises(ValueError, self.store.get_resume_stages, 'job-1')
+        
+        # A job that failed before it was started can't be resumed
+        self.store.add_job('job-2', 'my-cloud', {'libhpc_jobspec': {}})
+        self.store.update_job('job-2', state=JOB_FAILED, error='No nodes')
+        self.assertRaises(ValueError, self.store.get_resume_stages, 'job-2')
+    
+    def test_job_config_round_trip(self):
+        jc = JobConfiguration()
+        jc.executable = '/usr/bin/solver'
+        jc.args = ['-v']
+        jc.num_processes = 8
+        jc.output_file_destination = '/tmp/output'
+        jc.memory_per_process = 512
+        
+        self.store.add_job(jc.job_id, 'my-cloud', jc.to_dict())
+        restored = JobConfiguration.from_dict(
+                                self.store.get_job(jc.job_id)['job_spec'])
+        self.assertEqual(restored.job_id, jc.job_id)
+        self.assertEqual(restored.args, ['-v'])
+        self.assertEqual(restored.num_processes, 8)
+        self.assertEqual(restored.memory_per_process, 512)
+        self.assertEqual(restored.output_file_destination, '/tmp/output')
+
+if __name__ == "__main__":
+    unittest.main()
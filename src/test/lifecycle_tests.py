@@ -0,0 +1,203 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the dependency-aware lifecycle executor.
+'''
+import threading
+import time
+import unittest
+
+from deployer.core.lifecycle import LifecycleExecutor, RetryPolicy, \
+    STAGE_STARTED, STAGE_COMPLETED, STAGE_FAILED, STAGE_RETRYING
+
+class LifecycleExecutorTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.events = []
+    
+    def _stage(self, name, duration=0.0, error=None):
+        def _run():
+            with self.lock:
+                self.events.append(('start', name))
+            time.sleep(duration)
+            if error:
+                raise error
+            with self.lock:
+                self.events.append(('end', name))
+        return _run
+    
+    def test_independent_stages_overlap(self):
+        lifecycle = LifecycleExecutor()
+        lifecycle.add_stage('init', self._stage('init'))
+        lifecycle.add_stage('deploy', self._stage('deploy', 0.2), ['init'])
+        lifecycle.add_stage('transfer', self._stage('transfer', 0.05), 
+                            ['init'])
+        lifecycle.add_stage('run', self._stage('run'), 
+                            ['deploy', 'transfer'])
+        lifecycle.run()
+        
+        order = self.events
+        # transfer starts before deploy has finished and run starts last
+        self.assertTrue(order.index(('start', 'transfer')) < 
+                        order.index(('end', 'deploy')))
+        self.assertEqual(order[-2], ('start', 'run'))
+        self.assertEqual([s.name for s in lifecycle.critical_path()],
+                         ['init', 'deploy', 'run'])
+        self.assertTrue('Critical path: init -> deploy -> run' in 
+                        lifecycle.get_timing_report())
+    
+    def test_failure_stops_dependent_stages(self):
+        lifecycle = LifecycleExecutor()
+        lifecycle.add_stage('init', self._stage('init'))
+        lifecycle.add_stage('deploy', self._stage('deploy', 0.01, 
+                                                  KeyError('no package')),
+                            ['init'])
+        lifecycle.add_stage('transfer', self._stage('transfer', 0.1), ['init'])
+        lifecycle.add_stage('run', self._stage('run'), ['deploy', 'transfer'])
+        self.assertRaises(KeyError, lifecycle.run)
+        # The running transfer stage was allowed to finish
+        self.assertTrue(('end', 'transfer') in self.events)
+        self.assertFalse(('start', 'run') in self.events)
+        self.assertTrue('run' in lifecycle.get_timing_report())
+    
+    def test_invalid_dependencies(self):
+        lifecycle = LifecycleExecutor()
+        lifecycle.add_stage('a', self._stage('a'), ['missing'])
+        self.assertRaises(ValueError, lifecycle.run)
+        
+        lifecycle = LifecycleExecutor()
+        lifecycle.add_stage('a', self._stage('a'), ['b'])
+        lifecycle.add_stage('b', self._stage('b'), ['a'])
+        self.assertRaises(ValueError, lifecycle.run)
+        self.assertRaises(ValueError, lifecycle.add_stage, 'a', None)
+    
+    def test_completed_stages_skipped(self):
+        notifications = []
+        lifecycle = LifecycleExecutor(stage_callback=lambda name, state, 
+                                      error: notifications.append(
+                                                        (name, state, error)))
+        lifecycle.add_stage('init', self._stage('init'))
+        lifecycle.add_stage('deploy', self._stage('deploy'), ['init'])
+        lifecycle.add_stage('run', self._stage('run', 0.0, 
+                                               ValueError('no job')), 
+                            ['deploy'])
+        self.assertRaises(ValueError, lifecycle.run, ['init'])
+        self.assertFalse(('start', 'init') in self.events)
+        self.assertEqual(notifications, 
+                         [('deploy', STAGE_STARTED, None), 
+                          ('deploy', STAGE_COMPLETED, None),
+                          ('run', STAGE_STARTED, None), 
+                          ('run', STAGE_FAILED, 'no job')])
+        self.assertTrue('completed earlier' in lifecycle.get_timing_report())
+    
+    def _flaky_stage(self, name, failures):
+        attempts = []
+        def _run():
+            attempts.append(name)
+            if len(attempts) <= failures:
+                raise IOError('connection reset')
+            self.events.append(('end', name))
+        return _run
+    
+    def test_failed_stage_retried(self):
+        sleeps = []
+        notifications = []
+        policy = RetryPolicy(retries=3, delay=10, max_delay=15, budget=100,
+                             time_func=lambda: sum(sleeps))
+        lifecycle = LifecycleExecutor(stage_callback=lambda name, state, 
+                                      error: notifications.append(
+                                                        (name, state, error)),
+                                      retry_policy=policy, 
+                                      sleep_func=sleeps.append)
+        lifecycle.add_stage('init', self._stage('init'))
+        lifecycle.add_stage('transfer', self._flaky_stage('transfer', 2), 
+                            ['init'], retry=True)
+        lifecycle.run()
+        self.assertTrue(('end', 'transfer') in self.events)
+        self.assertEqual(sleeps, [10, 15])
+        self.assertEqual(lifecycle.stages['transfer'].attempts, 3)
+        self.assertEqual([n for n in notifications if n[0] == 'transfer'],
+                         [('transfer', STAGE_STARTED, None),
+                          ('transfer', STAGE_RETRYING, 'connection reset'),
+                          ('transfer', STAGE_RETRYING, 'connection reset'),
+                          ('transfer', STAGE_COMPLETED, None)])
+        self.assertTrue('3 attempts' in lifecycle.get_timing_report())
+    
+    def test_retries_limited_by_budget(self):
+        sleeps = []
+        policy = RetryPolicy(retries=10, delay=10, max_delay=300, budget=60,
+                             time_func=lambda: sum(sleeps))
+        lifecycle = LifecycleExecutor(retry_policy=policy, 
+                                      sleep_func=sleeps.append)
+        lifecycle.add_stage('transfer', self._flaky_stage('transfer', 10), 
+                            retry=True)
+        self.assertRaises(IOError, lifecycle.run)
+        # 10 + 20 seconds fits within the budget, a further 40 doesn't
+        self.assertEqual(sleeps, [10, 20])
+        self.assertEqual(lifecycle.stages['transfer'].attempts, 3)
+        
+        sleeps = []
+        policy = RetryPolicy(retries=1, delay=1, budget=60, 
+                             time_func=lambda: sum(sleeps))
+        lifecycle = LifecycleExecutor(retry_policy=policy, 
+                                      sleep_func=sleeps.append)
+        lifecycle.add_stage('transfer', self._flaky_stage('transfer', 10), 
+                            retry=True)
+        self.assertRaises(IOError, lifecycle.run)
+        self.assertEqual(sleeps, [1])
+    
+    def test_stage_without_retry_fails(self):
+        sleeps = []
+        lifecycle = LifecycleExecutor(retry_policy=RetryPolicy(retries=3),
+                                      sleep_func=sleeps.append)
+        lifecycle.add_stage('init', self._flaky_stage('init', 1))
+        self.assertRaises(IOError, lifecycle.run)
+        self.assertEqual(sleeps, [])
+        self.assertEqual(lifecycle.stages['init'].attempts, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the cloud platform metadata cache.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+
+from deployer.core.metadata_cache import MetadataCache, size_to_dict
+
+class FakeSize(object):
+    
+    def __init__(self, size_id, extra):
+        self.id = size_id
+        self.name = size_id
+        self.ram = 1024
+        self.disk = 10
+        self.bandwidth = None
+        self.price = 0.1
+        self.extra = extra
+
+class MetadataCacheTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.tmp_dir, 'metadata.json')
+        self.now = 1000.0
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def _get_cache(self, ttl=60):
+        return MetadataCache('test-platform', ttl, self.cache_file,
+                             time_func=lambda: self.now)
+    
+    def test_size_to_dict(self):
+        self.assertEqual(size_to_dict(FakeSize('m1.small', {'cpu': 2}))
+                         ['cores'], 2)
+        self.assertEqual(size_to_dict(FakeSize('m1.small', {}))['cores'], 
+                         None)
+    
+    def test_cached_metadata_reloaded(self):
+        cache = self._get_cache()
+        self.assertEqual(cache.get_image('ami-1234'), None)
+        self.assertEqual(cache.get_sizes(), None)
+        cache.set_images([{'id': 'ami-1234', 'name': 'ubuntu'}])
+        cache.set_sizes([size_to_dict(FakeSize('m1.small', {'cpu': 1}))])
+        
+        cache = self._get_cache()
+        self.assertEqual(cache.get_image('ami-1234')['name'], 'ubuntu')
+        self.assertEqual([s['id'] for s in cache.get_sizes()], ['m1.small'])
+    
+    def test_entries_expire(self):
+        cache = self._get_cache()
+        cache.set_images([{'id': 'ami-1234', 'name': 'ubuntu'}])
+        self.now += 30
+        cache.set_sizes([])
+        self.now += 40
+        self.assertEqual(cache.get_image('ami-1234'), None)
+        self.assertEqual(cache.get_sizes(), [])
+    
+    def test_invalidate(self):
+        cache = self._get_cache()
+        cache.set_sizes([])
+        cache.invalidate()
+        self.assertEqual(cache.get_sizes(), None)
+        self.assertFalse(os.path.exists(self.cache_file))
+    
+    def test_zero_ttl_disables_cache(self):
+        cache = self._get_cache(ttl=0)
+        cache.set_images([{'id': 'ami-1234', 'name': 'ubuntu'}])
+        self.assertEqual(cache.get_image('ami-1234'), None)
+        self.assertFalse(os.path.exists(self.cache_file))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,235 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the job monitor.
+'''
+import unittest
+
+from deployer.core.exceptions import JobError
+from deployer.core.monitor import JobMonitor, get_native_job_id,\
+    parse_qstat_output, poll_pbs_jobs, poll_processes, await_completion,\
+    JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_FAILED
+
+QSTAT_OUTPUT = '''Job Id: 101.pbs-server
+    Job_Name = job1
+    job_state = R
+    queue = workq
+
+Job Id: 102.pbs-server
+    Job_Name = job2
+    job_state = F
+    Exit_status = 0
+
+Job Id: 103.pbs-server
+    job_state = F
+    Exit_status = 271
+'''
+
+QSTAT_ARRAY_OUTPUT = '''Job Id: 200[].pbs-server
+    job_state = B
+    array = True
+
+Job Id: 200[0].pbs-server
+    job_state = X
+    Exit_status = 0
+
+Job Id: 200[1].pbs-server
+    job_state = X
+    Exit_status = 2
+
+Job Id: 200[2].pbs-server
+    job_state = R
+
+Job Id: 101.pbs-server
+    job_state = R
+'''
+
+class JobPollingTestCase(unittest.TestCase):
+    
+    def test_get_native_job_id(self):
+        self.assertEqual(get_native_job_id('[pbs+ssh://host/]-[101.server]'), 
+                         '101.server')
+        self.assertEqual(get_native_job_id('[ssh://user@10.0.0.1/]-[4242]'),
+                         '4242')
+        self.assertEqual(get_native_job_id('4242'), '4242')
+    
+    def test_parse_qstat_output(self):
+        states = parse_qstat_output(QSTAT_OUTPUT)
+        self.assertEqual(states, {'101.pbs-server': (JOB_RUNNING, None),
+                                  '102.pbs-server': (JOB_DONE, 0),
+                                  '103.pbs-server': (JOB_FAILED, 271)})
+    
+    def test_poll_pbs_jobs(self):
+        commands = []
+        def _run(command):
+            commands.append(command)
+            return (153, QSTAT_OUTPUT, 'qstat: Unknown Job Id 104')
+        states = poll_pbs_jobs(_run, ['101', '102.pbs-server', '104'])
+        self.assertEqual(commands, ['qstat -x -f 101 102.pbs-server 104'])
+        self.assertEqual(states, {'101': (JOB_RUNNING, None), 
+                                  '102.pbs-server': (JOB_DONE, 0)})
+        self.assertRaises(JobError, poll_pbs_jobs, 
+                          lambda c: (255, '', 'Connection refused'), ['101'])
+    
+    def test_poll_pbs_array_subjobs(self):
+        commands = []
+        def _run(command):
+            commands.append(command)
+            return (0, QSTAT_ARRAY_OUTPUT, '')
+        states = poll_pbs_jobs(_run, ['200[0].pbs-server', '200[1].pbs-server',
+                                      '200[2].pbs-server', '101'])
+        # The sub-jobs are queried through their array
+        self.assertEqual(commands, ["qstat -x -f -t '200[].pbs-server' 101"])
+        self.assertEqual(states, {'200[0].pbs-server': (JOB_DONE, 0),
+                                  '200[1].pbs-server': (JOB_FAILED, 2),
+                                  '200[2].pbs-server': (JOB_RUNNING, None),
+                                  '101': (JOB_RUNNING, None)})
+    
+    def test_poll_processes(self):
+        commands = []
+        def _run(command):
+            commands.append(command)
+            return (0, '  4242\n', '')
+        states = poll_processes(_run, ['4242', '4243'])
+        self.assertEqual(commands, ['ps -o pid= -p 4242,4243'])
+        self.assertEqual(states, {'4242': (JOB_RUNNING, None),
+                                  '4243': (JOB_DONE, None)})
+        self.assertEqual(poll_processes(lambda c: (1, '', ''), ['4242']),
+                         {'4242': (JOB_DONE, None)})
+
+class JobMonitorTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.monitor = JobMonitor(max_poll_failures=2)
+        self.polls = []
+        self.states = {}
+    
+    def _poll(self, job_ids):
+        self.polls.append(job_ids)
+        return dict([(j, self.states[j]) for j in job_ids 
+                     if j in self.states])
+    
+    def test_jobs_polled_in_groups(self):
+        changes = []
+        f1 = self.monitor.watch('host1', 'j1', self._poll, 
+                                lambda state, info: changes.append(state))
+        f2 = self.monitor.watch('host1', 'j2', self._poll)
+        f3 = self.monitor.watch('host2', 'j3', self._poll)
+        
+        self.states = {'j1': (JOB_PENDING, None), 'j2': (JOB_RUNNING, None)}
+        self.assertEqual(self.monitor.poll(), 3)
+        self.assertEqual(sorted(self.polls), [['j1', 'j2'], ['j3']])
+        self.assertEqual(f2.state, JOB_RUNNING)
+        
+        self.states = {'j1': (JOB_RUNNING, None), 'j2': (JOB_FAILED, 1),
+                       'j3': (JOB_DONE, 0)}
+        self.assertEqual(self.monitor.poll(), 1)
+        self.assertTrue(f2.done() and f3.done())
+        self.assertEqual(await_completion([f2, f3]), 
+                         [(JOB_FAILED, 1), (JOB_DONE, 0)])
+        
+        self.states['j1'] = (JOB_DONE, 0)
+        self.polls = []
+        self.assertEqual(self.monitor.poll(), 0)
+        self.assertEqual(self.polls, [['j1']])
+        self.assertEqual(f1.result(), (JOB_DONE, 0))
+        self.assertEqual(changes, [JOB_PENDING, JOB_RUNNING, JOB_DONE])
+    
+    def test_poll_failures(self):
+        def _fail(job_ids):
+            raise JobError('Connection lost')
+        future = self.monitor.watch('host1', 'j1', _fail)
+        self.monitor.poll()
+        self.assertFalse(future.done())
+        self.monitor.poll()
+        self.assertTrue(isinstance(future.exception(), JobError))
+        self.assertEqual(self.monitor.get_watched_count(), 0)
+    
+    def test_exit_code_of_polled_process(self):
+        # ps can't report the exit codes of processes that have finished
+        running = ['4242', '4243']
+        def _run(command):
+            return (0, '\n'.join(running), '')
+        poll_func = lambda pids: poll_processes(_run, pids)
+        def _exit_code_error():
+            raise JobError('Connection lost')
+        f1 = self.monitor.watch('host1', '4242', poll_func, 
+                                exit_code_func=lambda: 0)
+        f2 = self.monitor.watch('host1', '4243', poll_func, 
+                                exit_code_func=_exit_code_error)
+        self.assertEqual(self.monitor.poll(), 2)
+        running = []
+        self.assertEqual(self.monitor.poll(), 0)
+        self.assertEqual(f1.result(), (JOB_DONE, 0))
+        self.assertEqual(f2.result(), (JOB_DONE, None))
+    
+    def test_group_removed_during_poll(self):
+        # Another thread finishes with the group's only job while its poll 
+        # is running.
+        def _poll_removed(job_ids):
+            self.monitor._unwatch('host1', 'j1')
+            return {'j1': (JOB_RUNNING, None)}
+        def _fail_removed(job_ids):
+            self.monitor._unwatch('host2', 'j2')
+            raise JobError('Connection lost')
+        f1 = self.monitor.watch('host1', 'j1', _poll_removed)
+        f2 = self.monitor.watch('host2', 'j2', _fail_removed)
+        self.assertEqual(self.monitor.poll(), 0)
+        self.assertEqual(f1.state, JOB_RUNNING)
+        self.assertFalse(f2.done())
+    
+    def test_background_polling(self):
+        self.monitor.poll_interval = 0.01
+        self.states = {'j1': (JOB_DONE, 0)}
+        future = self.monitor.watch('host1', 'j1', self._poll)
+        self.monitor.start()
+        try:
+            self.assertEqual(future.result(5), (JOB_DONE, 0))
+        finally:
+            self.monitor.stop()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the warm node pool.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+
+from deployer.core.node_pool import NodePool, NODE_IDLE, NODE_LEASED
+
+class NodePoolTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.tmp_dir, 'pool.json')
+        self.now = 1000.0
+        self.pool = self._get_pool()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def _get_pool(self, max_size=3):
+        return NodePool('test-platform', max_size, idle_timeout=600, 
+                        state_file=self.state_file, 
+                        time_func=lambda: self.now)
+    
+    def test_lease_requires_enough_nodes(self):
+        self.pool.release(['n1'], 'm1.small', 'ami-1234')
+        self.assertEqual(self.pool.lease('m1.small', 'ami-1234', 2, 'job1'),
+                         ([], []))
+        self.assertEqual(self.pool.get_nodes()['n1']['state'], NODE_IDLE)
+        
+        self.pool.release(['n2'], 'm1.small', 'ami-1234')
+        leased, evicted = self.pool.lease('m1.small', 'ami-1234', 2, 'job1')
+        self.assertEqual(sorted(leased), ['n1', 'n2'])
+        self.assertEqual(evicted, [])
+        nodes = self.pool.get_nodes()
+        self.assertEqual(nodes['n1']['state'], NODE_LEASED)
+        self.assertEqual(nodes['n1']['job_id'], 'job1')
+        # Leased nodes can't be leased again
+        self.assertEqual(self.pool.lease('m1.small', 'ami-1234', 1, 'job2'),
+                         ([], []))
+    
+    def test_lease_matches_type_and_config(self):
+        self.pool.release(['n1'], 'm1.small', 'ami-1234')
+        self.pool.release(['n2'], 'm1.large', 'ami-1234')
+        self.assertEqual(self.pool.lease('m1.small', 'ami-5678', 1, 'job1'),
+                         ([], []))
+        self.assertEqual(self.pool.lease('m1.large', 'ami-1234', 1, 'job1'),
+                         (['n2'], []))
+    
+    def test_release_rejects_nodes_when_full(self):
+        rejected, _ = self.pool.release(['n1', 'n2', 'n3', 'n4'], 'm1.small',
+                                        'ami-1234')
+        self.assertEqual(rejected, ['n4'])
+        # Returning leased nodes doesn't count against the pool size
+        self.pool.lease('m1.small', 'ami-1234', 3, 'job1')
+        rejected, _ = self.pool.release(['n1', 'n2', 'n3'], 'm1.small', 
+                                        'ami-1234')
+        self.assertEqual(rejected, [])
+    
+    def test_idle_nodes_evicted(self):
+        self.pool.release(['n1'], 'm1.small', 'ami-1234')
+        self.now += 300
+        self.pool.release(['n2'], 'm1.small', 'ami-1234')
+        self.now += 400
+        leased, evicted = self.pool.lease('m1.small', 'ami-1234', 1, 'job1')
+        self.assertEqual(leased, ['n2'])
+        self.assertEqual(evicted, ['n1'])
+        self.assertEqual(sorted(self._get_pool().get_nodes().keys()), ['n2'])
+    
+    def test_remove(self):
+        self.pool.release(['n1', 'n2'], 'm1.small', 'ami-1234')
+        self.pool.remove(['n1', 'n3'])
+        self.assertEqual(sorted(self.pool.get_nodes().keys()), ['n2'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the output archive command generation.
+'''
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import unittest
+
+from deployer.core.exceptions import JobConfigurationError
+from deployer.core.output import get_output_archive_command, parse_size
+
+class OutputArchiveCommandTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.work_dir, 'fields'))
+        for name, size in [('std.out', 10), ('mesh.xml', 10), 
+                           ('result.fld', 10), ('checkpoint.chk', 5000),
+                           ('fields/u_1.fld', 10), ('scratch.tmp', 10)]:
+            with open(os.path.join(self.work_dir, name), 'w') as f:
+                f.write('x' * size)
+    
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+    
+    def _archive(self, **kwargs):
+        cmd = get_output_archive_command('out.tar.gz', **kwargs)
+        subprocess.check_call(cmd, shell=True, cwd=self.work_dir)
+        tar = tarfile.open(os.path.join(self.work_dir, 'out.tar.gz'))
+        names = sorted([n[2:] if n.startswith('./') else n 
+                        for n in tar.getnames()])
+        tar.close()
+        return names
+    
+    def test_parse_size(self):
+        self.assertEqual(parse_size(1024), 1024)
+        self.assertEqual(parse_size('500M'), 500*1024*1024)
+        self.assertEqual(parse_size('2gb'), 2*1024**3)
+        self.assertRaises(JobConfigurationError, parse_size, 'lots')
+    
+    def test_default_command_archives_everything(self):
+        self.assertEqual(get_output_archive_command('-'), 'tar -czf - *')
+    
+    def test_include_patterns(self):
+        names = self._archive(include=['*.fld', 'std.out'])
+        self.assertEqual(names, ['fields/u_1.fld', 'result.fld', 'std.out'])
+    
+    def test_exclude_patterns_and_max_size(self):
+        names = self._archive(exclude=['*.tmp', 'mesh.xml'], 
+                              max_file_size='1K')
+        self.assertEqual(names, ['fields/u_1.fld', 'result.fld', 'std.out'])
+    
+    def test_path_pattern(self):
+        names = self._archive(include='fields/*')
+        self.assertEqual(names, ['fields/u_1.fld'])
+
+if __name__ == "__main__":
+    unittest.main()
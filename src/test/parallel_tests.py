@@ -0,0 +1,107 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the bounded parallel task runner.
+'''
+import threading
+import time
+import unittest
+
+from deployer.core.connections import ConnectionManager
+from deployer.core.parallel import run_parallel
+
+class RunParallelTestCase(unittest.TestCase):
+    
+    def test_results_in_item_order(self):
+        def _square(item):
+            time.sleep(0.01 * (5 - item))
+            return item * item
+        results = run_parallel(_square, range(5), 3)
+        self.assertEqual([r.result for r in results], [0, 1, 4, 9, 16])
+        self.assertTrue(all([r.succeeded for r in results]))
+        self.assertTrue(all([r.elapsed > 0 for r in results]))
+    
+    def test_errors_are_recorded_per_item(self):
+        def _check(item):
+            if item % 2:
+                raise ValueError('odd item %s' % item)
+            return item
+        results = run_parallel(_check, range(4), 2)
+        self.assertEqual([r.succeeded for r in results], 
+                         [True, False, True, False])
+        self.assertTrue(isinstance(results[1].error, ValueError))
+    
+    def test_one_connection_per_worker(self):
+        lock = threading.Lock()
+        connections = []
+        def _factory():
+            with lock:
+                connections.append(object())
+                return connections[-1]
+        results = run_parallel(lambda conn, item: conn, range(10), 2, _factory)
+        self.assertTrue(len(connections) <= 2)
+        self.assertTrue(set([r.result for r in results]) <= set(connections))
+    
+    def test_connection_discarded_after_error(self):
+        manager = ConnectionManager(lambda host, user_id, session: object())
+        def _check(conn, item):
+            if item == 2:
+                raise ValueError('Transfer of item %s failed' % item)
+            return conn.connection
+        results = run_parallel(_check, range(5), 1, 
+                               manager.factory('10.0.0.1'))
+        self.assertEqual([r.succeeded for r in results], 
+                         [True, True, False, True, True])
+        # The connection that raised is closed and a new one is opened
+        self.assertEqual(manager.opened, 2)
+        self.assertFalse(results[0].result is results[3].result)
+        self.assertEqual(manager.get_counts('10.0.0.1'), (0, 1))
+    
+    def test_no_items(self):
+        self.assertEqual(run_parallel(lambda item: item, [], 4), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for mapping job resource requirements to PBS resource requests.
+'''
+import unittest
+
+from deployer.config.job import JobConfiguration
+from deployer.core.pbs_resources import get_select_statement,\
+    get_place_statement, select_queue, check_queue_rules,\
+    get_resource_options, get_launcher, get_job_commands, get_job_script
+
+QUEUE_RULES = [{'name': 'debug', 'max_processes': 8, 
+                'max_time_limit_mins': 30},
+               {'name': 'large', 'min_processes': 256},
+               {'name': 'highmem', 'max_memory_per_process': 16000,
+                'min_processes': 1}]
+
+class PBSResourcesTestCase(unittest.TestCase):
+    
+    def _job_config(self, num_processes, processes_per_node=1, **kwargs):
+        jc = JobConfiguration()
+        jc.executable = '/usr/bin/solver'
+        jc.args = ['--mesh', 'fine grid']
+        jc.num_processes = num_processes
+        jc.processes_per_node = processes_per_node
+        for name, value in kwargs.items():
+            setattr(jc, name, value)
+        return jc
+    
+    def test_select_statement(self):
+        self.assertEqual(get_select_statement(64, 16), 
+                         'select=4:ncpus=16:mpiprocs=16')
+        # The remaining processes are placed in a smaller chunk
+        self.assertEqual(get_select_statement(20, 8, memory_per_process=1000), 
+                         'select=2:ncpus=8:mpiprocs=8:mem=8000mb'
+                         '+1:ncpus=4:mpiprocs=4:mem=4000mb')
+        self.assertEqual(get_select_statement(2, 16), 
+                         'select=1:ncpus=2:mpiprocs=2')
+        self.assertEqual(get_select_statement(1), 'select=1:ncpus=1:mpiprocs=1')
+    
+    def test_place_statement(self):
+        self.assertEqual(get_place_statement('scatter:excl'), 
+                         'place=scatter:excl')
+        self.assertRaises(ValueError, get_place_statement, 'spread')
+    
+    def test_queue_rules(self):
+        self.assertEqual(select_queue(QUEUE_RULES, 4, 20), 'debug')
+        # A rule with a time limit needs the job's time limit
+        self.assertEqual(select_queue(QUEUE_RULES, 4, None, 
+                                      default_queue='workq'), 'workq')
+        self.assertEqual(select_queue(QUEUE_RULES, 512, 600), 'large')
+        self.assertEqual(select_queue(QUEUE_RULES, 64, 600, 12000), 'highmem')
+        self.assertEqual(select_queue(QUEUE_RULES, 64, 600), None)
+        check_queue_rules(QUEUE_RULES)
+        self.assertRaises(ValueError, check_queue_rules, [{'max_processes': 8}])
+        self.assertRaises(ValueError, check_queue_rules, 
+                          [{'name': 'q', 'max_procs': 8}])
+        self.assertRaises(ValueError, check_queue_rules, {'name': 'q'})
+    
+    def test_resource_options(self):
+        jc = self._job_config(32, 16, time_limit_mins=125, 
+                              memory_per_process=2000)
+        self.assertEqual(get_resource_options(jc, QUEUE_RULES, 'workq', 
+                                              'scatter:excl'),
+                         ['-q', 'highmem', 
+                          '-l', 'select=2:ncpus=16:mpiprocs=16:mem=32000mb',
+                          '-l', 'place=scatter:excl', 
+                          '-l', 'walltime=02:05:00'])
+        # The job's queue and placement override the platform's
+        jc.queue = 'express'
+        jc.node_placement = 'pack'
+        self.assertEqual(get_resource_options(jc, QUEUE_RULES, 'workq', 
+                                              'scatter:excl')[:2], 
+                         ['-q', 'express'])
+        self.assertTrue('place=pack' in 
+                        get_resource_options(jc, default_placement='scatter'))
+    
+    def test_launcher(self):
+        template = 'mpiexec -n $num_processes -ppn $processes_per_node'
+        self.assertEqual(get_launcher(template, self._job_config(20, 8)),
+                         'mpiexec -n 20 -ppn 8')
+        self.assertEqual(get_launcher('mpirun -np ${num_processes} '
+                                      '--nodes $num_nodes', 
+                                      self._job_config(20, 8)),
+                         'mpirun -np 20 --nodes 3')
+        # Single process jobs aren't started by the launcher
+        self.assertEqual(get_launcher(template, self._job_config(1)), None)
+        self.assertEqual(get_launcher(None, self._job_config(20, 8)), None)
+    
+    def test_job_script(self):
+        jc = self._job_config(16, 8, working_dir='/scratch/jobs/job1', 
+                              stdout='out.txt')
+        jc.environment = {'OMP_NUM_THREADS': 4}
+        self.assertEqual(get_job_commands(jc, ['/scratch/in.dat'], 
+                                          'mpiexec -n 16'),
+                         ['cd /scratch/jobs/job1 || exit 1',
+                          'export OMP_NUM_THREADS=4',
+                          "exec mpiexec -n 16 /usr/bin/solver --mesh "
+                          "'fine grid' /scratch/in.dat > out.txt"])
+        # The job configuration's arguments are unchanged
+        self.assertEqual(jc.args, ['--mesh', 'fine grid'])
+        
+        script = get_job_script(jc, [], 'mpiexec -n $num_processes')
+        self.assertTrue(script.startswith('#!/bin/sh\n'))
+        self.assertTrue("exec mpiexec -n 16 /usr/bin/solver --mesh "
+                        "'fine grid' > out.txt\n" in script)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the placement planner.
+'''
+import unittest
+
+from deployer.core.placement import get_machinefile, get_node_slots,\
+    plan_placement
+
+def _size(size_id, cores, ram, price):
+    return {'id': size_id, 'name': size_id, 'ram': ram, 'disk': 10, 
+            'bandwidth': None, 'price': price, 'cores': cores}
+
+class PlacementTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.sizes = [_size('small', 2, 4096, 0.1),
+                      _size('large', 8, 16384, 0.5),
+                      _size('xlarge', 16, 32768, 0.9),
+                      _size('unknown', None, 8192, 0.2)]
+    
+    def test_node_slots(self):
+        self.assertEqual(get_node_slots(10, 3), [4, 3, 3])
+        self.assertEqual(get_node_slots(8, 2), [4, 4])
+    
+    def test_plan_by_cost(self):
+        plan = plan_placement(16, self.sizes, ['large', 'xlarge'])
+        self.assertEqual(plan.node_type, 'xlarge')
+        self.assertEqual(plan.slots, [16])
+        plan = plan_placement(10, self.sizes, ['small', 'large'])
+        self.assertEqual(plan.node_type, 'small')
+        self.assertEqual(plan.num_nodes, 5)
+        self.assertEqual(plan.processes_per_node, 2)
+    
+    def test_plan_by_throughput(self):
+        plan = plan_placement(10, self.sizes, ['small', 'large'], 
+                              'throughput')
+        self.assertEqual(plan.node_type, 'large')
+        self.assertEqual(plan.slots, [5, 5])
+    
+    def test_memory_per_process(self):
+        plan = plan_placement(8, self.sizes, ['large'], 
+                              memory_per_process=4096)
+        self.assertEqual(plan.slots, [4, 4])
+        self.assertRaises(ValueError, plan_placement, 8, self.sizes, 
+                          ['small'], memory_per_process=8192)
+    
+    def test_unknown_cores(self):
+        self.assertRaises(ValueError, plan_placement, 4, self.sizes, 
+                          ['unknown'])
+        plan = plan_placement(4, self.sizes, ['unknown'], default_cores=4)
+        self.assertEqual(plan.slots, [4])
+    
+    def test_invalid_objective(self):
+        self.assertRaises(ValueError, plan_placement, 4, self.sizes, 
+                          objective='fastest')
+    
+    def test_machinefile(self):
+        self.assertEqual(get_machinefile(['10.0.0.1', '10.0.0.2'], [4, 3]),
+                         '# Machine file for MPI job runs\n'
+                         '10.0.0.1 slots=4 max_slots=4\n'
+                         '10.0.0.2 slots=3 max_slots=3\n')
+
+if __name__ == "__main__":
+    unittest.main()
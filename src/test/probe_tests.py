@@ -0,0 +1,152 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the concurrent node readiness prober.
+'''
+import socket
+import threading
+import unittest
+
+from deployer.core.probe import NodeProber, check_ssh_banner, \
+    get_backoff_delay
+
+class FakeClock(object):
+    
+    def __init__(self):
+        self.now = 0.0
+        self.lock = threading.Lock()
+    
+    def time(self):
+        return self.now
+    
+    def sleep(self, delay):
+        with self.lock:
+            self.now += delay
+
+class NodeProberTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        self.attempts = {}
+        self.lock = threading.Lock()
+    
+    def _prober(self, check, **kwargs):
+        kwargs.setdefault('jitter', 0)
+        return NodeProber(check, initial_delay=1, max_delay=8, backoff=2,
+                          sleep_func=self.clock.sleep, 
+                          time_func=self.clock.time, **kwargs)
+    
+    def _check_after(self, ready_after):
+        # Node becomes accessible on the given attempt number
+        def _check(node):
+            with self.lock:
+                self.attempts[node] = self.attempts.get(node, 0) + 1
+                return self.attempts[node] >= ready_after[node]
+        return _check
+    
+    def test_backoff_delay(self):
+        delays = [get_backoff_delay(a, 1, 8, 2, 0) for a in range(1, 7)]
+        self.assertEqual(delays, [1, 2, 4, 8, 8, 8])
+        self.assertEqual(get_backoff_delay(3, 1, 8, 2, 0.5, lambda: 1.0), 2)
+    
+    def test_all_nodes_accessible(self):
+        ready_after = {'a': 1, 'b': 3, 'c': 2}
+        prober = self._prober(self._check_after(ready_after), deadline=100)
+        self.assertEqual(prober.probe(['a', 'b', 'c']), [])
+        self.assertEqual(self.attempts, ready_after)
+    
+    def test_deadline_and_max_attempts(self):
+        ready_after = {'a': 1, 'b': 100}
+        prober = self._prober(self._check_after(ready_after), deadline=10)
+        self.assertEqual(prober.probe(['a', 'b']), ['b'])
+        self.assertTrue(self.clock.now <= 10)
+        
+        self.attempts = {}
+        prober = self._prober(self._check_after(ready_after), deadline=1000,
+                              max_attempts=3)
+        self.assertEqual(prober.probe(['a', 'b']), ['b'])
+        self.assertEqual(self.attempts['b'], 3)
+    
+    def test_pre_check_and_errors(self):
+        def _pre_check(node):
+            return node != 'down'
+        def _check(node):
+            if node == 'broken':
+                raise IOError('connection reset')
+            return True
+        prober = self._prober(_check, pre_check=_pre_check, max_attempts=2)
+        self.assertEqual(prober.probe(['up', 'down', 'broken']), 
+                         ['down', 'broken'])
+    
+    def test_fatal_error_is_raised(self):
+        def _check(node):
+            raise KeyError(node)
+        prober = self._prober(_check, fatal_errors=(KeyError,))
+        self.assertRaises(KeyError, prober.probe, ['a'])
+
+class SSHBannerTestCase(unittest.TestCase):
+    
+    def test_check_ssh_banner(self):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        port = server.getsockname()[1]
+        def _serve():
+            conn, _ = server.accept()
+            conn.sendall('SSH-2.0-OpenSSH_6.6\r\n')
+            conn.close()
+        t = threading.Thread(target=_serve)
+        t.start()
+        try:
+            self.assertTrue(check_ssh_banner('127.0.0.1', port, 2))
+        finally:
+            t.join()
+            server.close()
+        # Nothing is listening on the port now
+        self.assertFalse(check_ssh_banner('127.0.0.1', port, 2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for install script generation for Linux/APT software configurations.
+'''
+import unittest
+
+from deployer.config.software.base import parse_install_script_output
+from deployer.config.software.linux import LinuxAPTConfig
+
+class LinuxAPTInstallScriptTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.config = LinuxAPTConfig('my-app', 'myapp', 'linux', 'ubuntu')
+        self.config.software_apt_config = [
+            {'source': 'deb http://repo1/app trusty contrib', 
+             'key': '-----BEGIN PGP PUBLIC KEY BLOCK-----\nabc\n'},
+            {'source': 'deb http://repo2/mpi trusty main'}]
+        self.config.software_packages = ['my-app', 'openmpi-bin']
+    
+    def test_install_mode(self):
+        self.assertEqual(self.config.software_install_mode, 'commands')
+        self.config.software_install_mode = 'script'
+        self.assertEqual(self.config.software_install_mode, 'script')
+        with self.assertRaises(ValueError):
+            self.config.software_install_mode = 'puppet'
+    
+    def test_install_script_steps(self):
+        script = self.config.get_install_script()
+        steps = [line.split()[1] for line in script.splitlines() 
+                 if line.startswith('run_step ')]
+        self.assertEqual(steps, ['apt_key_0', 'apt_source_0', 'apt_source_1',
+                                 'apt_update', 'apt_install'])
+        self.assertEqual(script.count('apt-get update'), 1)
+        self.assertTrue('apt-get install -y my-app openmpi-bin' in script)
+        self.assertTrue('/etc/apt/sources.list.d/myapp1.list' in script)
+    
+    def test_parse_install_script_output(self):
+        output = ('Reading package lists...\n'
+                  'LIBHPC_STEP apt_key_0 0\n'
+                  'LIBHPC_STEP apt_update 0\r\n'
+                  'E: Unable to locate package my-app\n'
+                  'LIBHPC_STEP apt_install 100\n')
+        self.assertEqual(parse_install_script_output(output),
+                         [('apt_key_0', 0), ('apt_update', 0), 
+                          ('apt_install', 100)])
+        self.assertEqual(parse_install_script_output(None), [])
+
+if __name__ == "__main__":
+    unittest.main()
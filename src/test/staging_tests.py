@@ -0,0 +1,166 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for the concurrent input file stager.
+'''
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import unittest
+
+from deployer.core.exceptions import FileTransferError, JobConfigurationError
+from deployer.core.staging import InputStager, create_input_bundle,\
+    get_bundle_extract_command
+
+class FakeConnection(object):
+    
+    def __init__(self, registry, fail_on=()):
+        self.registry = registry
+        self.fail_on = fail_on
+        self.staged = []
+        self.finalized = False
+        with registry['lock']:
+            registry['connections'].append(self)
+    
+    def stage_to_remote(self, src, tgt):
+        if src in self.fail_on:
+            raise IOError('Unable to transfer <%s>' % src)
+        self.staged.append((src, tgt))
+    
+    def finalize(self):
+        self.finalized = True
+
+class InputStagerTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.registry = {'lock': threading.Lock(), 'connections': []}
+        self.files = ['/data/input%s.xml' % i for i in range(20)]
+    
+    def test_stage_preserves_input_order(self):
+        stager = InputStager(lambda: FakeConnection(self.registry), 4)
+        remote_paths = stager.stage(self.files, '/scratch/job-1')
+        self.assertEqual(remote_paths, ['/scratch/job-1/input%s.xml' % i 
+                                        for i in range(20)])
+    
+    def test_stage_reuses_bounded_connections(self):
+        stager = InputStager(lambda: FakeConnection(self.registry), 3)
+        stager.stage(self.files, '/scratch/job-1')
+        connections = self.registry['connections']
+        self.assertTrue(len(connections) <= 3)
+        self.assertEqual(sum([len(c.staged) for c in connections]), 20)
+        self.assertTrue(all([c.finalized for c in connections]))
+    
+    def test_stage_reports_each_failed_file(self):
+        failures = ('/data/input3.xml', '/data/input11.xml')
+        stager = InputStager(lambda: FakeConnection(self.registry, failures), 4)
+        with self.assertRaises(FileTransferError) as c:
+            stager.stage(self.files, '/scratch/job-1')
+        self.assertEqual(sorted(c.exception.errors.keys()), sorted(failures))
+        staged = sum([len(conn.staged) for conn in 
+                      self.registry['connections']])
+        self.assertEqual(staged, 18)
+    
+    def test_stage_replaces_failed_connection(self):
+        failures = ('/data/input3.xml', '/data/input11.xml')
+        stager = InputStager(lambda: FakeConnection(self.registry, failures), 1)
+        with self.assertRaises(FileTransferError):
+            stager.stage(self.files, '/scratch/job-1')
+        # A connection on which a transfer failed is closed, not reused
+        connections = self.registry['connections']
+        self.assertEqual(len(connections), 3)
+        self.assertEqual([len(c.staged) for c in connections], [3, 7, 8])
+        self.assertTrue(all([c.finalized for c in connections]))
+
+    def test_stage_no_files(self):
+        stager = InputStager(lambda: FakeConnection(self.registry))
+        self.assertEqual(stager.stage([], '/scratch/job-1'), [])
+        self.assertEqual(self.registry['connections'], [])
+
+class InputBundleTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.files = []
+        for i in range(5):
+            path = os.path.join(self.tmp_dir, 'mesh%s.xml' % i)
+            with open(path, 'w') as f:
+                f.write('<mesh id="%s"/>' % i)
+            self.files.append(path)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_create_gzip_bundle(self):
+        bundle = create_input_bundle(self.files, 'job-1-inputs', 'gzip',
+                                     self.tmp_dir)
+        self.assertTrue(bundle.endswith('job-1-inputs.tar.gz'))
+        tar = tarfile.open(bundle, 'r:gz')
+        self.assertEqual(sorted(tar.getnames()), 
+                         ['mesh%s.xml' % i for i in range(5)])
+        tar.close()
+    
+    def test_create_uncompressed_bundle(self):
+        bundle = create_input_bundle(self.files, 'job-1-inputs', None,
+                                     self.tmp_dir)
+        self.assertTrue(bundle.endswith('job-1-inputs.tar'))
+        self.assertTrue(tarfile.is_tarfile(bundle))
+    
+    def test_invalid_compression(self):
+        self.assertRaises(JobConfigurationError, create_input_bundle, 
+                          self.files, 'job-1-inputs', 'rar', self.tmp_dir)
+    
+    def test_extract_command(self):
+        self.assertEqual(get_bundle_extract_command('b.tar.gz', 'GZIP'),
+                         'tar -xzf b.tar.gz')
+        self.assertEqual(get_bundle_extract_command('b.tar.zst', 'zstd'),
+                         'zstd -dcq b.tar.zst | tar -xf -')
+        self.assertEqual(get_bundle_extract_command('job 1; rm -rf ~.tar'),
+                         "tar -xf 'job 1; rm -rf ~.tar'")
+
+if __name__ == "__main__":
+    unittest.main()
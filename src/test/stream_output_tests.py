@@ -0,0 +1,155 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for receiving output archives streamed from the remote platform.
+'''
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+
+from deployer.core.exceptions import JobError
+from deployer.core.output import stream_output_archive
+
+class StreamOutputTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.job_dir = os.path.join(self.tmp_dir, 'job')
+        os.makedirs(os.path.join(self.job_dir, 'results'))
+        for name in ['std.out', os.path.join('results', 'mesh.fld')]:
+            # Random content so that the archive is larger than the part 
+            # of it sent by the truncated stream tests
+            with open(os.path.join(self.job_dir, name), 'wb') as f:
+                f.write(os.urandom(100000))
+        self.archive = os.path.join(self.tmp_dir, 'output.tar.gz')
+        tar = tarfile.open(self.archive, 'w:gz')
+        tar.add(os.path.join(self.job_dir, 'std.out'), 'std.out')
+        tar.add(os.path.join(self.job_dir, 'results'), 'results')
+        tar.close()
+        self.destination = os.path.join(self.tmp_dir, 'dest')
+        os.makedirs(self.destination)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def _cmd(self, script):
+        return ['/bin/sh', '-c', script]
+    
+    def test_stream_archive(self):
+        target = stream_output_archive(self._cmd('cat %s' % self.archive), 
+                                       self.destination, 'job-1')
+        self.assertEqual(target, 
+                         os.path.join(self.destination, 'job-1.tar.gz'))
+        with open(target, 'rb') as f, open(self.archive, 'rb') as a:
+            self.assertEqual(f.read(), a.read())
+        self.assertEqual(os.listdir(self.destination), ['job-1.tar.gz'])
+    
+    def test_stream_extract(self):
+        target = stream_output_archive(self._cmd('cat %s' % self.archive), 
+                                       self.destination, 'job-1', 
+                                       extract=True)
+        self.assertEqual(target, os.path.join(self.destination, 'job-1'))
+        self.assertTrue(os.path.isfile(os.path.join(target, 'results', 
+                                                    'mesh.fld')))
+        self.assertEqual(os.listdir(self.destination), ['job-1'])
+    
+    def test_ssh_failure(self):
+        cmd = self._cmd('echo "Permission denied (publickey)." >&2; exit 255')
+        for extract in [False, True]:
+            try:
+                stream_output_archive(cmd, self.destination, 'job-1', extract,
+                                      source='host:/jobs/job-1')
+                self.fail('A failed stream command should raise a JobError')
+            except JobError as e:
+                self.assertTrue('<255>' in str(e))
+                self.assertTrue('Permission denied' in str(e))
+            self.assertEqual(os.listdir(self.destination), [])
+    
+    def test_truncated_stream(self):
+        # The remote command fails part way through sending the archive
+        cmd = self._cmd('head -c 20000 %s; echo "Connection reset" >&2; '
+                        'exit 255' % self.archive)
+        for extract in [False, True]:
+            try:
+                stream_output_archive(cmd, self.destination, 'job-1', extract)
+                self.fail('A truncated stream should raise a JobError')
+            except JobError as e:
+                self.assertTrue('Connection reset' in str(e))
+            self.assertEqual(os.listdir(self.destination), [])
+        
+        # The stream ends early without the command reporting an error
+        cmd = self._cmd('head -c 20000 %s' % self.archive)
+        self.assertRaises(JobError, stream_output_archive, cmd, 
+                          self.destination, 'job-1', True)
+        self.assertEqual(os.listdir(self.destination), [])
+    
+    def test_unsafe_members_refused(self):
+        outside = os.path.join(self.tmp_dir, 'outside.txt')
+        unsafe = os.path.join(self.tmp_dir, 'unsafe.tar.gz')
+        tar = tarfile.open(unsafe, 'w:gz')
+        tar.add(os.path.join(self.job_dir, 'std.out'), '../outside.txt')
+        tar.close()
+        self.assertRaises(JobError, stream_output_archive, 
+                          self._cmd('cat %s' % unsafe), self.destination, 
+                          'job-1', True)
+        self.assertFalse(os.path.exists(outside))
+        self.assertEqual(os.listdir(self.destination), [])
+        
+        tar = tarfile.open(unsafe, 'w:gz')
+        info = tarfile.TarInfo('etc')
+        info.type = tarfile.SYMTYPE
+        info.linkname = '/etc'
+        tar.addfile(info)
+        tar.close()
+        self.assertRaises(JobError, stream_output_archive, 
+                          self._cmd('cat %s' % unsafe), self.destination, 
+                          'job-1', True)
+        self.assertEqual(os.listdir(self.destination), [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,244 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for parameter sweeps.
+'''
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from deployer.core.exceptions import JobConfigurationError
+from deployer.core.monitor import JobMonitor, poll_processes
+from deployer.core.sweep import expand_parameters, substitute_parameters,\
+    expand_jobs, get_resource_job, run_sweep_jobs, run_sweep_array,\
+    SweepIndex, SWEEP_JOB_DONE, SWEEP_JOB_FAILED, SWEEP_JOB_UNKNOWN
+
+JOB_TEMPLATE = '''libhpc_jobspec:
+  executable: /usr/bin/solver
+  args: [--alpha, "${alpha}", --mesh=$mesh, $HOME]
+  num_processes: $procs
+  output_file_destination: %s/run-${mesh}
+'''
+
+class FakeJobDeployer(object):
+    
+    def __init__(self, job_config, calls):
+        self.job_config = job_config
+        self.calls = calls
+    
+    def prepare_job(self):
+        self.calls.append(('prepare_job', self.job_config.job_id))
+    
+    def transfer_files(self):
+        if self.job_config.args[1] == 'nofiles':
+            raise IOError('Input file transfer failed')
+        self.calls.append(('transfer_files', self.job_config.job_id))
+    
+    def run_job(self):
+        if self.job_config.args[1] == 'fail':
+            raise ValueError('Job submission failed')
+    
+    def wait_for_job_completion(self):
+        # A failed job whose poller couldn't get its exit code
+        if self.job_config.args[1] == 'unknown':
+            return ('Failed', None)
+        # A job polled using ps, as on the SSH and cloud platforms, whose 
+        # exit code is obtained once its process has finished
+        if self.job_config.args[1] == 'ps':
+            monitor = JobMonitor()
+            future = monitor.watch('host1', '4242', 
+                                   lambda pids: poll_processes(
+                                            lambda cmd: (1, '', ''), pids),
+                                   exit_code_func=lambda: 0)
+            monitor.poll()
+            return future.result(5)
+        return ('Done', int(self.job_config.args[1]))
+    
+    def collect_output(self, destination):
+        self.calls.append(('collect_output', destination))
+
+class FakeDeployer(object):
+    
+    def __init__(self):
+        self.calls = []
+    
+    def get_job_deployer(self, job_config):
+        return FakeJobDeployer(job_config, self.calls)
+    
+    def run_job_array(self, job_deployers):
+        self.calls.append(('run_job_array', 
+                           [d.job_config.job_id for d in job_deployers]))
+        return '1234[].server'
+
+class SweepTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.template_file = os.path.join(self.tmp_dir, 'job.yaml')
+        with open(self.template_file, 'w') as f:
+            f.write(JOB_TEMPLATE % self.tmp_dir)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_expand_parameter_matrix(self):
+        combinations = expand_parameters({'b': [1, 2], 'a': ['x', 'y'], 
+                                          'c': 5})
+        self.assertEqual(len(combinations), 4)
+        self.assertEqual(combinations[0], {'a': 'x', 'b': 1, 'c': 5})
+        self.assertEqual(combinations[3], {'a': 'y', 'b': 2, 'c': 5})
+        
+        explicit = [{'a': 1}, {'a': 2, 'b': 3}]
+        self.assertEqual(expand_parameters(explicit), explicit)
+        self.assertRaises(JobConfigurationError, expand_parameters, [1, 2])
+    
+    def test_substitute_parameters(self):
+        params = {'procs': 8, 'name': 'run1'}
+        self.assertEqual(substitute_parameters('$procs', params), 8)
+        self.assertEqual(substitute_parameters('${procs}', params), 8)
+        self.assertEqual(substitute_parameters(['out-${name}-$procs', 
+                                                '$HOME', 3], params),
+                         ['out-run1-8', '$HOME', 3])
+        self.assertEqual(substitute_parameters({'a': {'b': '$name'}}, params),
+                         {'a': {'b': 'run1'}})
+    
+    def test_expand_jobs(self):
+        jobs = expand_jobs(self.template_file, {'alpha': [0.1, 0.2], 
+                                                'mesh': ['fine'], 
+                                                'procs': [4, 16]})
+        self.assertEqual(len(jobs), 4)
+        params, jc = jobs[1]
+        self.assertEqual(params, {'alpha': 0.1, 'mesh': 'fine', 'procs': 16})
+        self.assertEqual(jc.args, ['--alpha', 0.1, '--mesh=fine', '$HOME'])
+        self.assertEqual(jc.num_processes, 16)
+        self.assertEqual(jc.output_file_destination, 
+                         os.path.join(self.tmp_dir, 'run-fine'))
+        self.assertEqual(len(set([j.job_id for _, j in jobs])), 4)
+        self.assertEqual(get_resource_job(jobs).num_processes, 16)
+    
+    def test_index_writes_are_throttled(self):
+        now = [1000.0]
+        index_file = os.path.join(self.tmp_dir, 'sweep-index.json')
+        index = SweepIndex(index_file, write_interval=5, 
+                           time_func=lambda: now[0])
+        def _states():
+            with open(index_file) as f:
+                return [r['state'] for r in json.load(f)['jobs']]
+        index.add_jobs([('job%d' % i, {'a': i}, None) for i in range(3)])
+        self.assertEqual(_states(), ['pending'] * 3)
+        
+        index.update('job0', 'running')
+        self.assertEqual(_states(), ['pending'] * 3)
+        now[0] += 5
+        index.update('job1', 'running')
+        self.assertEqual(_states(), ['running', 'running', 'pending'])
+        index.update('job0', SWEEP_JOB_DONE, exit_code=0)
+        self.assertEqual(_states(), ['running', 'running', 'pending'])
+        index.flush()
+        self.assertEqual(_states(), [SWEEP_JOB_DONE, 'running', 'pending'])
+        self.assertEqual(index.get_records()[0]['end_time'], 1005.0)
+    
+    def test_run_sweep_jobs(self):
+        jobs = expand_jobs(self.template_file, 
+                           [{'alpha': '0', 'mesh': 'a', 'procs': 1},
+                            {'alpha': '3', 'mesh': 'b', 'procs': 1},
+                            {'alpha': 'fail', 'mesh': 'c', 'procs': 1},
+                            {'alpha': 'unknown', 'mesh': 'd', 'procs': 1},
+                            {'alpha': 'ps', 'mesh': 'e', 'procs': 1}])
+        index_file = os.path.join(self.tmp_dir, 'index', 'sweep-index.json')
+        deployer = FakeDeployer()
+        failed = run_sweep_jobs(deployer, jobs, SweepIndex(index_file), 
+                                max_concurrent=2)
+        self.assertEqual(failed, 3)
+        self.assertEqual(len([c for c in deployer.calls 
+                              if c[0] == 'collect_output']), 4)
+        
+        with open(index_file) as f:
+            records = json.load(f)['jobs']
+        self.assertEqual([r['job_id'] for r in records], 
+                         [jc.job_id for _, jc in jobs])
+        self.assertEqual([r['state'] for r in records], 
+                         [SWEEP_JOB_DONE, SWEEP_JOB_FAILED, SWEEP_JOB_FAILED,
+                          SWEEP_JOB_UNKNOWN, SWEEP_JOB_DONE])
+        self.assertEqual(records[4]['exit_code'], 0)
+        self.assertEqual(records[1]['exit_code'], 3)
+        self.assertEqual(records[2]['error'], 'Job submission failed')
+        self.assertEqual(records[3]['exit_code'], None)
+        self.assertTrue(records[3]['end_time'] is not None)
+        self.assertEqual(records[0]['parameters']['mesh'], 'a')
+    
+    def test_run_sweep_array(self):
+        jobs = expand_jobs(self.template_file, 
+                           [{'alpha': '0', 'mesh': 'a', 'procs': 1},
+                            {'alpha': 'nofiles', 'mesh': 'b', 'procs': 1},
+                            {'alpha': '3', 'mesh': 'c', 'procs': 1},
+                            {'alpha': 'unknown', 'mesh': 'd', 'procs': 1}])
+        index_file = os.path.join(self.tmp_dir, 'sweep-index.json')
+        deployer = FakeDeployer()
+        failed = run_sweep_array(deployer, jobs, SweepIndex(index_file), 
+                                 max_concurrent=2)
+        self.assertEqual(failed, 3)
+        # The jobs whose input files were transferred are submitted together
+        self.assertEqual([c for c in deployer.calls 
+                          if c[0] == 'run_job_array'],
+                         [('run_job_array', [jobs[0][1].job_id, 
+                                             jobs[2][1].job_id,
+                                             jobs[3][1].job_id])])
+        self.assertEqual(len([c for c in deployer.calls 
+                              if c[0] == 'collect_output']), 3)
+        
+        with open(index_file) as f:
+            records = json.load(f)['jobs']
+        self.assertEqual([r['state'] for r in records], 
+                         [SWEEP_JOB_DONE, SWEEP_JOB_FAILED, SWEEP_JOB_FAILED,
+                          SWEEP_JOB_UNKNOWN])
+        self.assertEqual(records[1]['error'], 'Input file transfer failed')
+        self.assertEqual(records[2]['exit_code'], 3)
+
+if __name__ == "__main__":
+    unittest.main()
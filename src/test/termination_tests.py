@@ -0,0 +1,161 @@
+#  Copyright (c) 2015, Imperial College London
+#  All rights reserved.
+# 
+#  Redistribution and use in source and binary forms, with or without
+#  modification, are permitted provided that the following conditions are met:
+# 
+#  1. Redistributions of source code must retain the above copyright notice,
+#     this list of conditions and the following disclaimer.
+# 
+#  2. Redistributions in binary form must reproduce the above copyright notice,
+#     this list of conditions and the following disclaimer in the documentation
+#     and/or other materials provided with the distribution.
+# 
+#  3. Neither the name of the copyright holder nor the names of their
+#     contributors may be used to endorse or promote products derived from this
+#     software without specific prior written permission.
+# 
+#  THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+#  AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+#  IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+#  ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+#  LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+#  CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+#  SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+#  INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+#  CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+#  ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+#  POSSIBILITY OF SUCH DAMAGE.
+# 
+#  -----------------------------------------------------------------------------
+# 
+#  This file is part of the libhpc-deployer Python library, developed as part
+#  of the libhpc projects (http://www.imperial.ac.uk/lesc/projects/libhpc).
+# 
+#  We gratefully acknowledge the Engineering and Physical Sciences Research
+#  Council (EPSRC) for their support of the projects:
+#    - libhpc: Intelligent Component-based Development of HPC Applications
+#      (EP/I030239/1).
+#    - libhpc Stage II: A Long-term Solution for the Usability, Maintainability
+#      and Sustainability of HPC Software (EP/K038788/1).
+# 
+#  -----------------------------------------------------------------------------
+
+'''
+Created on 17 Oct 2026
+
+Tests for bulk termination of cloud nodes and the termination reaper.
+'''
+import shutil
+import tempfile
+import unittest
+
+from deployer.core.termination import PendingTerminations, reap,\
+    terminate_nodes, wait_for_termination
+
+class FakeNode(object):
+    
+    def __init__(self, node_id):
+        self.id = node_id
+
+class FakeConnection(object):
+    
+    def __init__(self, fail):
+        self.fail = fail
+        self.requests = []
+    
+    def request(self, path, params=None):
+        self.requests.append(params)
+        if self.fail:
+            raise Exception('TerminateInstances failed')
+
+class FakeDriver(object):
+    
+    path = '/'
+    
+    def __init__(self, fail_bulk=False, fail_nodes=[]):
+        self.connection = FakeConnection(fail_bulk)
+        self.fail_nodes = fail_nodes
+        self.destroyed = []
+    
+    def destroy_node(self, node):
+        if node.id in self.fail_nodes:
+            raise Exception('Unable to destroy node')
+        self.destroyed.append(node.id)
+
+class FakeDeployer(object):
+    
+    def __init__(self, remaining):
+        self.remaining = remaining
+        self.confirmed = []
+    
+    def confirm_termination(self, node_ids, timeout=None):
+        self.confirmed.append(list(node_ids))
+        return [n for n in node_ids if n in self.remaining]
+
+class TerminationTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.nodes = [FakeNode('i-1'), FakeNode('i-2')]
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+    
+    def test_bulk_termination(self):
+        driver = FakeDriver()
+        self.assertEqual(terminate_nodes(driver, self.nodes), [])
+        self.assertEqual(driver.connection.requests,
+                         [{'Action': 'TerminateInstances', 
+                           'InstanceId.1': 'i-1', 'InstanceId.2': 'i-2'}])
+        self.assertEqual(driver.destroyed, [])
+    
+    def test_per_node_fallback(self):
+        driver = FakeDriver(fail_bulk=True, fail_nodes=['i-2'])
+        failed = terminate_nodes(driver, self.nodes)
+        self.assertEqual([node.id for node in failed], ['i-2'])
+        self.assertEqual(driver.destroyed, ['i-1'])
+    
+    def test_wait_for_termination(self):
+        states = [['i-1', 'i-2'], ['i-2'], []]
+        calls = []
+        def _get_running(node_ids):
+            calls.append(list(node_ids))
+            return states.pop(0)
+        sleeps = []
+        remaining = wait_for_termination(_get_running, ['i-1', 'i-2'],
+                                         poll_delay=4, 
+                                         sleep_func=sleeps.append)
+        self.assertEqual(remaining, [])
+        self.assertEqual(calls, [['i-1', 'i-2'], ['i-1', 'i-2'], ['i-2']])
+        self.assertEqual(sleeps, [4, 4])
+    
+    def test_wait_for_termination_timeout(self):
+        now = [0]
+        def _sleep(delay):
+            now[0] += delay
+        remaining = wait_for_termination(lambda ids: ids, ['i-1'], 
+                                         poll_delay=4, timeout=10, 
+                                         sleep_func=_sleep,
+                                         time_func=lambda: now[0])
+        self.assertEqual(remaining, ['i-1'])
+        self.assertEqual(now[0], 12)
+    
+    def test_reap_pending_terminations(self):
+        pending = PendingTerminations(self.tmp_dir)
+        pending.add('cloud-a', ['i-1', 'i-2'], 'job-1')
+        pending.add('cloud-b', ['i-3'], 'job-2')
+        deployers = {'cloud-a': FakeDeployer(['i-2']), 
+                     'cloud-b': FakeDeployer([])}
+        failed = reap(deployers.get, pending, timeout=10)
+        self.assertEqual(failed, 1)
+        self.assertEqual(deployers['cloud-a'].confirmed, [['i-1', 'i-2']])
+        self.assertEqual(deployers['cloud-b'].confirmed, [['i-3']])
+        # Only the unconfirmed node is left pending
+        records = pending.get_pending()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['job_id'], 'job-1')
+        self.assertEqual(records[0]['node_ids'], ['i-2'])
+
+if __name__ == "__main__":
+    unittest.main()